@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for the crawl pipeline (run from backend/, e.g. python -m benchmarks.crawl_benchmark)
+"""
@@ -0,0 +1,156 @@
+"""
+Crawl Benchmark
+Drives ImpressumScraper.scrape_batch against the fake-web fixture server and
+reports throughput, latency percentiles, requests per site and peak RSS.
+
+Usage (from backend/):
+    python -m benchmarks.crawl_benchmark
+    python -m benchmarks.crawl_benchmark --sites 500 --workers 20 --json results.json
+    python -m benchmarks.crawl_benchmark --selenium --mx   # include browser fallback and MX lookups
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.fake_web import build_corpus, fetch_request_counts, serve_in_background
+from services.logging_config import configure_logging
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for empty input)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def create_scraper(selenium: bool, mx: bool):
+    """Fresh scraper configured for offline benchmarking"""
+    from services import impressum_scraper
+
+    if not selenium:
+        # Chrome is usually missing here and webdriver-manager would try to download it
+        impressum_scraper.SELENIUM_AVAILABLE = False
+
+    scraper = impressum_scraper.ImpressumScraper()
+    # Archiving would measure disk I/O, not crawling
+    scraper.archive = None
+    if not mx:
+        # Corpus domains do not exist - skip DNS so the run stays offline and deterministic
+        scraper.email_verifier.verify_mx_record = lambda email: True
+    return scraper
+
+
+def run_benchmark(args) -> Dict:
+    sites = build_corpus(args.sites, args.port, args.seed)
+    expected = {site.url: site for site in sites}
+
+    with serve_in_background(args.sites, args.port, args.seed, args.bind):
+        scraper = create_scraper(args.selenium, args.mx)
+
+        # Per-site latency: time every scrape_website call made by scrape_batch
+        latencies: Dict[str, float] = {}
+        latencies_lock = threading.Lock()
+        scrape_website = scraper.scrape_website
+
+        def timed_scrape(url):
+            started = time.perf_counter()
+            try:
+                return scrape_website(url)
+            finally:
+                with latencies_lock:
+                    latencies[url] = time.perf_counter() - started
+
+        scraper.scrape_website = timed_scrape
+
+        started = time.perf_counter()
+        results = scraper.scrape_batch(list(expected), max_workers=args.workers)
+        elapsed = time.perf_counter() - started
+
+        request_counts = fetch_request_counts(args.port)
+
+    by_kind: Dict[str, Counter] = {}
+    for result in results:
+        site = expected.get(result['url'])
+        if site is None:
+            continue
+        outcome = 'correct' if result.get('email') == site.email else ('wrong' if result.get('email') else 'missed')
+        by_kind.setdefault(site.kind, Counter())[outcome] += 1
+
+    values = list(latencies.values())
+    total_requests = sum(request_counts.values())
+    return {
+        'sites': len(sites),
+        'workers': args.workers,
+        'elapsed_s': round(elapsed, 2),
+        'sites_per_s': round(len(sites) / elapsed, 2) if elapsed else 0,
+        'latency_s': {
+            'p50': round(percentile(values, 50), 3),
+            'p95': round(percentile(values, 95), 3),
+            'p99': round(percentile(values, 99), 3),
+            'mean': round(statistics.mean(values), 3) if values else 0,
+        },
+        'requests': total_requests,
+        'requests_per_site': round(total_requests / len(sites), 2) if sites else 0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'success': sum(1 for r in results if r.get('success')),
+        'by_kind': {kind: dict(counts) for kind, counts in sorted(by_kind.items())},
+    }
+
+
+def print_report(report: Dict) -> None:
+    latency = report['latency_s']
+    print(f"\n📊 Crawl benchmark: {report['sites']} sites, {report['workers']} workers")
+    print(f"   Throughput:    {report['sites_per_s']} sites/s ({report['elapsed_s']}s total)")
+    print(f"   Latency:       p50 {latency['p50']}s  p95 {latency['p95']}s  p99 {latency['p99']}s")
+    print(f"   Requests:      {report['requests']} ({report['requests_per_site']} per site)")
+    print(f"   Peak RSS:      {report['peak_rss_mb']} MB")
+    print(f"   Success:       {report['success']}/{report['sites']}")
+    print(f"\n   {'kind':<12}{'correct':>9}{'wrong':>7}{'missed':>8}")
+    for kind, counts in report['by_kind'].items():
+        print(f"   {kind:<12}{counts.get('correct', 0):>9}{counts.get('wrong', 0):>7}{counts.get('missed', 0):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Impressum crawler against a local fake web")
+    parser.add_argument('--sites', type=int, default=200, help="Number of generated sites")
+    parser.add_argument('--workers', type=int, default=10, help="scrape_batch max_workers")
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--bind', default='0.0.0.0', help="Bind address (must accept 127.1.x.y)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--selenium', action='store_true', help="Allow the Selenium fallback")
+    parser.add_argument('--mx', action='store_true', help="Do real MX lookups during verification")
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--verbose', action='store_true', help="Show scraper debug logging")
+    args = parser.parse_args()
+
+    # Keep Redis out of the measurement unless explicitly configured for the run
+    os.environ.setdefault('REDIS_URL', '')
+    configure_logging('DEBUG' if args.verbose else 'ERROR')
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Database Round Trip Benchmark
+Runs the database-heavy route paths against the local Supabase stand-in and
+reports round trips per request/job, broken down by table and operation.
+
+Scenarios:
+    list_campaigns          campaigns list with lead counts
+    list_campaigns_xN       N concurrent campaign lists in one worker (elapsed time shows
+                            whether requests overlap instead of queuing on the event loop)
+    crawl_with_outscraper   full campaign crawl (fixture places + fake-web Deep Scraper)
+    crawl_batch_background  Impressum batch crawl + lead updates
+
+Usage (from backend/):
+    python -m benchmarks.db_benchmark
+    python -m benchmarks.db_benchmark --latency-ms 5 --campaigns 50 --places 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+from benchmarks.fake_web import build_corpus, serve_in_background
+from benchmarks.crawl_benchmark import create_scraper
+from services.local_supabase import LocalSupabaseClient
+from services.logging_config import configure_logging
+from services.supabase_client import SupabaseClient
+
+
+class FixtureOutscraper:
+    """Returns Outscraper-shaped places built from the fake-web corpus"""
+
+    def __init__(self, places: List[Dict]):
+        self.places = places
+
+    def search_places(
+        self, query: str, limit: int = 100, language: str = "de", region: str = "DE", coordinates: Optional[str] = None
+    ) -> List[Dict]:
+        return self.places[:limit]
+
+    def iter_places(
+        self, query: str, limit: int = 100, page_size: int = 100, start: int = 0, **kwargs
+    ) -> Iterator[List[Dict]]:
+        places = self.places[:limit]
+        for offset in range(start, len(places), page_size):
+            yield places[offset:offset + page_size]
+
+
+def build_places(sites, with_email_ratio: float = 0.3) -> List[Dict]:
+    """Outscraper results for corpus sites (some already carry an enrichment email)"""
+    places = []
+    for site in sites:
+        places.append({
+            'place_id': f"ChIJ{site.index:08d}",
+            'name': site.name,
+            'full_address': f"Hauptstraße {site.index % 100 + 1}, 80331 München",
+            'city': 'München',
+            'site': site.url,
+            'phone': f"+49 89 {100000 + site.index}",
+            'rating': 3.5 + (site.index % 15) / 10,
+            'reviews': 5 + site.index % 200,
+            'category': 'Dienstleistung',
+            'email_1': site.email if (site.index % 10) < with_email_ratio * 10 else None,
+        })
+    return places
+
+
+def seed_user(client: LocalSupabaseClient, campaigns: int, leads_per_campaign: int) -> str:
+    user_id = str(uuid.uuid4())
+    client.seed('profiles', [{'id': user_id, 'company_name': 'Benchmark GmbH', 'credits_balance': 100000}])
+    for c in range(campaigns):
+        campaign = client.seed('campaigns', [{'user_id': user_id, 'name': f"Kampagne {c}", 'status': 'completed'}])[0]
+        client.seed('leads', [
+            {'user_id': user_id, 'campaign_id': campaign['id'], 'company_name': f"Firma {c}-{i}",
+             'website': f"https://firma-{c}-{i}.de", 'email': f"info@firma-{c}-{i}.de"}
+            for i in range(leads_per_campaign)
+        ])
+    return user_id
+
+
+def run_scenario(client: LocalSupabaseClient, name: str, coroutine) -> Dict:
+    client.stats.reset()
+    started = time.perf_counter()
+    with client.stats.scope() as scope:
+        asyncio.run(coroutine)
+    elapsed = time.perf_counter() - started
+    totals = client.stats.snapshot()
+    return {
+        'scenario': name,
+        'elapsed_s': round(elapsed, 3),
+        'round_trips': totals['total'],
+        # Round trips from ThreadPoolExecutor workers are only visible in the global counters
+        'round_trips_in_request_context': scope.round_trips,
+        'by_target': totals['by_target'],
+    }
+
+
+def run_benchmark(args) -> List[Dict]:
+    from routes import campaigns as campaigns_routes
+    from routes import impressum as impressum_routes
+    from services import impressum_scraper
+
+    client = LocalSupabaseClient(latency=args.latency_ms / 1000)
+    SupabaseClient.set_client(client)
+    user_id = seed_user(client, args.campaigns, args.leads_per_campaign)
+
+    reports = [run_scenario(client, 'list_campaigns', campaigns_routes.list_campaigns(user_id))]
+
+    async def concurrent_lists():
+        await asyncio.gather(*(campaigns_routes.list_campaigns(user_id) for _ in range(args.concurrency)))
+
+    reports.append(run_scenario(client, f"list_campaigns_x{args.concurrency}", concurrent_lists()))
+
+    sites = build_corpus(args.places, args.port, args.seed)
+    with serve_in_background(args.places, args.port, args.seed, args.bind):
+        impressum_scraper._impressum_scraper = create_scraper(selenium=False, mx=False)
+        campaigns_routes.get_outscraper_service = lambda: FixtureOutscraper(build_places(sites))
+
+        campaign = client.seed('campaigns', [{'user_id': user_id, 'name': 'Benchmark crawl', 'status': 'draft'}])[0]
+        request = campaigns_routes.CrawlRequest(
+            campaign_id=campaign['id'], user_id=user_id, location='München', radius=5000,
+            keywords='Handwerker', target_lead_count=args.places
+        )
+        reports.append(run_scenario(
+            client, 'crawl_with_outscraper',
+            campaigns_routes.crawl_with_outscraper(campaign['id'], user_id, request)
+        ))
+
+        websites = [site.url for site in sites[:min(len(sites), 100)]]
+        reports.append(run_scenario(
+            client, 'crawl_batch_background',
+            impressum_routes.crawl_batch_background(websites, campaign['id'])
+        ))
+
+    return reports
+
+
+def print_report(reports: List[Dict], latency_ms: float) -> None:
+    print(f"\n📊 Database round trips (simulated latency {latency_ms}ms per call)")
+    for report in reports:
+        print(f"\n   {report['scenario']}: {report['round_trips']} round trips in {report['elapsed_s']}s "
+              f"({report['round_trips_in_request_context']} in the request context)")
+        for target, count in report['by_target'].items():
+            print(f"      {target:<32}{count:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count Supabase round trips of the database-heavy paths")
+    parser.add_argument('--latency-ms', type=float, default=float(os.getenv('LOCAL_SUPABASE_LATENCY_MS', 0)))
+    parser.add_argument('--campaigns', type=int, default=20, help="Seeded campaigns for list_campaigns")
+    parser.add_argument('--leads-per-campaign', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=10, help="Parallel requests for list_campaigns_xN")
+    parser.add_argument('--places', type=int, default=60, help="Outscraper places / fake-web sites")
+    parser.add_argument('--port', type=int, default=8910)
+    parser.add_argument('--bind', default='0.0.0.0')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--verbose', action='store_true', help="Show route debug logging")
+    args = parser.parse_args()
+
+    os.environ.setdefault('REDIS_URL', '')
+    configure_logging('DEBUG' if args.verbose else 'ERROR')
+
+    reports = run_benchmark(args)
+    print_report(reports, args.latency_ms)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""
+Fake Web Fixture Server
+Serves a generated corpus of German small-business websites from the loopback
+range so the scraper can be benchmarked without touching the internet.
+
+Every site gets its own loopback address (127.1.x.y), so per-domain logic
+(single-flight, robots.txt cache, coalescing) sees distinct hosts. This relies
+on Linux routing all of 127.0.0.0/8 to lo.
+"""
+
+import json
+import multiprocessing
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+# Site kinds and their share of the corpus
+SITE_KINDS = [
+    ('standard', 0.35),     # /impressum linked from nav, plain-text email
+    ('mailto', 0.15),       # email only as mailto: link
+    ('obfuscated', 0.10),   # info [at] firma [dot] de
+    ('sitemap', 0.10),      # Impressum at an unguessable path, listed in sitemap.xml
+    ('redirect', 0.05),     # / -> 301 -> /de/
+    ('slow', 0.05),         # every response delayed
+    ('forbidden', 0.05),    # bot wall (Cloudflare-style challenge), always 403
+    ('ssl', 0.05),          # listed as https:// but only speaks http (SSL failure -> http fallback)
+    ('js_only', 0.05),      # SPA shell, no email without rendering (three variants, see build_site)
+    ('pdf', 0.05),          # Impressum linked as PDF, email in homepage footer
+]
+
+BUSINESS_TYPES = ['Bäckerei', 'Friseur', 'Zahnarztpraxis', 'Autowerkstatt', 'Steuerberatung', 'Malerbetrieb',
+                  'Physiotherapie', 'Blumenladen', 'Restaurant', 'Elektro', 'Sanitär', 'Architekturbüro']
+SURNAMES = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz',
+            'Hoffmann', 'Koch', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann', 'Schwarz', 'Braun']
+FIRST_NAMES = ['Anna', 'Thomas', 'Julia', 'Michael', 'Sabine', 'Stefan', 'Katrin', 'Andreas', 'Petra', 'Jörg']
+CITIES = [('80331', 'München'), ('10115', 'Berlin'), ('20095', 'Hamburg'), ('50667', 'Köln'),
+          ('60311', 'Frankfurt am Main'), ('70173', 'Stuttgart'), ('40213', 'Düsseldorf'), ('04109', 'Leipzig')]
+STREETS = ['Hauptstraße', 'Bahnhofstraße', 'Gartenweg', 'Schulstraße', 'Marktplatz', 'Lindenallee']
+SERVICES = ['Beratung', 'Wartung', 'Reparatur', 'Planung', 'Montage', 'Service vor Ort', 'Notdienst']
+
+FILLER = ("Seit über 20 Jahren sind wir Ihr zuverlässiger Partner in der Region. Qualität, Termintreue "
+          "und persönliche Beratung stehen bei uns an erster Stelle. ")
+
+
+@dataclass
+class Page:
+    status: int = 200
+    body: bytes = b''
+    content_type: str = 'text/html; charset=utf-8'
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class Site:
+    index: int
+    kind: str
+    host: str
+    name: str
+    email: str
+    delay: float = 0.0
+    pages: Dict[str, Page] = field(default_factory=dict)
+
+    @property
+    def url(self) -> str:
+        scheme = 'https' if self.kind == 'ssl' else 'http'
+        return f"{scheme}://{self.host}/"
+
+
+def _slug(text: str) -> str:
+    for src, dst in (('ä', 'ae'), ('ö', 'oe'), ('ü', 'ue'), ('ß', 'ss'), (' ', '-')):
+        text = text.lower().replace(src, dst)
+    return ''.join(c for c in text if c.isalnum() or c == '-')
+
+
+def _html(title: str, body: str, description: str = '') -> bytes:
+    return (
+        f'<!DOCTYPE html><html lang="de"><head><meta charset="utf-8"><title>{title}</title>'
+        f'<meta name="description" content="{description}"></head><body>{body}</body></html>'
+    ).encode('utf-8')
+
+
+def _pick_kind(rng: random.Random) -> str:
+    roll = rng.random()
+    cumulative = 0.0
+    for kind, share in SITE_KINDS:
+        cumulative += share
+        if roll < cumulative:
+            return kind
+    return SITE_KINDS[0][0]
+
+
+def build_site(index: int, port: int, rng: random.Random, kind: Optional[str] = None) -> Site:
+    """Generate one site with all its pages"""
+    kind = kind or _pick_kind(rng)
+    business = rng.choice(BUSINESS_TYPES)
+    surname = rng.choice(SURNAMES)
+    name = f"{business} {surname}"
+    owner = f"{rng.choice(FIRST_NAMES)} {surname}"
+    plz, city = rng.choice(CITIES)
+    street = f"{rng.choice(STREETS)} {rng.randint(1, 120)}"
+    domain = f"{_slug(business)}-{_slug(surname)}-{index}.de"
+    email = f"info@{domain}"
+    host = f"127.1.{index // 250}.{index % 250 + 1}:{port}"
+    services = rng.sample(SERVICES, 3)
+
+    site = Site(index=index, kind=kind, host=host, name=name, email=email)
+    if kind == 'slow':
+        site.delay = rng.uniform(1.0, 3.0)
+
+    impressum_path = '/impressum'
+    if kind == 'sitemap':
+        impressum_path = '/rechtliches/impressum-und-kontaktangaben'
+    elif kind == 'redirect':
+        impressum_path = '/de/impressum'
+    elif kind == 'pdf':
+        impressum_path = '/downloads/impressum.pdf'
+
+    if kind == 'mailto':
+        email_html = f'<a href="mailto:{email}">Schreiben Sie uns</a>'
+    elif kind == 'obfuscated':
+        local, domain_part = email.split('@')
+        label, tld = domain_part.rsplit('.', 1)
+        email_html = f'{local} [at] {label} [dot] {tld}'
+    else:
+        email_html = email
+
+    nav = (f'<nav><a href="/">Start</a> | <a href="/leistungen">Leistungen</a> | '
+           f'<a href="/ueber-uns">Über uns</a> | <a href="{impressum_path}">Impressum</a> | '
+           f'<a href="/datenschutz">Datenschutz</a></nav>')
+    footer = f'<footer>{name} · {street} · {plz} {city}'
+    footer += f' · E-Mail: {email}</footer>' if kind == 'pdf' else '</footer>'
+    homepage_body = (
+        f'<header>{nav}</header><main><h1>{name} in {city}</h1>'
+        f'<h2>Unsere Leistungen</h2><ul>{"".join(f"<li>{s}</li>" for s in services)}</ul>'
+        f'<p>{FILLER * rng.randint(3, 30)}</p></main>{footer}'
+    )
+    description = f"{name} - {', '.join(services)} in {city}"
+    impressum_body = (
+        f'<header>{nav}</header><main><h1>Impressum</h1><p>Angaben gemäß § 5 TMG</p>'
+        f'<p>{name}<br>{street}<br>{plz} {city}</p><p>Vertreten durch: {owner}</p>'
+        f'<h2>Kontakt</h2><p>Telefon: 0{rng.randint(30, 999)} {rng.randint(100000, 999999)}<br>'
+        f'E-Mail: {email_html}</p><h2>Umsatzsteuer-ID</h2><p>DE{rng.randint(100000000, 999999999)}</p>'
+        f'<p>{FILLER * 4}</p></main>'
+    )
+
+    pages = site.pages
+    if kind == 'forbidden':
+        pages['*'] = Page(
+            status=403,
+            body=_html('Just a moment...', '<noscript>Enable JavaScript and cookies to continue</noscript>'
+                                           '<script>window._cf_chl_opt={cType: "managed"};</script>'),
+            headers={'Server': 'cloudflare', 'cf-mitigated': 'challenge'}
+        )
+        return site
+
+    if kind == 'js_only':
+        # Variants: 0 - email rendered on the homepage, no /impressum route;
+        # 1 - every route serves the same shell; 2 - the homepage renders only the
+        # navigation, the email is rendered on /impressum alone
+        variant = index % 3
+        shell = _html(name, '<div id="root"></div><script src="/static/js/main.4f2a1c.js"></script>')
+        pages['/'] = Page(body=shell)
+        if variant == 2:
+            pages['/impressum'] = Page(body=_html(
+                f'Impressum - {name}', '<div id="root"></div><script src="/static/js/impressum.9c3e7b.js"></script>'
+            ))
+            pages['/static/js/main.4f2a1c.js'] = Page(
+                body=b'document.getElementById("root").innerHTML="<a href=\'/impressum\'>Impressum</a>";',
+                content_type='application/javascript'
+            )
+            pages['/static/js/impressum.9c3e7b.js'] = Page(
+                body=f'document.getElementById("root").innerHTML="E-Mail: {email}";'.encode('utf-8'),
+                content_type='application/javascript'
+            )
+            return site
+        if variant == 1:
+            pages['/impressum'] = Page(body=shell)
+        pages['/static/js/main.4f2a1c.js'] = Page(
+            body=f'document.getElementById("root").innerHTML="{email}";'.encode('utf-8'),
+            content_type='application/javascript'
+        )
+        return site
+
+    if kind == 'redirect':
+        pages['/'] = Page(status=301, headers={'Location': '/de/'})
+        pages['/de/'] = Page(body=_html(name, homepage_body, description))
+    else:
+        pages['/'] = Page(body=_html(name, homepage_body, description))
+
+    if kind == 'pdf':
+        pages[impressum_path] = Page(body=b'%PDF-1.4\n' + b'0' * 50000, content_type='application/pdf')
+    else:
+        pages[impressum_path] = Page(body=_html(f'Impressum - {name}', impressum_body))
+
+    pages['/datenschutz'] = Page(body=_html('Datenschutz', f'<h1>Datenschutzerklärung</h1><p>{FILLER * 10}</p>'))
+    pages['/leistungen'] = Page(body=_html(f'Leistungen - {name}', f'<header>{nav}</header><h1>Leistungen</h1><p>{FILLER * 5}</p>'))
+    pages['/ueber-uns'] = Page(body=_html(f'Über uns - {name}', f'<header>{nav}</header><h1>Über uns</h1><p>{FILLER * 5}</p>'))
+
+    if kind == 'sitemap':
+        origin = f"http://{host}"
+        pages['/robots.txt'] = Page(
+            body=f"User-agent: *\nDisallow: /intern/\nSitemap: {origin}/sitemap.xml\n".encode('utf-8'),
+            content_type='text/plain'
+        )
+        locs = ['/', '/leistungen', '/ueber-uns', impressum_path, '/datenschutz']
+        pages['/sitemap.xml'] = Page(
+            body=('<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                  + ''.join(f'<url><loc>{origin}{loc}</loc></url>' for loc in locs)
+                  + '</urlset>').encode('utf-8'),
+            content_type='application/xml'
+        )
+
+    return site
+
+
+def build_corpus(count: int, port: int, seed: int = 42) -> List[Site]:
+    """Generate a deterministic corpus of sites"""
+    rng = random.Random(seed)
+    return [build_site(index, port, rng) for index in range(count)]
+
+
+class FakeWebServer:
+    """Threaded HTTP server answering for every site in the corpus (routed by Host header)"""
+
+    def __init__(self, sites: List[Site], port: int, bind: str = '0.0.0.0'):
+        self.sites = {site.host.split(':')[0]: site for site in sites}
+        self.port = port
+        self.bind = bind
+        self.request_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    def _resolve(self, host_header: str, path: str) -> Tuple[Optional[Site], Optional[Page]]:
+        site = self.sites.get((host_header or '').split(':')[0])
+        if site is None:
+            return None, None
+        page = site.pages.get('*') or site.pages.get(path.split('?')[0])
+        return site, page
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _serve(self, send_body: bool):
+                host = self.headers.get('Host', '')
+
+                if self.path == '/__stats':
+                    body = json.dumps(server.request_counts).encode('utf-8')
+                    self._respond(Page(body=body, content_type='application/json'), send_body)
+                    return
+
+                site, page = server._resolve(host, self.path)
+                if site is not None:
+                    with server._lock:
+                        server.request_counts[site.host] = server.request_counts.get(site.host, 0) + 1
+                    if site.delay:
+                        time.sleep(site.delay)
+                self._respond(page or Page(status=404, body=_html('404', '<h1>Seite nicht gefunden</h1>')), send_body)
+
+            def _respond(self, page: Page, send_body: bool):
+                self.send_response(page.status)
+                self.send_header('Content-Type', page.content_type)
+                self.send_header('Content-Length', str(len(page.body)))
+                for key, value in page.headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(page.body)
+
+            def do_GET(self):
+                self._serve(send_body=True)
+
+            def do_HEAD(self):
+                self._serve(send_body=False)
+
+        return Handler
+
+    def serve_forever(self):
+        self._httpd = ThreadingHTTPServer((self.bind, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._httpd.serve_forever()
+
+    def shutdown(self):
+        if self._httpd:
+            self._httpd.shutdown()
+
+
+def run_server(count: int, port: int, seed: int = 42, bind: str = '0.0.0.0'):
+    """Entry point for running the fixture server in a separate process"""
+    FakeWebServer(build_corpus(count, port, seed), port, bind).serve_forever()
+
+
+def wait_for_server(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/__stats", timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake web server did not start on port {port}")
+
+
+def fetch_request_counts(port: int) -> Dict[str, int]:
+    """Requests served per site host so far"""
+    return requests.get(f"http://127.0.0.1:{port}/__stats", timeout=5).json()
+
+
+@contextmanager
+def serve_in_background(count: int, port: int, seed: int = 42, bind: str = '0.0.0.0'):
+    """Run the fixture server in a subprocess (keeps its memory out of the benchmark's RSS)"""
+    server = multiprocessing.Process(target=run_server, args=(count, port, seed, bind), daemon=True)
+    server.start()
+    try:
+        wait_for_server(port)
+        yield
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a fake corpus of German business websites")
+    parser.add_argument('--sites', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for site in build_corpus(args.sites, args.port, args.seed)[:10]:
+        print(f"{site.kind:<11} {site.url}")
+    print(f"... serving {args.sites} sites on port {args.port}")
+    run_server(args.sites, args.port, args.seed)
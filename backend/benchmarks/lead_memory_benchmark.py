@@ -0,0 +1,190 @@
+"""
+Lead Memory Benchmark
+Compares the memory of the crawl pipeline's per-place representations with
+tracemalloc:
+
+    records    N places kept alive as pipeline records
+               dict      normalize_place_data() dict with raw_data + nested leads row (previous pipeline)
+               record    LeadRecord (services/lead_record.py)
+    pipeline   peak while filtering N places and building the insert rows
+               dict      whole Outscraper response in memory, dict records
+               stream    compact pages of OUTSCRAPER_PAGE_SIZE places, LeadRecord
+
+Usage (from backend/):
+    python -m benchmarks.lead_memory_benchmark
+    python -m benchmarks.lead_memory_benchmark --places 1500 --json results.json
+"""
+
+import argparse
+import json
+import tracemalloc
+from typing import Callable, Dict, Iterator, List
+
+from services.lead_record import LeadRecord, extract_email
+from services.outscraper_service import OUTSCRAPER_PAGE_SIZE, compact_place
+
+DAYS = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
+
+
+def raw_place(index: int) -> Dict:
+    """Outscraper-shaped place with every requested field (empty ones included, as the API returns them)"""
+    return {
+        'name': f"Friseursalon {index}",
+        'full_address': f"Hauptstraße {index % 100 + 1}, 80331 München",
+        'borough': 'Altstadt-Lehel',
+        'street': f"Hauptstraße {index % 100 + 1}",
+        'city': 'München',
+        'postal_code': '80331',
+        'country_code': 'DE',
+        'country': 'Germany',
+        'state': 'Bayern',
+        'latitude': 48.137 + index / 100000,
+        'longitude': 11.575 + index / 100000,
+        'site': f"https://salon-{index}.de/",
+        'phone': f"+49 89 {100000 + index}",
+        'type': 'Friseursalon',
+        'category': 'Friseursalon, Kosmetikstudio',
+        'rating': 3.5 + (index % 15) / 10,
+        'reviews': 5 + index % 200,
+        'google_id': f"0x479e75f{index:09x}:0x{index:016x}",
+        'place_id': f"ChIJ{index:024d}",
+        'business_status': 'OPERATIONAL',
+        'verified': index % 2 == 0,
+        'working_hours': {day: ['09:00-18:00'] for day in DAYS},
+        'email_1': f"info@salon-{index}.de" if index % 3 == 0 else None,
+        'email_2': None,
+        'email_3': None,
+        'domain': f"salon-{index}.de",
+    }
+
+
+def legacy_record(place: Dict) -> Dict:
+    """Previous pipeline: normalize_place_data() plus the leads row built from it"""
+    normalized = {
+        'place_id': place.get('place_id') or place.get('google_id'),
+        'name': place.get('name'),
+        'address': place.get('full_address'),
+        'city': place.get('city') or place.get('borough'),
+        'postal_code': place.get('postal_code'),
+        'country': place.get('country'),
+        'latitude': place.get('latitude'),
+        'longitude': place.get('longitude'),
+        'phone': place.get('phone'),
+        'website': place.get('site'),
+        'email': extract_email(place),
+        'rating': place.get('rating'),
+        'reviews_count': place.get('reviews'),
+        'category': place.get('category'),
+        'type': place.get('type'),
+        'verified': place.get('verified', False),
+        'business_status': place.get('business_status'),
+        'working_hours': place.get('working_hours'),
+        'raw_data': place
+    }
+    rating = normalized.get('rating') or 0
+    normalized['row'] = {
+        "company_name": normalized.get('name'),
+        "address": normalized.get('address'),
+        "city": normalized.get('city'),
+        "phone": normalized.get('phone'),
+        "website": normalized.get('website'),
+        "email": normalized.get('email'),
+        "lead_score": int(rating * 20),
+        "metadata": {
+            "place_id": normalized.get('place_id'),
+            "rating": rating,
+            "reviews": normalized.get('reviews_count') or 0,
+            "address": normalized.get('address'),
+            "latitude": normalized.get('latitude'),
+            "longitude": normalized.get('longitude'),
+            "category": normalized.get('category'),
+            "verified": normalized.get('verified'),
+        }
+    }
+    return normalized
+
+
+def measure(work: Callable[[], object]) -> Dict[str, int]:
+    """Bytes still allocated after work() (result kept alive) and peak bytes during it"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    result = work()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {'retained': current - start, 'peak': peak - start}
+
+
+def run_benchmark(args) -> Dict:
+    count = args.places
+
+    def dict_records():
+        return [legacy_record(raw_place(i)) for i in range(count)]
+
+    def lead_records():
+        return [LeadRecord.from_place(compact_place(raw_place(i))) for i in range(count)]
+
+    def dict_pipeline():
+        # Whole response first, every place normalized while the list stays alive
+        places = [raw_place(i) for i in range(count)]
+        rows = 0
+        for place in places:
+            record = legacy_record(place)
+            if record.get('website'):
+                rows += 1
+        return rows
+
+    def pages() -> Iterator[List[Dict]]:
+        for start in range(0, count, args.page_size):
+            yield [compact_place(raw_place(i)) for i in range(start, min(count, start + args.page_size))]
+
+    def stream_pipeline():
+        rows = 0
+        for page in pages():
+            for place in page:
+                lead = LeadRecord.from_place(place)
+                if lead.website:
+                    lead.to_row('user', 'campaign')
+                    rows += 1
+        return rows
+
+    results = {
+        'records': {'dict': measure(dict_records), 'record': measure(lead_records)},
+        'pipeline': {'dict': measure(dict_pipeline), 'stream': measure(stream_pipeline)},
+    }
+    return {'places': count, 'page_size': args.page_size, 'results': results}
+
+
+def print_report(report: Dict):
+    count = report['places']
+    print(f"\n📊 Lead memory - {count} places (page size {report['page_size']})\n")
+    records = report['results']['records']
+    for name, stats in records.items():
+        print(f"   records/{name:<8} {stats['retained'] / 1024:9.1f} KB retained   {stats['retained'] / count:7.0f} B/place")
+    pipeline = report['results']['pipeline']
+    for name, stats in pipeline.items():
+        print(f"   pipeline/{name:<7} {stats['peak'] / 1024:9.1f} KB peak")
+
+    saved = 1 - records['record']['retained'] / records['dict']['retained']
+    peak_saved = 1 - pipeline['stream']['peak'] / pipeline['dict']['peak']
+    print(f"\n   LeadRecord: {saved:.0%} less per place, streaming pipeline: {peak_saved:.0%} lower peak\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory of the crawl pipeline's lead representations")
+    parser.add_argument('--places', type=int, default=1500)
+    parser.add_argument('--page-size', type=int, default=OUTSCRAPER_PAGE_SIZE)
+    parser.add_argument('--json', help="Write the report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Render Benchmark
+Counts static fetches and browser renders per site kind for the render-mode
+logic in ImpressumScraper.scrape_website (services/render_mode.py).
+
+Chrome is replaced by a counting stand-in driver that loads the page from
+the fake-web server, runs the SPA fixture's only script (it writes the email
+into #root); the JS wait after each page load is cut to --render-delay seconds.
+It counts browsers started and pages rendered per site; the run exits with
+status 1 if a page was rendered twice within one scrape, or if a pass with
+detection found fewer emails than the baseline.
+Three passes over the same corpus:
+
+    baseline   detection and per-domain memory disabled (old behaviour)
+    cold       detection on, empty render-mode memory
+    warm       same again - domains are known from the cold pass
+
+Usage (from backend/):
+    python -m benchmarks.render_benchmark
+    python -m benchmarks.render_benchmark --sites 400 --render-delay 1
+"""
+
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+import requests
+
+from benchmarks.crawl_benchmark import create_scraper
+from benchmarks.fake_web import build_corpus, fetch_request_counts, serve_in_background
+from services.logging_config import configure_logging
+from services.sitemap_discovery import SitemapDiscovery
+
+SCRIPT_SRC_REGEX = re.compile(r'<script src="([^"]+)"')
+ROOT_SCRIPT_REGEX = re.compile(r'innerHTML="([^"]*)"')
+
+
+class FakeBrowser:
+    """Stand-in for Chrome: counts browsers started and pages rendered per site"""
+
+    def __init__(self):
+        self.browsers: Counter = Counter()
+        self.renders: Counter = Counter()
+        self.rendered_urls: Counter = Counter()
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def open(self) -> 'FakeDriver':
+        return FakeDriver(self)
+
+    def get(self, host: str, url: str) -> str:
+        with self._lock:
+            self.requests[host] += 1
+        return requests.get(url, timeout=10).text
+
+
+class FakeDriver:
+    """WebDriver subset used by SeleniumSession: get, page_source, quit"""
+
+    def __init__(self, browser: FakeBrowser):
+        self.browser = browser
+        self.page_source = ''
+        self.host = None
+
+    def get(self, url: str) -> None:
+        browser = self.browser
+        host = url.split('/')[2]
+        with browser._lock:
+            if self.host is None:
+                self.host = host
+                browser.browsers[host] += 1
+            browser.renders[host] += 1
+            browser.rendered_urls[url] += 1
+        html = browser.get(host, url)
+        match = SCRIPT_SRC_REGEX.search(html)
+        if match:
+            script = browser.get(host, f"http://{host}{match.group(1)}")
+            content = ROOT_SCRIPT_REGEX.search(script)
+            if content:
+                html = html.replace('<div id="root"></div>', f'<div id="root">{content.group(1)}</div>')
+        self.page_source = html
+
+    def quit(self) -> None:
+        pass
+
+
+def run_pass(name: str, args, sites, detection: bool, render_modes) -> Dict:
+    from services import impressum_scraper, render_mode
+
+    scraper = create_scraper(selenium=True, mx=False)
+    impressum_scraper.SELENIUM_AVAILABLE = True
+    browser = FakeBrowser()
+    scraper._open_browser = browser.open
+    impressum_scraper.SeleniumSession.RENDER_WAIT_SECONDS = args.render_delay
+
+    impressum_scraper.detect_render_need = render_mode.detect_render_need if detection else (lambda *a: None)
+    impressum_scraper.detect_bot_wall = render_mode.detect_bot_wall if detection else (lambda *a: False)
+    impressum_scraper.get_render_modes = lambda: render_modes
+
+    # Robots.txt lookups are cached per class - every pass starts cold
+    SitemapDiscovery._robots_cache.clear()
+
+    before = fetch_request_counts(args.port)
+    started = time.perf_counter()
+    results = scraper.scrape_batch([site.url for site in sites], max_workers=args.workers)
+    elapsed = time.perf_counter() - started
+    after = fetch_request_counts(args.port)
+
+    by_url = {result['url']: result for result in results}
+    by_kind: Dict[str, Counter] = {}
+    for site in sites:
+        counts = by_kind.setdefault(site.kind, Counter())
+        host = site.host
+        counts['sites'] += 1
+        counts['browsers'] += browser.browsers[host]
+        counts['renders'] += browser.renders[host]
+        # Requests made by the stand-in browser are not static fetches
+        counts['static'] += after.get(host, 0) - before.get(host, 0) - browser.requests[host]
+        counts['found'] += by_url.get(site.url, {}).get('email') == site.email
+
+    # Every site is scraped once per pass, so a URL rendered twice is a wasted render
+    duplicates = sum(count - 1 for count in browser.rendered_urls.values() if count > 1)
+    return {'name': name, 'elapsed_s': round(elapsed, 2), 'by_kind': by_kind, 'duplicate_renders': duplicates}
+
+
+def print_pass(report: Dict) -> None:
+    by_kind = report['by_kind']
+    total = sum((counts for counts in by_kind.values()), Counter())
+    print(f"\n🖥️  {report['name']}: {report['elapsed_s']}s, {total['renders']} renders in {total['browsers']} browsers "
+          f"({report['duplicate_renders']} duplicate), {total['static']} static requests, "
+          f"{total['found']}/{total['sites']} emails")
+    print(f"   {'kind':<12}{'sites':>6}{'found':>7}{'static/site':>13}{'browsers/site':>15}{'renders/site':>14}")
+    for kind, counts in sorted(by_kind.items()):
+        sites = counts['sites']
+        print(f"   {kind:<12}{sites:>6}{counts['found']:>7}{counts['static'] / sites:>13.2f}"
+              f"{counts['browsers'] / sites:>15.2f}{counts['renders'] / sites:>14.2f}")
+
+
+class _ForgetfulStore:
+    """Render-mode store that never remembers anything (baseline pass)"""
+
+    def get(self, domain):
+        return None
+
+    def remember(self, domain, mode):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count static fetches and browser renders per site kind")
+    parser.add_argument('--sites', type=int, default=200, help="Number of generated sites")
+    parser.add_argument('--workers', type=int, default=10, help="scrape_batch max_workers")
+    parser.add_argument('--render-delay', type=float, default=0.3, help="Seconds per simulated browser render")
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--bind', default='0.0.0.0', help="Bind address (must accept 127.1.x.y)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Keep Redis out of the measurement (render modes would leak between runs)
+    os.environ.setdefault('REDIS_URL', '')
+    configure_logging('ERROR')
+
+    from services.render_mode import RenderModeStore
+
+    sites = build_corpus(args.sites, args.port, args.seed)
+    with serve_in_background(args.sites, args.port, args.seed, args.bind):
+        render_modes = RenderModeStore()
+        reports = [
+            run_pass('baseline', args, sites, detection=False, render_modes=_ForgetfulStore()),
+            run_pass('cold', args, sites, detection=True, render_modes=render_modes),
+            run_pass('warm', args, sites, detection=True, render_modes=render_modes),
+        ]
+    for report in reports:
+        print_pass(report)
+
+    # Usable as a check: no page may be rendered twice within one scrape, and
+    # detection must not cost emails the baseline finds
+    failed = False
+    duplicates = sum(report['duplicate_renders'] for report in reports)
+    if duplicates:
+        print(f"\n❌ {duplicates} page(s) rendered more than once per scrape")
+        failed = True
+    found = {report['name']: sum(counts['found'] for counts in report['by_kind'].values()) for report in reports}
+    for name in ('cold', 'warm'):
+        if found[name] < found['baseline']:
+            print(f"\n❌ {name} pass found {found[name]} emails, baseline {found['baseline']}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
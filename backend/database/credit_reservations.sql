@@ -0,0 +1,328 @@
+-- =====================================================
+-- CREDIT RESERVATIONS
+-- =====================================================
+-- A job (crawl, email generation) reserves its expected cost once when it
+-- starts and settles the actual usage once when it ends:
+--
+--   reserve_credits            balance -= reserved            (1 profile lock)
+--   settle_credit_reservation  balance += reserved - charged,  (1 profile lock)
+--                              one 'usage' transaction row
+--
+-- instead of one deduct_credits call (and profile row lock) per lead/email.
+-- Reservations of crashed workers expire (expires_at) and are returned to the
+-- balance by release_expired_credit_reservations() - also done per user on
+-- every reserve_credits call.
+
+CREATE TABLE IF NOT EXISTS public.credit_reservations (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    amount NUMERIC(10, 2) NOT NULL CHECK (amount > 0),
+    charged NUMERIC(10, 2) NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'active' CHECK (status IN ('active', 'settled', 'expired')),
+    description TEXT,
+    metadata JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    settled_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_credit_reservations_user_active
+ON public.credit_reservations(user_id, expires_at)
+WHERE status = 'active';
+
+ALTER TABLE public.credit_reservations ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own credit reservations"
+    ON public.credit_reservations FOR SELECT
+    USING (auth.uid() = user_id);
+
+
+-- =====================================================
+-- RESERVE CREDITS FUNCTION
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.reserve_credits(
+    p_user_id UUID,
+    p_amount NUMERIC,
+    p_description TEXT,
+    p_metadata JSONB DEFAULT '{}'::jsonb,
+    p_ttl_minutes INTEGER DEFAULT 180
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_current_balance NUMERIC;
+    v_expired NUMERIC;
+    v_new_balance NUMERIC;
+    v_reservation_id UUID;
+BEGIN
+    -- Validate input
+    IF p_amount <= 0 THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Amount must be positive',
+            'amount', p_amount
+        );
+    END IF;
+
+    -- Lock row for update
+    SELECT credits_balance INTO v_current_balance
+    FROM public.profiles
+    WHERE id = p_user_id
+    FOR UPDATE;
+
+    -- Check if user exists
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'User not found',
+            'user_id', p_user_id
+        );
+    END IF;
+
+    v_current_balance := COALESCE(v_current_balance, 0);
+
+    -- Return expired reservations of this user (jobs that never settled)
+    WITH expired AS (
+        UPDATE public.credit_reservations
+        SET status = 'expired',
+            settled_at = NOW()
+        WHERE user_id = p_user_id
+          AND status = 'active'
+          AND expires_at < NOW()
+        RETURNING amount
+    )
+    SELECT COALESCE(SUM(amount), 0) INTO v_expired FROM expired;
+
+    v_current_balance := v_current_balance + v_expired;
+
+    -- Check sufficient funds
+    IF v_current_balance < p_amount THEN
+        UPDATE public.profiles
+        SET credits_balance = v_current_balance,
+            updated_at = NOW()
+        WHERE id = p_user_id AND v_expired > 0;
+
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Insufficient credits',
+            'current_balance', v_current_balance,
+            'required', p_amount,
+            'missing', p_amount - v_current_balance
+        );
+    END IF;
+
+    v_new_balance := v_current_balance - p_amount;
+
+    UPDATE public.profiles
+    SET credits_balance = v_new_balance,
+        updated_at = NOW()
+    WHERE id = p_user_id;
+
+    INSERT INTO public.credit_reservations (user_id, amount, description, metadata, expires_at)
+    VALUES (p_user_id, p_amount, p_description, p_metadata, NOW() + make_interval(mins => p_ttl_minutes))
+    RETURNING id INTO v_reservation_id;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'reservation_id', v_reservation_id,
+        'amount_reserved', p_amount,
+        'previous_balance', v_current_balance,
+        'new_balance', v_new_balance
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.reserve_credits TO service_role;
+
+
+-- =====================================================
+-- SETTLE CREDIT RESERVATION FUNCTION
+-- =====================================================
+-- Charges the actual usage and returns the rest of the reservation.
+-- Usage above the reservation is taken from the balance as far as it goes
+-- (never below 0); the remainder is reported as 'uncovered'.
+-- p_amount = 0 releases the whole reservation.
+-- With p_items ([{"amount", "description", "metadata"}, ...] summing to p_amount)
+-- each line item gets its own transaction row, all written in one INSERT.
+
+CREATE OR REPLACE FUNCTION public.settle_credit_reservation(
+    p_reservation_id UUID,
+    p_amount NUMERIC,
+    p_description TEXT,
+    p_metadata JSONB DEFAULT '{}'::jsonb,
+    p_items JSONB DEFAULT '[]'::jsonb
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_reservation public.credit_reservations%ROWTYPE;
+    v_current_balance NUMERIC;
+    v_covered NUMERIC;
+    v_overflow NUMERIC;
+    v_charged NUMERIC;
+    v_new_balance NUMERIC;
+    v_transaction_id UUID;
+    v_count INTEGER := 0;
+BEGIN
+    IF p_amount < 0 THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Amount must not be negative',
+            'amount', p_amount
+        );
+    END IF;
+
+    SELECT * INTO v_reservation
+    FROM public.credit_reservations
+    WHERE id = p_reservation_id
+    FOR UPDATE;
+
+    IF NOT FOUND OR v_reservation.status <> 'active' THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Reservation not active',
+            'reservation_id', p_reservation_id,
+            'status', v_reservation.status
+        );
+    END IF;
+
+    -- Lock row for update
+    SELECT COALESCE(credits_balance, 0) INTO v_current_balance
+    FROM public.profiles
+    WHERE id = v_reservation.user_id
+    FOR UPDATE;
+
+    v_covered := LEAST(p_amount, v_reservation.amount);
+    v_overflow := LEAST(p_amount - v_covered, GREATEST(v_current_balance, 0));
+    v_charged := v_covered + v_overflow;
+    v_new_balance := v_current_balance + (v_reservation.amount - v_covered) - v_overflow;
+
+    UPDATE public.profiles
+    SET credits_balance = v_new_balance,
+        updated_at = NOW()
+    WHERE id = v_reservation.user_id;
+
+    UPDATE public.credit_reservations
+    SET status = 'settled',
+        charged = v_charged,
+        settled_at = NOW()
+    WHERE id = p_reservation_id;
+
+    IF v_charged > 0 AND jsonb_array_length(p_items) > 0 THEN
+        -- Line items in order; usage beyond the charged total (uncovered) is cut from the end
+        INSERT INTO public.credit_transactions (user_id, amount, type, description, metadata)
+        SELECT
+            v_reservation.user_id,
+            -item.charged,
+            'usage',
+            COALESCE(item.description, p_description),
+            jsonb_build_object(
+                'reservation_id', p_reservation_id,
+                'reserved', v_reservation.amount,
+                'previous_balance', v_new_balance + v_charged - item.running + item.charged,
+                'new_balance', v_new_balance + v_charged - item.running
+            ) || p_metadata || COALESCE(item.metadata, '{}'::jsonb)
+        FROM (
+            SELECT capped.*, SUM(capped.charged) OVER (ORDER BY capped.ord) AS running
+            FROM (
+                SELECT items.description, items.metadata, items.ord,
+                       LEAST(items.amount, GREATEST(v_charged - (SUM(items.amount) OVER (ORDER BY items.ord) - items.amount), 0)) AS charged
+                FROM ROWS FROM (jsonb_to_recordset(p_items) AS (amount NUMERIC, description TEXT, metadata JSONB))
+                     WITH ORDINALITY AS items(amount, description, metadata, ord)
+            ) capped
+        ) item
+        WHERE item.charged > 0
+        ORDER BY item.ord;
+
+        GET DIAGNOSTICS v_count = ROW_COUNT;
+    ELSIF v_charged > 0 THEN
+        INSERT INTO public.credit_transactions (
+            user_id,
+            amount,
+            type,
+            description,
+            metadata
+        )
+        VALUES (
+            v_reservation.user_id,
+            -v_charged,
+            'usage',
+            p_description,
+            jsonb_build_object(
+                'reservation_id', p_reservation_id,
+                'reserved', v_reservation.amount,
+                'previous_balance', v_new_balance + v_charged,
+                'new_balance', v_new_balance
+            ) || p_metadata
+        )
+        RETURNING id INTO v_transaction_id;
+
+        v_count := 1;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'amount_charged', v_charged,
+        'amount_released', v_reservation.amount - v_covered,
+        'uncovered', p_amount - v_charged,
+        'new_balance', v_new_balance,
+        'transaction_id', v_transaction_id,
+        'transaction_count', v_count
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.settle_credit_reservation TO service_role;
+
+
+-- =====================================================
+-- RELEASE EXPIRED RESERVATIONS FUNCTION
+-- =====================================================
+-- For a scheduled job (pg_cron), e.g. every 15 minutes:
+--   SELECT cron.schedule('release-credit-reservations', '*/15 * * * *',
+--                        'SELECT public.release_expired_credit_reservations()');
+
+CREATE OR REPLACE FUNCTION public.release_expired_credit_reservations()
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH expired AS (
+        UPDATE public.credit_reservations
+        SET status = 'expired',
+            settled_at = NOW()
+        WHERE status = 'active'
+          AND expires_at < NOW()
+        RETURNING user_id, amount
+    ),
+    per_user AS (
+        SELECT user_id, SUM(amount) AS amount, COUNT(*) AS reservations
+        FROM expired
+        GROUP BY user_id
+    ),
+    refunded AS (
+        UPDATE public.profiles p
+        SET credits_balance = COALESCE(p.credits_balance, 0) + per_user.amount,
+            updated_at = NOW()
+        FROM per_user
+        WHERE p.id = per_user.user_id
+        RETURNING per_user.reservations
+    )
+    SELECT COALESCE(SUM(reservations), 0) INTO v_count FROM refunded;
+
+    RETURN v_count;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.release_expired_credit_reservations TO service_role;
+
+-- Refresh schema cache
+NOTIFY pgrst, 'reload schema';
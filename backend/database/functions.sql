@@ -12,7 +12,7 @@
 
 CREATE OR REPLACE FUNCTION public.add_credits(
     p_user_id UUID,
-    p_amount INTEGER,
+    p_amount NUMERIC,
     p_description TEXT,
     p_payment_intent_id TEXT DEFAULT NULL
 )
@@ -21,8 +21,8 @@ LANGUAGE plpgsql
 SECURITY DEFINER
 AS $$
 DECLARE
-    v_current_balance INTEGER;
-    v_new_balance INTEGER;
+    v_current_balance NUMERIC;
+    v_new_balance NUMERIC;
     v_transaction_id UUID;
 BEGIN
     -- Validate input
@@ -102,7 +102,7 @@ GRANT EXECUTE ON FUNCTION public.add_credits TO service_role;
 
 CREATE OR REPLACE FUNCTION public.deduct_credits(
     p_user_id UUID,
-    p_amount INTEGER,
+    p_amount NUMERIC,
     p_description TEXT,
     p_metadata JSONB DEFAULT '{}'::jsonb
 )
@@ -111,8 +111,8 @@ LANGUAGE plpgsql
 SECURITY DEFINER
 AS $$
 DECLARE
-    v_current_balance INTEGER;
-    v_new_balance INTEGER;
+    v_current_balance NUMERIC;
+    v_new_balance NUMERIC;
     v_transaction_id UUID;
 BEGIN
     -- Validate input
@@ -194,6 +194,145 @@ $$;
 GRANT EXECUTE ON FUNCTION public.deduct_credits TO service_role;
 
 
+-- =====================================================
+-- DEDUCT CREDITS BATCH FUNCTION
+-- =====================================================
+-- Deducts several line items in one call: one profile row lock, one balance
+-- update and one INSERT for all transaction rows (amounts are NUMERIC, e.g. 0.5).
+-- p_items: [{"amount": 0.5, "description": "...", "metadata": {...}}, ...]
+
+CREATE OR REPLACE FUNCTION public.deduct_credits_batch(
+    p_user_id UUID,
+    p_items JSONB,
+    p_metadata JSONB DEFAULT '{}'::jsonb
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_current_balance NUMERIC;
+    v_new_balance NUMERIC;
+    v_total NUMERIC;
+    v_count INTEGER;
+    v_invalid BOOLEAN;
+BEGIN
+    -- Validate input
+    SELECT COALESCE(SUM(amount), 0), COUNT(*), COALESCE(bool_or(amount IS NULL OR amount <= 0), false)
+    INTO v_total, v_count, v_invalid
+    FROM jsonb_to_recordset(p_items) AS item(amount NUMERIC);
+
+    IF v_count = 0 OR v_invalid THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Every line item needs a positive amount'
+        );
+    END IF;
+
+    -- Lock row for update (once for all items)
+    SELECT credits_balance INTO v_current_balance
+    FROM public.profiles
+    WHERE id = p_user_id
+    FOR UPDATE;
+
+    -- Check if user exists
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'User not found',
+            'user_id', p_user_id
+        );
+    END IF;
+
+    v_current_balance := COALESCE(v_current_balance, 0);
+
+    -- Check sufficient balance for the whole batch
+    IF v_current_balance < v_total THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Insufficient credits',
+            'current_balance', v_current_balance,
+            'required', v_total,
+            'missing', v_total - v_current_balance
+        );
+    END IF;
+
+    v_new_balance := v_current_balance - v_total;
+
+    UPDATE public.profiles
+    SET credits_balance = v_new_balance,
+        updated_at = NOW()
+    WHERE id = p_user_id;
+
+    -- One row per line item, with the running balance after each
+    INSERT INTO public.credit_transactions (user_id, amount, type, description, metadata)
+    SELECT
+        p_user_id,
+        -item.amount,
+        'usage',
+        item.description,
+        jsonb_build_object(
+            'previous_balance', v_current_balance - item.running + item.amount,
+            'new_balance', v_current_balance - item.running
+        ) || p_metadata || COALESCE(item.metadata, '{}'::jsonb)
+    FROM (
+        SELECT items.amount, items.description, items.metadata, items.ord,
+               SUM(items.amount) OVER (ORDER BY items.ord) AS running
+        FROM ROWS FROM (jsonb_to_recordset(p_items) AS (amount NUMERIC, description TEXT, metadata JSONB))
+             WITH ORDINALITY AS items(amount, description, metadata, ord)
+    ) item
+    ORDER BY item.ord;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'previous_balance', v_current_balance,
+        'new_balance', v_new_balance,
+        'amount_deducted', v_total,
+        'transaction_count', v_count
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.deduct_credits_batch TO service_role;
+
+
+-- =====================================================
+-- CREDIT USAGE SUMMARY FUNCTION
+-- =====================================================
+-- Totals per day/week/month and transaction type for the History page.
+-- Runs with the caller's rights, so RLS limits users to their own rows;
+-- served by idx_credit_transactions_user_created (user_id, created_at).
+
+CREATE OR REPLACE FUNCTION public.get_credit_usage_summary(
+    p_user_id UUID,
+    p_since TIMESTAMP WITH TIME ZONE DEFAULT NOW() - INTERVAL '90 days',
+    p_bucket TEXT DEFAULT 'day'
+)
+RETURNS TABLE (
+    bucket TIMESTAMP WITH TIME ZONE,
+    type TEXT,
+    amount NUMERIC,
+    transactions BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        date_trunc(p_bucket, t.created_at) AS bucket,
+        t.type,
+        SUM(t.amount) AS amount,
+        COUNT(*) AS transactions
+    FROM public.credit_transactions t
+    WHERE t.user_id = p_user_id
+      AND t.created_at >= p_since
+      AND p_bucket IN ('day', 'week', 'month')
+    GROUP BY 1, 2
+    ORDER BY 1 DESC, 2;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_credit_usage_summary TO authenticated, service_role;
+
+
 -- =====================================================
 -- GET USER CREDITS FUNCTION
 -- =====================================================
@@ -202,12 +341,12 @@ GRANT EXECUTE ON FUNCTION public.deduct_credits TO service_role;
 CREATE OR REPLACE FUNCTION public.get_user_credits(
     p_user_id UUID
 )
-RETURNS INTEGER
+RETURNS NUMERIC
 LANGUAGE plpgsql
 SECURITY DEFINER
 AS $$
 DECLARE
-    v_balance INTEGER;
+    v_balance NUMERIC;
 BEGIN
     SELECT credits_balance INTO v_balance
     FROM public.profiles
@@ -228,7 +367,7 @@ GRANT EXECUTE ON FUNCTION public.get_user_credits TO authenticated, service_role
 
 CREATE OR REPLACE FUNCTION public.refund_credits(
     p_user_id UUID,
-    p_amount INTEGER,
+    p_amount NUMERIC,
     p_description TEXT,
     p_original_transaction_id UUID DEFAULT NULL
 )
@@ -237,8 +376,8 @@ LANGUAGE plpgsql
 SECURITY DEFINER
 AS $$
 DECLARE
-    v_current_balance INTEGER;
-    v_new_balance INTEGER;
+    v_current_balance NUMERIC;
+    v_new_balance NUMERIC;
     v_transaction_id UUID;
 BEGIN
     -- Validate input
@@ -17,6 +17,8 @@ CREATE TABLE IF NOT EXISTS public.impressum_cache (
     success BOOLEAN DEFAULT TRUE,
     error_message TEXT,
     metadata JSONB DEFAULT '{}'::jsonb,
+    validators JSONB DEFAULT '{}'::jsonb,
+    revalidated_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
@@ -29,6 +31,10 @@ ON public.impressum_cache(domain);
 CREATE INDEX IF NOT EXISTS idx_impressum_cache_crawled_at 
 ON public.impressum_cache(crawled_at);
 
+-- Index für Background-Revalidierung
+CREATE INDEX IF NOT EXISTS idx_impressum_cache_revalidated_at 
+ON public.impressum_cache(revalidated_at);
+
 -- Index für erfolgreiche Crawls
 CREATE INDEX IF NOT EXISTS idx_impressum_cache_success 
 ON public.impressum_cache(success) WHERE success = true;
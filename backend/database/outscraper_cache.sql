@@ -0,0 +1,66 @@
+-- =====================================================
+-- OUTSCRAPER CACHE TABLE
+-- =====================================================
+-- Stores Google Maps search results to avoid repeated (paid) Outscraper calls.
+-- One row per normalized query|language|region, holding the largest result set
+-- fetched for it (smaller limits are served from a prefix).
+
+CREATE TABLE IF NOT EXISTS public.outscraper_cache (
+    query_key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    language TEXT NOT NULL,
+    region TEXT NOT NULL,
+    result_limit INTEGER NOT NULL,
+    result_count INTEGER NOT NULL,
+    -- Requested fields only, empty values dropped (large values are TOAST-compressed)
+    places JSONB NOT NULL DEFAULT '[]'::jsonb,
+    fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Index für Cleanup abgelaufener Einträge
+CREATE INDEX IF NOT EXISTS idx_outscraper_cache_fetched_at
+ON public.outscraper_cache(fetched_at);
+
+-- Backend only (service role)
+ALTER TABLE public.outscraper_cache ENABLE ROW LEVEL SECURITY;
+
+-- =====================================================
+-- STORE OUTSCRAPER CACHE FUNCTION
+-- =====================================================
+-- Upserts a result set unless the stored one was fetched with a larger limit
+-- and is still fresh: a crawl that stopped after one page must not replace
+-- the larger set other searches are served from.
+
+CREATE OR REPLACE FUNCTION public.store_outscraper_cache(
+    p_query_key TEXT,
+    p_query TEXT,
+    p_language TEXT,
+    p_region TEXT,
+    p_result_limit INTEGER,
+    p_places JSONB,
+    p_ttl_seconds INTEGER
+)
+RETURNS BOOLEAN
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH stored AS (
+        INSERT INTO public.outscraper_cache (query_key, query, language, region, result_limit, result_count, places, fetched_at)
+        VALUES (p_query_key, p_query, p_language, p_region, p_result_limit, jsonb_array_length(p_places), p_places, NOW())
+        ON CONFLICT (query_key) DO UPDATE
+        SET query = EXCLUDED.query,
+            result_limit = EXCLUDED.result_limit,
+            result_count = EXCLUDED.result_count,
+            places = EXCLUDED.places,
+            fetched_at = EXCLUDED.fetched_at
+        WHERE outscraper_cache.result_limit <= EXCLUDED.result_limit
+           OR outscraper_cache.fetched_at < NOW() - make_interval(secs => p_ttl_seconds)
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM stored);
+$$;
+
+GRANT EXECUTE ON FUNCTION public.store_outscraper_cache TO service_role;
+
+-- Refresh schema cache
+NOTIFY pgrst, 'reload schema';
@@ -17,7 +17,7 @@ CREATE TABLE IF NOT EXISTS public.profiles (
     id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
     company_name TEXT NOT NULL,
     full_name TEXT,
-    credits_balance INTEGER DEFAULT 5 NOT NULL CHECK (credits_balance >= 0),
+    credits_balance NUMERIC(10, 2) DEFAULT 5 NOT NULL CHECK (credits_balance >= 0),
     subdomain TEXT UNIQUE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
@@ -62,7 +62,7 @@ CREATE INDEX IF NOT EXISTS leads_created_at_idx ON public.leads(created_at DESC)
 CREATE TABLE IF NOT EXISTS public.credit_transactions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
-    amount INTEGER NOT NULL,
+    amount NUMERIC(10, 2) NOT NULL,
     type TEXT NOT NULL CHECK (type IN ('purchase', 'usage', 'refund', 'bonus')),
     description TEXT,
     metadata JSONB DEFAULT '{}'::jsonb,
@@ -73,6 +73,8 @@ CREATE TABLE IF NOT EXISTS public.credit_transactions (
 CREATE INDEX IF NOT EXISTS credit_transactions_user_id_idx ON public.credit_transactions(user_id);
 CREATE INDEX IF NOT EXISTS credit_transactions_type_idx ON public.credit_transactions(type);
 CREATE INDEX IF NOT EXISTS credit_transactions_created_at_idx ON public.credit_transactions(created_at DESC);
+-- History page and get_credit_usage_summary (one user's rows by time)
+CREATE INDEX IF NOT EXISTS idx_credit_transactions_user_created ON public.credit_transactions(user_id, created_at DESC);
 
 -- =====================================================
 -- ROW LEVEL SECURITY (RLS) POLICIES
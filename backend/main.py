@@ -1,6 +1,7 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Import routes
@@ -11,9 +12,14 @@ from routes.impressum import router as impressum_router
 from routes.legal import router as legal_router
 from routes.profile import router as profile_router
 from routes.email_generation import router as email_generation_router
+from services.impressum_cache import run_cache_refresher
+from services.async_db import get_async_db
+from services.metrics import render_metrics
+from services.logging_config import configure_logging
 
 # Load environment variables
 load_dotenv()
+configure_logging()
 
 # Create FastAPI app
 app = FastAPI(
@@ -39,6 +45,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Report database round trips per request when running against the local stand-in
+if os.getenv("SUPABASE_BACKEND", "supabase").lower() == "local":
+    from fastapi import Request
+    from services.supabase_client import get_supabase_client
+
+    @app.middleware("http")
+    async def count_db_round_trips(request: Request, call_next):
+        with get_supabase_client().stats.scope() as scope:
+            response = await call_next(request)
+        response.headers["X-DB-Round-Trips"] = str(scope.round_trips)
+        return response
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(payments_router)
@@ -49,6 +67,19 @@ app.include_router(profile_router)
 app.include_router(email_generation_router)
 
 
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start optional background jobs (enable on ONE instance only)"""
+    if os.getenv("IMPRESSUM_REFRESHER_ENABLED", "false").lower() == "true":
+        asyncio.create_task(run_cache_refresher())
+
+
+@app.on_event("shutdown")
+async def stop_db_pool():
+    """Release the database thread pool"""
+    get_async_db().shutdown()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -59,6 +90,13 @@ async def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (per-stage latencies, fetch bytes, retries, fallbacks, cache hits)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
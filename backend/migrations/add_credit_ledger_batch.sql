@@ -0,0 +1,296 @@
+-- Migration: Decimal-aware, batched credit ledger
+-- Description: deduct_credits_batch charges several NUMERIC line items with one
+-- profiles row lock and one INSERT; settle_credit_reservation writes its line
+-- items the same way; get_credit_usage_summary aggregates the History page,
+-- backed by an index on credit_transactions(user_id, created_at)
+-- Requires: update_credits_to_decimal.sql, create_credit_reservations.sql
+
+-- Index for one user's transactions by time (History page, usage summary)
+CREATE INDEX IF NOT EXISTS idx_credit_transactions_user_created
+ON public.credit_transactions(user_id, created_at DESC);
+
+-- =====================================================
+-- DEDUCT CREDITS BATCH FUNCTION
+-- =====================================================
+-- Deducts several line items in one call: one profile row lock, one balance
+-- update and one INSERT for all transaction rows (amounts are NUMERIC, e.g. 0.5).
+-- p_items: [{"amount": 0.5, "description": "...", "metadata": {...}}, ...]
+
+CREATE OR REPLACE FUNCTION public.deduct_credits_batch(
+    p_user_id UUID,
+    p_items JSONB,
+    p_metadata JSONB DEFAULT '{}'::jsonb
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_current_balance NUMERIC;
+    v_new_balance NUMERIC;
+    v_total NUMERIC;
+    v_count INTEGER;
+    v_invalid BOOLEAN;
+BEGIN
+    -- Validate input
+    SELECT COALESCE(SUM(amount), 0), COUNT(*), COALESCE(bool_or(amount IS NULL OR amount <= 0), false)
+    INTO v_total, v_count, v_invalid
+    FROM jsonb_to_recordset(p_items) AS item(amount NUMERIC);
+
+    IF v_count = 0 OR v_invalid THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Every line item needs a positive amount'
+        );
+    END IF;
+
+    -- Lock row for update (once for all items)
+    SELECT credits_balance INTO v_current_balance
+    FROM public.profiles
+    WHERE id = p_user_id
+    FOR UPDATE;
+
+    -- Check if user exists
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'User not found',
+            'user_id', p_user_id
+        );
+    END IF;
+
+    v_current_balance := COALESCE(v_current_balance, 0);
+
+    -- Check sufficient balance for the whole batch
+    IF v_current_balance < v_total THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Insufficient credits',
+            'current_balance', v_current_balance,
+            'required', v_total,
+            'missing', v_total - v_current_balance
+        );
+    END IF;
+
+    v_new_balance := v_current_balance - v_total;
+
+    UPDATE public.profiles
+    SET credits_balance = v_new_balance,
+        updated_at = NOW()
+    WHERE id = p_user_id;
+
+    -- One row per line item, with the running balance after each
+    INSERT INTO public.credit_transactions (user_id, amount, type, description, metadata)
+    SELECT
+        p_user_id,
+        -item.amount,
+        'usage',
+        item.description,
+        jsonb_build_object(
+            'previous_balance', v_current_balance - item.running + item.amount,
+            'new_balance', v_current_balance - item.running
+        ) || p_metadata || COALESCE(item.metadata, '{}'::jsonb)
+    FROM (
+        SELECT items.amount, items.description, items.metadata, items.ord,
+               SUM(items.amount) OVER (ORDER BY items.ord) AS running
+        FROM ROWS FROM (jsonb_to_recordset(p_items) AS (amount NUMERIC, description TEXT, metadata JSONB))
+             WITH ORDINALITY AS items(amount, description, metadata, ord)
+    ) item
+    ORDER BY item.ord;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'previous_balance', v_current_balance,
+        'new_balance', v_new_balance,
+        'amount_deducted', v_total,
+        'transaction_count', v_count
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.deduct_credits_batch TO service_role;
+
+
+-- =====================================================
+-- CREDIT USAGE SUMMARY FUNCTION
+-- =====================================================
+-- Totals per day/week/month and transaction type for the History page.
+-- Runs with the caller's rights, so RLS limits users to their own rows;
+-- served by idx_credit_transactions_user_created (user_id, created_at).
+
+CREATE OR REPLACE FUNCTION public.get_credit_usage_summary(
+    p_user_id UUID,
+    p_since TIMESTAMP WITH TIME ZONE DEFAULT NOW() - INTERVAL '90 days',
+    p_bucket TEXT DEFAULT 'day'
+)
+RETURNS TABLE (
+    bucket TIMESTAMP WITH TIME ZONE,
+    type TEXT,
+    amount NUMERIC,
+    transactions BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        date_trunc(p_bucket, t.created_at) AS bucket,
+        t.type,
+        SUM(t.amount) AS amount,
+        COUNT(*) AS transactions
+    FROM public.credit_transactions t
+    WHERE t.user_id = p_user_id
+      AND t.created_at >= p_since
+      AND p_bucket IN ('day', 'week', 'month')
+    GROUP BY 1, 2
+    ORDER BY 1 DESC, 2;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_credit_usage_summary TO authenticated, service_role;
+
+
+-- Signature gains p_items
+DROP FUNCTION IF EXISTS public.settle_credit_reservation(UUID, NUMERIC, TEXT, JSONB);
+
+-- =====================================================
+-- SETTLE CREDIT RESERVATION FUNCTION
+-- =====================================================
+-- Charges the actual usage and returns the rest of the reservation.
+-- Usage above the reservation is taken from the balance as far as it goes
+-- (never below 0); the remainder is reported as 'uncovered'.
+-- p_amount = 0 releases the whole reservation.
+-- With p_items ([{"amount", "description", "metadata"}, ...] summing to p_amount)
+-- each line item gets its own transaction row, all written in one INSERT.
+
+CREATE OR REPLACE FUNCTION public.settle_credit_reservation(
+    p_reservation_id UUID,
+    p_amount NUMERIC,
+    p_description TEXT,
+    p_metadata JSONB DEFAULT '{}'::jsonb,
+    p_items JSONB DEFAULT '[]'::jsonb
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_reservation public.credit_reservations%ROWTYPE;
+    v_current_balance NUMERIC;
+    v_covered NUMERIC;
+    v_overflow NUMERIC;
+    v_charged NUMERIC;
+    v_new_balance NUMERIC;
+    v_transaction_id UUID;
+    v_count INTEGER := 0;
+BEGIN
+    IF p_amount < 0 THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Amount must not be negative',
+            'amount', p_amount
+        );
+    END IF;
+
+    SELECT * INTO v_reservation
+    FROM public.credit_reservations
+    WHERE id = p_reservation_id
+    FOR UPDATE;
+
+    IF NOT FOUND OR v_reservation.status <> 'active' THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Reservation not active',
+            'reservation_id', p_reservation_id,
+            'status', v_reservation.status
+        );
+    END IF;
+
+    -- Lock row for update
+    SELECT COALESCE(credits_balance, 0) INTO v_current_balance
+    FROM public.profiles
+    WHERE id = v_reservation.user_id
+    FOR UPDATE;
+
+    v_covered := LEAST(p_amount, v_reservation.amount);
+    v_overflow := LEAST(p_amount - v_covered, GREATEST(v_current_balance, 0));
+    v_charged := v_covered + v_overflow;
+    v_new_balance := v_current_balance + (v_reservation.amount - v_covered) - v_overflow;
+
+    UPDATE public.profiles
+    SET credits_balance = v_new_balance,
+        updated_at = NOW()
+    WHERE id = v_reservation.user_id;
+
+    UPDATE public.credit_reservations
+    SET status = 'settled',
+        charged = v_charged,
+        settled_at = NOW()
+    WHERE id = p_reservation_id;
+
+    IF v_charged > 0 AND jsonb_array_length(p_items) > 0 THEN
+        -- Line items in order; usage beyond the charged total (uncovered) is cut from the end
+        INSERT INTO public.credit_transactions (user_id, amount, type, description, metadata)
+        SELECT
+            v_reservation.user_id,
+            -item.charged,
+            'usage',
+            COALESCE(item.description, p_description),
+            jsonb_build_object(
+                'reservation_id', p_reservation_id,
+                'reserved', v_reservation.amount,
+                'previous_balance', v_new_balance + v_charged - item.running + item.charged,
+                'new_balance', v_new_balance + v_charged - item.running
+            ) || p_metadata || COALESCE(item.metadata, '{}'::jsonb)
+        FROM (
+            SELECT capped.*, SUM(capped.charged) OVER (ORDER BY capped.ord) AS running
+            FROM (
+                SELECT items.description, items.metadata, items.ord,
+                       LEAST(items.amount, GREATEST(v_charged - (SUM(items.amount) OVER (ORDER BY items.ord) - items.amount), 0)) AS charged
+                FROM ROWS FROM (jsonb_to_recordset(p_items) AS (amount NUMERIC, description TEXT, metadata JSONB))
+                     WITH ORDINALITY AS items(amount, description, metadata, ord)
+            ) capped
+        ) item
+        WHERE item.charged > 0
+        ORDER BY item.ord;
+
+        GET DIAGNOSTICS v_count = ROW_COUNT;
+    ELSIF v_charged > 0 THEN
+        INSERT INTO public.credit_transactions (
+            user_id,
+            amount,
+            type,
+            description,
+            metadata
+        )
+        VALUES (
+            v_reservation.user_id,
+            -v_charged,
+            'usage',
+            p_description,
+            jsonb_build_object(
+                'reservation_id', p_reservation_id,
+                'reserved', v_reservation.amount,
+                'previous_balance', v_new_balance + v_charged,
+                'new_balance', v_new_balance
+            ) || p_metadata
+        )
+        RETURNING id INTO v_transaction_id;
+
+        v_count := 1;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'amount_charged', v_charged,
+        'amount_released', v_reservation.amount - v_covered,
+        'uncovered', p_amount - v_charged,
+        'new_balance', v_new_balance,
+        'transaction_id', v_transaction_id,
+        'transaction_count', v_count
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.settle_credit_reservation TO service_role;
+
+-- Refresh schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,16 @@
+-- Migration: Conditional re-crawl support for impressum_cache
+-- Description: Stores HTTP validators (ETag, Last-Modified, body hash) per page
+-- and the time of the last successful revalidation (extends the 90-day TTL)
+
+ALTER TABLE public.impressum_cache
+ADD COLUMN IF NOT EXISTS validators JSONB DEFAULT '{}'::jsonb;
+
+ALTER TABLE public.impressum_cache
+ADD COLUMN IF NOT EXISTS revalidated_at TIMESTAMP;
+
+-- Index for the background refresher (finds entries close to expiry)
+CREATE INDEX IF NOT EXISTS idx_impressum_cache_revalidated_at
+ON public.impressum_cache(revalidated_at);
+
+-- Refresh schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,49 @@
+-- Migration: Crawl checkpoints
+-- Description: Per-campaign crawl progress (search plan, processed places,
+-- Deep Scraper queue) so interrupted crawls resume without repeating paid
+-- Outscraper calls or finished enrichment
+
+CREATE TABLE IF NOT EXISTS public.crawl_checkpoints (
+    campaign_id UUID PRIMARY KEY REFERENCES public.campaigns(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    state JSONB NOT NULL DEFAULT '{}'::jsonb,
+    processed_place_ids TEXT[] NOT NULL DEFAULT '{}',
+    scraped_urls TEXT[] NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Backend only (service role)
+ALTER TABLE public.crawl_checkpoints ENABLE ROW LEVEL SECURITY;
+
+
+-- =====================================================
+-- SAVE CRAWL CHECKPOINT FUNCTION
+-- =====================================================
+-- Replaces the state and appends only the place IDs / URLs added since the
+-- last save, so a save stays small however large the campaign gets.
+
+CREATE OR REPLACE FUNCTION public.save_crawl_checkpoint(
+    p_campaign_id UUID,
+    p_user_id UUID,
+    p_state JSONB,
+    p_processed TEXT[] DEFAULT '{}',
+    p_scraped TEXT[] DEFAULT '{}'
+)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    INSERT INTO public.crawl_checkpoints (campaign_id, user_id, state, processed_place_ids, scraped_urls)
+    VALUES (p_campaign_id, p_user_id, p_state, p_processed, p_scraped)
+    ON CONFLICT (campaign_id) DO UPDATE
+    SET state = EXCLUDED.state,
+        processed_place_ids = crawl_checkpoints.processed_place_ids || EXCLUDED.processed_place_ids,
+        scraped_urls = crawl_checkpoints.scraped_urls || EXCLUDED.scraped_urls,
+        updated_at = NOW();
+$$;
+
+GRANT EXECUTE ON FUNCTION public.save_crawl_checkpoint TO service_role;
+
+-- Refresh schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,23 @@
+-- Migration: Outscraper result cache
+-- Description: Caches Google Maps search results per normalized query, language
+-- and region so repeated searches skip the paid, multi-minute Outscraper call
+
+CREATE TABLE IF NOT EXISTS public.outscraper_cache (
+    query_key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    language TEXT NOT NULL,
+    region TEXT NOT NULL,
+    result_limit INTEGER NOT NULL,
+    result_count INTEGER NOT NULL,
+    places JSONB NOT NULL DEFAULT '[]'::jsonb,
+    fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_outscraper_cache_fetched_at
+ON public.outscraper_cache(fetched_at);
+
+-- Backend only (service role)
+ALTER TABLE public.outscraper_cache ENABLE ROW LEVEL SECURITY;
+
+-- Refresh schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,122 @@
+"""
+Re-run email/metadata extraction over the page archive and update
+impressum_cache and leads without re-crawling any website.
+
+Usage:
+    python reextract_archive.py                      # all archived domains
+    python reextract_archive.py --domain example.de  # single domain
+    python reextract_archive.py --workers 8 --dry-run
+"""
+
+import argparse
+import concurrent.futures
+import os
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.page_archive import get_page_archive
+from services.impressum_scraper import get_impressum_scraper
+
+
+def _reextract_domain(domain: str) -> Optional[Dict]:
+    """Worker: load manifest + archived pages for a domain and run the extractors"""
+    scraper = get_impressum_scraper()
+    manifest = scraper.archive.get_manifest(domain)
+    if not manifest:
+        return None
+    return scraper.extract_from_archive(manifest)
+
+
+def _apply_results(results: List[Dict], dry_run: bool = False) -> int:
+    """Write re-extracted results to impressum_cache and leads, returns number of changed domains"""
+    from services.supabase_client import get_supabase_client
+    supabase = get_supabase_client()
+
+    domains = [r['domain'] for r in results]
+    cache_res = supabase.table('impressum_cache').select('domain, email, email_verified').in_('domain', domains).execute()
+    cached = {row['domain']: row for row in (cache_res.data or [])}
+
+    changed = 0
+    for result in results:
+        previous = cached.get(result['domain'], {})
+        email_changed = previous.get('email') != result['email']
+        if email_changed:
+            changed += 1
+            print(f"✏️  {result['domain']}: {previous.get('email')} -> {result['email']}")
+
+        if dry_run:
+            continue
+
+        # MX checks are not replayed, so only keep the verified flag if the email did not change
+        verified = previous.get('email_verified', False) if not email_changed else False
+
+        supabase.table('impressum_cache').upsert({
+            "domain": result['domain'],
+            "website": result['url'],
+            "email": result['email'],
+            "email_verified": verified,
+            "is_personal": result['is_personal'],
+            "all_emails": result['all_emails'],
+            "scraped_from": result['scraped_from'],
+            "success": result['success'],
+            "error_message": result['error']
+        }, on_conflict='domain').execute()
+
+        supabase.table('leads').update({
+            'meta_description': result['meta_description'],
+            'meta_keywords': result['meta_keywords'],
+            'services': result['services'],
+            'about_text': result['about_text']
+        }).eq('website', result['url']).execute()
+
+        # Never overwrite emails that came from Outscraper or were entered manually
+        if result['email']:
+            supabase.table('leads').update({
+                'email': result['email'],
+                'email_source': 'impressum_crawler',
+                'email_verified': verified
+            }).eq('website', result['url']).or_('email.is.null,email_source.eq.impressum_crawler').execute()
+
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract emails and metadata from archived pages")
+    parser.add_argument('--domain', action='append', help="Only re-extract this domain (repeatable)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="Number of worker processes")
+    parser.add_argument('--batch-size', type=int, default=200, help="Results per database batch")
+    parser.add_argument('--dry-run', action='store_true', help="Only print changes, do not write to the database")
+    args = parser.parse_args()
+
+    archive = get_page_archive()
+    if archive is None:
+        print("❌ Page archive disabled - set PAGE_ARCHIVE_BACKEND")
+        return
+
+    domains = args.domain or archive.domains()
+    print(f"🔁 Re-extracting {len(domains)} archived domains with {args.workers} workers")
+
+    processed = 0
+    changed = 0
+    batch = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for result in executor.map(_reextract_domain, domains, chunksize=16):
+            if result is None:
+                continue
+            processed += 1
+            batch.append(result)
+            if len(batch) >= args.batch_size:
+                changed += _apply_results(batch, dry_run=args.dry_run)
+                batch = []
+
+    if batch:
+        changed += _apply_results(batch, dry_run=args.dry_run)
+
+    print(f"✅ Re-extraction finished. {processed} domains processed, {changed} emails changed")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,37 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from pydantic import BaseModel
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 from datetime import datetime
 
+from config.pricing import get_campaign_price
 from services.supabase_client import get_supabase_client
+from services.async_db import db_execute
+from services.config_cache import cache_campaign, get_profile, invalidate_campaign
 from services.outscraper_service import get_outscraper_service
+from services.search_planner import SearchPlanner, place_key
+from services.crawl_checkpoint import CRAWL_CHECKPOINT_SCRAPE_CHUNK, CrawlCheckpoint, load_crawl_checkpoint
+from services.cancellation import CRAWL_DEADLINE_MINUTES, CrawlCancelled, get_crawl_registry
+from services.credits import CREDIT_RESERVATION_TTL_MINUTES, CreditReservation, InsufficientCreditsError, reserve_credits
+from services.lead_filter import LeadFilter
+from services.lead_record import LeadRecord
 from services.impressum_scraper import get_impressum_scraper
+from services.metrics import track_stage, timed_stage
+from services.logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/campaigns", tags=["Campaigns"])
 
+CREDITS_PER_LEAD = get_campaign_price('lead_generation')
+CREDITS_PER_ENRICHMENT = 0.5
+# A crawl must stop and settle well before its credit reservation expires -
+# an expired reservation is refunded in full and the crawl would be free.
+# Short reservation TTLs keep half of it as the limit rather than none.
+CRAWL_MAX_DEADLINE_MINUTES = max(CREDIT_RESERVATION_TTL_MINUTES - 15, CREDIT_RESERVATION_TTL_MINUTES / 2)
+
 # Pydantic Models
 class CampaignCreate(BaseModel):
     user_id: str
@@ -22,159 +44,155 @@ class CrawlRequest(BaseModel):
     campaign_id: str
     user_id: str
     location: str
-    radius: int  # Not used by Outscraper, kept for compatibility
+    radius: int  # Meters - large searches are split into tiles within this radius
     keywords: str
     target_lead_count: int = 10
     min_rating: Optional[float] = 0
     min_reviews: Optional[int] = 0
+    # Wall-clock limit, default CRAWL_DEADLINE_MINUTES
+    deadline_minutes: Optional[float] = Field(None, gt=0, le=CRAWL_MAX_DEADLINE_MINUTES)
 
 # Background Task for Crawling with Outscraper
-async def crawl_with_outscraper(campaign_id: str, user_id: str, request: CrawlRequest):
+@timed_stage('campaign')
+async def crawl_with_outscraper(
+    campaign_id: str,
+    user_id: str,
+    request: CrawlRequest,
+    reservation: Optional[CreditReservation] = None,
+    checkpoint: Optional[CrawlCheckpoint] = None
+):
     supabase = get_supabase_client()
     
     # Update status to crawling
-    supabase.table('campaigns').update({'status': 'crawling'}).eq('id', campaign_id).execute()
+    await db_execute(supabase.table('campaigns').update({'status': 'crawling'}).eq('id', campaign_id))
+    invalidate_campaign(campaign_id)
+    
+    # DELETE / cancel and the deadline stop the crawl through this token
+    deadline_minutes = request.deadline_minutes or min(CRAWL_DEADLINE_MINUTES, CRAWL_MAX_DEADLINE_MINUTES)
+    token = get_crawl_registry().start(campaign_id, deadline_minutes * 60)
+    
+    pages = None
+    
+    # Progress is saved as the crawl runs - a failed crawl continues from here (resume_crawl)
+    fresh_start = checkpoint is None
+    if fresh_start:
+        checkpoint = CrawlCheckpoint(campaign_id, user_id, request.model_dump())
+    else:
+        logger.info("⏯️  Resuming crawl for campaign %s (stage: %s, %d leads, %d places processed)",
+                    campaign_id, checkpoint.stage, checkpoint.leads_added, len(checkpoint.processed))
     
     try:
-        print(f"🔍 Starting Outscraper crawl for campaign {campaign_id}")
-        print(f"📍 Location: {request.location}, Keywords: {request.keywords}")
-        print(f"🎯 Target: {request.target_lead_count} leads")
-
-        # Get Outscraper service
-        outscraper = get_outscraper_service()
-        
-        # Build search query with radius hint
-        # Outscraper doesn't have direct radius param, but we can request more results
-        # and rely on Google's natural geographic sorting
-        radius_km = request.radius / 1000  # Convert meters to km
-        query = f"{request.keywords} in {request.location}"
-        
-        # Request 3x the target to account for filtering (quality, duplicates, etc.)
-        # This ensures we get enough results even after filtering
-        search_limit = min(request.target_lead_count * 3, 500)
+        if reservation is None:
+            reservation = await reserve_crawl_credits(supabase, campaign_id, user_id, request, checkpoint.leads_added)
         
-        print(f"🌍 Radius: {radius_km}km (requesting {search_limit} results for filtering)")
-        
-        # Search places with Outscraper
-        places = outscraper.search_places(
-            query=query,
-            limit=search_limit
-        )
+        if fresh_start:
+            # Saves append to the stored place IDs and URLs - drop those of an earlier
+            # run, or resuming this one would skip places only that run had seen
+            await checkpoint.delete(supabase)
         
-        print(f"✅ Outscraper returned {len(places)} places")
-        
-        leads_added = 0
-        
-        # Process results
-        for place in places:
-            if leads_added >= request.target_lead_count:
-                print(f"🎯 Reached target lead count: {request.target_lead_count}")
-                break
-            
-            # Normalize place data
-            normalized = outscraper.normalize_place_data(place)
-            
-            # Quality filter: Skip leads without essential data
-            if not normalized.get('name'):
-                print(f"⏭️  Skipping - no name")
-                continue
-            
-            # User Requirement: Skip leads without website
-            if not normalized.get('website'):
-                print(f"⏭️  Skipping {normalized.get('name')} - no website")
-                continue
-            
-            if not normalized.get('address') and not normalized.get('city'):
-                print(f"⏭️  Skipping {normalized.get('name')} - no address")
-                continue
+        if checkpoint.stage == 'search':
+            logger.info("🔍 Starting Outscraper crawl for campaign %s", campaign_id)
+            logger.info("📍 Location: %s, Keywords: %s", request.location, request.keywords)
+            logger.info("🎯 Target: %d leads", request.target_lead_count)
+
+            # Get Outscraper service
+            outscraper = get_outscraper_service()
             
-            # Must have at least phone OR website OR email
-            if not normalized.get('phone') and not normalized.get('website') and not normalized.get('email'):
-                print(f"⏭️  Skipping {normalized.get('name')} - no contact info")
-                continue
+            radius_km = request.radius / 1000  # Convert meters to km
             
-            # Filter by rating/reviews
-            rating = normalized.get('rating') or 0
-            reviews = normalized.get('reviews_count') or 0
+            # Request 3x the target to account for filtering (quality, duplicates, etc.)
+            # This ensures we get enough results even after filtering
+            search_limit = request.target_lead_count * 3
             
-            if rating < (request.min_rating or 0):
-                print(f"⏭️  Skipping {normalized.get('name')} - rating too low ({rating})")
-                continue
+            logger.info("🌍 Radius: %skm (requesting %d results for filtering)", radius_km, search_limit)
             
-            if reviews < (request.min_reviews or 0):
-                print(f"⏭️  Skipping {normalized.get('name')} - not enough reviews ({reviews})")
-                continue
+            # One query for small targets, tiles across the radius for large ones.
+            # Places arrive page by page, so filtering and inserting start on the first
+            # page and no further pages are fetched once the target is met.
+            # Seed pages, tiles and places of an earlier run are not fetched/yielded again.
+            # The planner advances its progress when it yields a page - the checkpoint
+            # only takes it over once that page is fully processed.
+            search_progress = checkpoint.search.copy()
+            pages = SearchPlanner(outscraper).iter_search(
+                keywords=request.keywords,
+                location=request.location,
+                radius_m=request.radius,
+                wanted=search_limit,
+                progress=search_progress,
+                seen=checkpoint.processed,
+                cancel=token
+            )
             
-            # Check for duplicate place_id
-            place_id = normalized.get('place_id')
+            lead_filter = LeadFilter(request.min_rating, request.min_reviews)
             
-            # Extract domain for deduplication
-            website = normalized.get('website')
-            domain = None
-            if website:
-                from urllib.parse import urlparse
-                try:
-                    domain = urlparse(website).netloc.replace('www.', '')
-                except:
-                    domain = None
-
-            # 3-Tier Deduplication Check
-            # Check if lead already exists for this user (Place ID, Domain, or Email)
-            try:
-                dup_check = supabase.rpc('check_duplicate_lead', {
-                    'p_user_id': user_id,
-                    'p_place_id': place_id,
-                    'p_domain': domain,
-                    'p_email': normalized.get('email')
-                }).execute()
+            # Process results (blocking HTTP in next() - keep it off the event loop)
+            async for page in iterate_in_threadpool(pages):
+                token.raise_if_cancelled()
+                checkpoint.places_received += len(page)
                 
-                if dup_check.data and dup_check.data[0]['is_duplicate']:
-                    reason = dup_check.data[0]['duplicate_reason']
-                    print(f"♻️  Skipping {normalized.get('name')} - Duplicate found by {reason}")
-                    continue
-            except Exception as e:
-                print(f"⚠️  Deduplication check failed: {str(e)}")
-                # Continue cautiously or skip? Let's skip to be safe
-                continue
-            
-            # Insert Lead
-            lead_data = {
-                "user_id": user_id,
-                "campaign_id": campaign_id,
-                "company_name": normalized.get('name'),
-                "address": normalized.get('address'),  # Add address field
-                "city": normalized.get('city'),
-                "phone": normalized.get('phone'),
-                "website": normalized.get('website'),
-                "email": normalized.get('email'),  # Email from Outscraper!
-                "email_source": "outscraper" if normalized.get('email') else None,
-                "email_verified": False,
-                "lead_score": int((rating or 0) * 20),  # 5 stars = 100 score
-                "status": "new",
-                "metadata": {
-                    "place_id": place_id,
-                    "rating": rating,
-                    "reviews": reviews,
-                    "address": normalized.get('address'),
-                    "latitude": normalized.get('latitude'),
-                    "longitude": normalized.get('longitude'),
-                    "category": normalized.get('category'),
-                    "verified": normalized.get('verified'),
-                    "source": "outscraper"
-                }
-            }
-            
-            email_info = f"(Email: {normalized.get('email')})" if normalized.get('email') else "(No email)"
-            print(f"💾 Inserting lead: {normalized.get('name')} {email_info}")
+                # Quality filters on the whole page - only survivors reach dedup and insert.
+                # Compact records: the Outscraper payload is not kept beyond this page.
+                accepted, page_skipped = lead_filter.apply([LeadRecord.from_place(place) for place in page])
+                checkpoint.skipped.update(page_skipped)
+                logger.debug("⏭️  Page of %d places: %d accepted, skipped %s", len(page), len(accepted), dict(page_skipped))
+                
+                for lead in accepted:
+                    if checkpoint.leads_added >= request.target_lead_count:
+                        break
+                    token.raise_if_cancelled()
+
+                    # 3-Tier Deduplication Check
+                    # Check if lead already exists for this user (Place ID, Domain, or Email)
+                    try:
+                        dup_check = await db_execute(supabase.rpc('check_duplicate_lead', {
+                            'p_user_id': user_id,
+                            'p_place_id': lead.place_id,
+                            'p_domain': lead.domain,
+                            'p_email': lead.email
+                        }))
+                    
+                        if dup_check.data and dup_check.data[0]['is_duplicate']:
+                            reason = dup_check.data[0]['duplicate_reason']
+                            logger.debug("♻️  Skipping %s - Duplicate found by %s", lead.name, reason, extra=SAMPLED)
+                            checkpoint.skipped['duplicate'] += 1
+                            continue
+                    except Exception as e:
+                        logger.warning("⚠️  Deduplication check failed: %s", e)
+                        # Continue cautiously or skip? Let's skip to be safe
+                        checkpoint.skipped['dedup_failed'] += 1
+                        continue
+                
+                    # Insert Lead
+                    logger.debug("💾 Inserting lead: %s", lead.name, extra={**SAMPLED, 'email': lead.email})
+                
+                    try:
+                        with track_stage('db_write'):
+                            await db_execute(supabase.table('leads').insert(lead.to_row(user_id, campaign_id)))
+                        checkpoint.leads_added += 1
+                        # 1 credit per lead, settled with the reservation at the end
+                        reservation.charge(CREDITS_PER_LEAD, 'leads')
+                    except Exception as e:
+                        logger.warning("⚠️  Failed to insert lead %s: %s", lead.name, e)
+                        checkpoint.skipped['insert_failed'] += 1
+                        continue
+                
+                # The whole page is handled - a resumed crawl continues after it
+                checkpoint.mark_processed(place_key(place) for place in page)
+                checkpoint.search = search_progress.copy()
+                
+                if checkpoint.leads_added >= request.target_lead_count:
+                    logger.info("🎯 Reached target lead count: %d", request.target_lead_count)
+                    break
+                
+                await checkpoint.save(supabase)
             
-            try:
-                supabase.table('leads').insert(lead_data).execute()
-                leads_added += 1
-            except Exception as e:
-                print(f"⚠️  Failed to insert lead {normalized.get('name')}: {str(e)}")
-                continue
+            await run_in_threadpool(pages.close)
+            logger.info("✅ Outscraper returned %d places (skipped: %s)", checkpoint.places_received, dict(checkpoint.skipped))
+                
+            logger.info("✅ Crawling completed! Added %d leads", checkpoint.leads_added)
             
-        print(f"✅ Crawling completed! Added {leads_added} leads")
+            checkpoint.stage = 'enrich'
+            await checkpoint.save(supabase)
         
         # ---------------------------------------------------------
         # DEEP SCRAPER INTEGRATION
@@ -182,101 +200,152 @@ async def crawl_with_outscraper(campaign_id: str, user_id: str, request: CrawlRe
         # Find leads from this campaign that have website but NO email
         # This includes leads we just added + potentially others in this campaign
         
-        print("🔍 Checking for leads that need Deep Scraping...")
+        logger.info("🔍 Checking for leads that need Deep Scraping...")
         
-        leads_to_scrape_res = supabase.table('leads') \
-            .select('id, website') \
-            .eq('campaign_id', campaign_id) \
-            .neq('website', None) \
-            .is_('email', 'null') \
-            .execute()
+        leads_to_scrape_res = await db_execute(
+            supabase.table('leads')
+            .select('id, website')
+            .eq('campaign_id', campaign_id)
+            .neq('website', None)
+            .is_('email', 'null')
+        )
             
-        leads_to_scrape = leads_to_scrape_res.data or []
+        # Websites scraped before an interruption are not scraped again
+        urls = list(dict.fromkeys(
+            lead['website'] for lead in (leads_to_scrape_res.data or []) if lead['website'] not in checkpoint.scraped
+        ))
         
-        if leads_to_scrape:
-            print(f"⚡ Found {len(leads_to_scrape)} leads with website but no email. Starting Deep Scraper...")
-            
-            # Extract URLs
-            urls = [lead['website'] for lead in leads_to_scrape]
+        if urls:
+            logger.info("⚡ Found %d websites without email. Starting Deep Scraper...", len(urls))
             
             # Get Scraper
             scraper = get_impressum_scraper()
             
-            # Run batch scrape
-            scrape_results = scraper.scrape_batch(urls, max_workers=10)
-            
-            found_count = 0
-            
-            # Update leads with results
-            for result in scrape_results:
-                # Save email if found, even if verification failed
-                # We want to show the email to the user even if MX check failed
-                if result.get('email'):
-                    # Update all leads with this website in this campaign
-                    supabase.table('leads').update({
-                        'email': result['email'],
-                        'email_source': 'impressum_crawler',
-                        'email_verified': result.get('verified', False),
-                        # Save scraped metadata
-                        'meta_description': result.get('meta_description'),
-                        'meta_keywords': result.get('meta_keywords'),
-                        'services': result.get('services'),
-                        'about_text': result.get('about_text'),
-                        # NEW: Additional metadata
-                        'schema_org': result.get('schema_org', {}),
-                        'headlines': result.get('headlines', []),
-                        'og_data': result.get('og_data', {})
-                    }).eq('campaign_id', campaign_id).eq('website', result['url']).execute()
-                    
-                    found_count += 1
-                    verified_status = "✅" if result.get('verified') else "⚠️"
-                    print(f"📧 Deep Scraper found email for {result['url']}: {result['email']} {verified_status}")
-            
-            print(f"✅ Deep Scraper finished. Found {found_count} additional emails.")
+            # Run batch scrape in chunks - the checkpoint is saved after each one
+            for chunk_start in range(0, len(urls), CRAWL_CHECKPOINT_SCRAPE_CHUNK):
+                token.raise_if_cancelled()
+                chunk = urls[chunk_start:chunk_start + CRAWL_CHECKPOINT_SCRAPE_CHUNK]
+                # Returns early with the finished websites if the crawl is cancelled
+                scrape_results = await run_in_threadpool(
+                    scraper.scrape_batch, chunk, max_workers=10, cancel=token,
+                    user_id=user_id, campaign_id=campaign_id
+                )
+                chunk_found = 0
+                
+                # Update leads with results
+                for result in scrape_results:
+                    # Save email if found, even if verification failed
+                    # We want to show the email to the user even if MX check failed
+                    if result.get('email'):
+                        # Update all leads with this website in this campaign
+                        with track_stage('db_write'):
+                            await db_execute(supabase.table('leads').update({
+                                'email': result['email'],
+                                'email_source': 'impressum_crawler',
+                                'email_verified': result.get('verified', False),
+                                # Save scraped metadata
+                                'meta_description': result.get('meta_description'),
+                                'meta_keywords': result.get('meta_keywords'),
+                                'services': result.get('services'),
+                                'about_text': result.get('about_text'),
+                                # NEW: Additional metadata
+                                'schema_org': result.get('schema_org', {}),
+                                'headlines': result.get('headlines', []),
+                                'og_data': result.get('og_data', {})
+                            }).eq('campaign_id', campaign_id).eq('website', result['url']))
+                        
+                        chunk_found += 1
+                        logger.debug("📧 Deep Scraper found email for %s: %s (verified: %s)", result['url'], result['email'], result.get('verified', False), extra=SAMPLED)
+                
+                # Enrichment: 0.5 credit per found email
+                if chunk_found:
+                    reservation.charge(chunk_found * CREDITS_PER_ENRICHMENT, 'enrichment', quantity=chunk_found)
+                checkpoint.found_count += chunk_found
+                checkpoint.mark_scraped([result['url'] for result in scrape_results])
+                await checkpoint.save(supabase)
+                token.raise_if_cancelled()
             
-            # Deduct credits for enrichment (0.5 credit per found email)
-            if found_count > 0:
-                enrichment_cost = found_count * 0.5
-                print(f"💳 Deducting {enrichment_cost} credits for {found_count} enriched emails")
-                supabase.rpc('deduct_credits', {
-                    'p_user_id': user_id,
-                    'p_amount': enrichment_cost,
-                    'p_description': f'Email enrichment for {found_count} leads in campaign {campaign_id}',
-                    'p_metadata': {'campaign_id': campaign_id, 'enrichment_count': found_count, 'source': 'impressum_crawler'}
-                }).execute()
+            logger.info("✅ Deep Scraper finished. Found %d additional emails.", checkpoint.found_count)
         else:
-            print("✨ All leads already have emails (or no websites). Skipping Deep Scraper.")
+            logger.info("✨ All leads already have emails (or no websites). Skipping Deep Scraper.")
             
         # ---------------------------------------------------------
             
         # Update Campaign Status
-        supabase.table('campaigns').update({
+        await db_execute(supabase.table('campaigns').update({
             'status': 'completed',
             'metadata': {
-                'last_crawl_count': leads_added,
+                'last_crawl_count': checkpoint.leads_added,
+                'places_received': checkpoint.places_received,
+                'skipped': dict(checkpoint.skipped),
                 'source': 'outscraper'
             }
-        }).eq('id', campaign_id).execute()
+        }).eq('id', campaign_id))
+        invalidate_campaign(campaign_id)
+        await checkpoint.delete(supabase)
+        
+    except CrawlCancelled as e:
+        logger.info("🛑 Crawl for campaign %s stopped (%s) after %d leads", campaign_id, e.reason, checkpoint.leads_added)
+        if e.reason in ('cancelled', 'deadline'):
+            # Resumable later: paused by the user, or failed on its deadline
+            await checkpoint.save(supabase)
+            await db_execute(supabase.table('campaigns').update({
+                'status': 'paused' if e.reason == 'cancelled' else 'failed',
+                'metadata': {
+                    'last_crawl_count': checkpoint.leads_added,
+                    'places_received': checkpoint.places_received,
+                    'skipped': dict(checkpoint.skipped),
+                    'source': 'outscraper',
+                    'error': 'Deadline exceeded' if e.reason == 'deadline' else None,
+                    'resumable': True
+                }
+            }).eq('id', campaign_id))
+            invalidate_campaign(campaign_id)
+        # 'deleted': the campaign (and its checkpoint) is gone, 'superseded': a resumed run took over
         
-        # Deduct credits for found leads
-        # Deduct credits for found leads (1 credit per lead)
-        credits_to_deduct = leads_added
-        print(f"💳 Deducting {credits_to_deduct} credits for {leads_added} leads")
-        supabase.rpc('deduct_credits', {
-            'p_user_id': user_id,
-            'p_amount': credits_to_deduct,
-            'p_description': f'Crawled {leads_added} leads for campaign {campaign_id}',
-            'p_metadata': {'campaign_id': campaign_id, 'leads_count': leads_added, 'source': 'outscraper'}
-        }).execute()
-
     except Exception as e:
-        print(f"💥 Crawling failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        supabase.table('campaigns').update({
+        logger.exception("💥 Crawling failed for campaign %s: %s", campaign_id, e)
+        await checkpoint.save(supabase)
+        await db_execute(supabase.table('campaigns').update({
             'status': 'failed',
-            'metadata': {'error': str(e)}
-        }).eq('id', campaign_id).execute()
+            'metadata': {'error': str(e), 'resumable': True}
+        }).eq('id', campaign_id))
+        invalidate_campaign(campaign_id)
+    
+    finally:
+        get_crawl_registry().finish(campaign_id, token)
+        if pages is not None:
+            # Stops the planner's tile searches if the crawl ended inside the search loop
+            await run_in_threadpool(pages.close)
+        
+        # Charge the leads and enrichments delivered by this run (also after a failure
+        # or cancellation) and return the rest of the reservation
+        if reservation is not None and not reservation.settled:
+            leads_count = reservation.quantities['leads']
+            enrichment_count = reservation.quantities['enrichment']
+            logger.info("💳 Charging %s credits for %d leads and %d enriched emails", reservation.charged, leads_count, enrichment_count)
+            try:
+                await reservation.settle(
+                    f'Crawled {leads_count} leads for campaign {campaign_id}',
+                    {'campaign_id': campaign_id, 'leads_count': leads_count, 'enrichment_count': enrichment_count, 'source': 'outscraper',
+                     **({'stopped': token.reason} if token.reason else {})}
+                )
+            except Exception as e:
+                logger.error("❌ Failed to settle credits for campaign %s: %s", campaign_id, e)
+
+
+async def reserve_crawl_credits(
+    supabase, campaign_id: str, user_id: str, request: CrawlRequest, leads_added: int = 0
+) -> CreditReservation:
+    """Hold 1 credit per lead still to find (enrichment beyond that is charged from the balance on settle)"""
+    remaining = max(request.target_lead_count - leads_added, 1)
+    return await reserve_credits(
+        supabase,
+        user_id,
+        remaining * CREDITS_PER_LEAD,
+        f'Crawl for campaign {campaign_id}',
+        {'campaign_id': campaign_id, 'target_lead_count': request.target_lead_count}
+    )
 
 
 
@@ -288,23 +357,21 @@ async def list_campaigns(user_id: str):
         supabase = get_supabase_client()
         
         # Get campaigns
-        response = supabase.table('campaigns').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
+        response = await db_execute(supabase.table('campaigns').select('*').eq('user_id', user_id).order('created_at', desc=True))
         campaigns = response.data or []
         
         # Enrich with lead counts
         for campaign in campaigns:
             try:
-                count_res = supabase.table('leads').select('id', count='exact').eq('campaign_id', campaign['id']).execute()
+                count_res = await db_execute(supabase.table('leads').select('id', count='exact').eq('campaign_id', campaign['id']))
                 campaign['leads_count'] = count_res.count if count_res.count is not None else 0
             except Exception as e:
-                print(f"Error counting leads for campaign {campaign.get('id')}: {str(e)}")
+                logger.warning("Error counting leads for campaign %s: %s", campaign.get('id'), e)
                 campaign['leads_count'] = 0
             
         return {"campaigns": campaigns}
     except Exception as e:
-        print(f"Error in list_campaigns: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in list_campaigns: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to fetch campaigns: {str(e)}")
 
 @router.get("/{campaign_id}")
@@ -313,7 +380,7 @@ async def get_campaign_detail(campaign_id: str):
         supabase = get_supabase_client()
         
         # Get campaign
-        campaign_res = supabase.table('campaigns').select('*').eq('id', campaign_id).single().execute()
+        campaign_res = await db_execute(supabase.table('campaigns').select('*').eq('id', campaign_id).single())
         
         if not campaign_res.data:
             raise HTTPException(status_code=404, detail="Campaign not found")
@@ -321,7 +388,7 @@ async def get_campaign_detail(campaign_id: str):
         campaign = campaign_res.data
         
         # Get leads for this campaign
-        leads_res = supabase.table('leads').select('*').eq('campaign_id', campaign_id).execute()
+        leads_res = await db_execute(supabase.table('leads').select('*').eq('campaign_id', campaign_id))
         leads = leads_res.data or []
         
         return {
@@ -331,9 +398,7 @@ async def get_campaign_detail(campaign_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_campaign_detail: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in get_campaign_detail: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to fetch campaign details: {str(e)}")
 
 @router.post("/create")
@@ -349,11 +414,12 @@ async def create_campaign(campaign: CampaignCreate):
         "status": "draft"
     }
     
-    response = supabase.table('campaigns').insert(data).execute()
+    response = await db_execute(supabase.table('campaigns').insert(data))
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create campaign")
-        
+    
+    cache_campaign(response.data[0])
     return {"success": True, "campaign": response.data[0]}
 
 @router.delete("/{campaign_id}")
@@ -364,7 +430,11 @@ async def delete_campaign(campaign_id: str):
     # but here we rely on the service role client so we should be careful.
     # Ideally we pass the user_id to verify ownership or use the auth token.
     
-    response = supabase.table('campaigns').delete().eq('id', campaign_id).execute()
+    # Stop a running crawl first - it settles the credits for the leads it already added
+    get_crawl_registry().cancel(campaign_id, 'deleted')
+    
+    response = await db_execute(supabase.table('campaigns').delete().eq('id', campaign_id))
+    invalidate_campaign(campaign_id)
     
     return {"success": True}
 
@@ -379,31 +449,25 @@ async def start_crawl(request: CrawlRequest, background_tasks: BackgroundTasks):
     if request.target_lead_count > 5000:
         raise HTTPException(status_code=400, detail="Maximum 5000 leads allowed")
     
-    # Check credits balance
+    # Reserve credits for the whole crawl (1 credit per lead) - settled when it ends
     try:
-        user_res = supabase.table('profiles').select('credits_balance').eq('id', request.user_id).single().execute()
+        profile = await get_profile(supabase, request.user_id)
         
-        if not user_res.data:
+        if not profile:
             raise HTTPException(status_code=404, detail="User not found")
         
-        current_credits = user_res.data.get('credits_balance', 0)
-        
-        # Check if user has enough credits (1 credit per lead)
-        required_credits = request.target_lead_count
-        if current_credits < required_credits:
-            # If not enough credits, return 402 Payment Required
-            raise HTTPException(
-                status_code=402, 
-                detail=f"Insufficient credits. You have {current_credits} credits but need {required_credits} credits. Please purchase more credits."
-            )
+        reservation = await reserve_crawl_credits(supabase, request.campaign_id, request.user_id, request)
+    except InsufficientCreditsError as e:
+        # If not enough credits, return 402 Payment Required
+        raise HTTPException(status_code=402, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error checking credits: {str(e)}")
+        logger.error("Error reserving credits: %s", e)
         raise HTTPException(status_code=500, detail="Failed to check credit balance")
 
     # Start background task with Outscraper
-    background_tasks.add_task(crawl_with_outscraper, request.campaign_id, request.user_id, request)
+    background_tasks.add_task(crawl_with_outscraper, request.campaign_id, request.user_id, request, reservation)
     
     return {
         "success": True, 
@@ -412,6 +476,53 @@ async def start_crawl(request: CrawlRequest, background_tasks: BackgroundTasks):
     }
 
 
+@router.post("/crawl/cancel/{campaign_id}")
+async def cancel_crawl(campaign_id: str):
+    """Stop a running crawl - it is paused with its checkpoint and can be resumed later"""
+    running_here = get_crawl_registry().cancel(campaign_id)
+    return {
+        "success": True,
+        "message": "Crawl is being cancelled",
+        # False: the crawl runs in another worker (cancelled through Redis) or not at all
+        "running_in_this_worker": running_here
+    }
+
+
+@router.post("/crawl/resume/{campaign_id}")
+async def resume_crawl(campaign_id: str, background_tasks: BackgroundTasks):
+    """Continue a failed or interrupted crawl from its checkpoint"""
+    supabase = get_supabase_client()
+
+    checkpoint = await load_crawl_checkpoint(supabase, campaign_id)
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail="No interrupted crawl to resume for this campaign")
+
+    campaign_res = await db_execute(supabase.table('campaigns').select('status').eq('id', campaign_id).limit(1))
+    status = campaign_res.data[0]['status'] if campaign_res.data else None
+    if status == 'crawling' and not checkpoint.is_stale():
+        raise HTTPException(status_code=409, detail="Crawl is still running")
+
+    request = CrawlRequest(**checkpoint.request)
+
+    # Reserve credits for the leads still missing
+    try:
+        reservation = await reserve_crawl_credits(supabase, campaign_id, checkpoint.user_id, request, checkpoint.leads_added)
+    except InsufficientCreditsError as e:
+        raise HTTPException(status_code=402, detail=str(e))
+    except Exception as e:
+        logger.error("Error reserving credits: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to check credit balance")
+
+    background_tasks.add_task(crawl_with_outscraper, campaign_id, checkpoint.user_id, request, reservation, checkpoint)
+
+    return {
+        "success": True,
+        "message": "Crawl resumed in background",
+        "stage": checkpoint.stage,
+        "leads_found": checkpoint.leads_added
+    }
+
+
 @router.patch("/leads/{lead_id}/status")
 async def update_lead_status(lead_id: str, request: dict):
     """Update lead status (invalid, contacted, new)"""
@@ -427,7 +538,7 @@ async def update_lead_status(lead_id: str, request: dict):
         if status == 'contacted':
             update_data['last_contacted_at'] = datetime.now().isoformat()
             
-        result = supabase.table('leads').update(update_data).eq('id', lead_id).execute()
+        result = await db_execute(supabase.table('leads').update(update_data).eq('id', lead_id))
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Lead not found")
@@ -436,7 +547,7 @@ async def update_lead_status(lead_id: str, request: dict):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating lead status: {str(e)}")
+        logger.error("Error updating lead status: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -455,11 +566,11 @@ async def update_lead_email(lead_id: str, request: dict):
         if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
             raise HTTPException(status_code=400, detail="Invalid email format")
         
-        result = supabase.table('leads').update({
+        result = await db_execute(supabase.table('leads').update({
             'email': email,
             'email_source': 'manual_user',
             'email_verified': False
-        }).eq('id', lead_id).execute()
+        }).eq('id', lead_id))
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Lead not found")
@@ -468,5 +579,5 @@ async def update_lead_email(lead_id: str, request: dict):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating lead email: {str(e)}")
+        logger.error("Error updating lead email: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,23 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional
 import anthropic
 import os
-import traceback
 from datetime import datetime
 
+from services.async_db import db_execute
+from services.config_cache import get_campaign, get_profile, invalidate_campaign
+from services.credits import InsufficientCreditsError, reserve_credits
+from services.metrics import track_stage
+from services.logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/campaigns", tags=["campaigns"])
 
+CREDITS_PER_EMAIL = 0.5
+
 
 class EmailGenerationRequest(BaseModel):
     campaign_id: str
@@ -49,36 +59,33 @@ async def generate_emails_for_campaign(campaign_id: str):
        - Combine profile + campaign + lead data
        - Call Claude API to generate personalized email
        - Save to campaign_emails table
-    4. Deduct credits (0.5 credits per email)
+    4. Reserve credits up front, settle 0.5 credits per generated email at the end
     """
     try:
         from services.supabase_client import get_supabase_client
         supabase = get_supabase_client()
         
         # 1. Load campaign data
-        campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
-        if not campaign_response.data:
+        campaign = await get_campaign(supabase, campaign_id)
+        if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        campaign = campaign_response.data
         user_id = campaign["user_id"]
         
         # 2. Load user profile data
-        profile_response = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-        if not profile_response.data:
+        profile = await get_profile(supabase, user_id)
+        if not profile:
             raise HTTPException(status_code=404, detail="User profile not found")
         
-        profile = profile_response.data
-        
         # 3. Load all leads for this campaign
-        leads_response = supabase.table("leads").select("*").eq("campaign_id", campaign_id).execute()
+        leads_response = await db_execute(supabase.table("leads").select("*").eq("campaign_id", campaign_id))
         leads = leads_response.data
         
         if not leads:
             raise HTTPException(status_code=400, detail="No leads found in campaign")
         
         # 4. Check if emails already generated
-        existing_emails = supabase.table("campaign_emails").select("lead_id").eq("campaign_id", campaign_id).execute()
+        existing_emails = await db_execute(supabase.table("campaign_emails").select("lead_id").eq("campaign_id", campaign_id))
         existing_lead_ids = {email["lead_id"] for email in existing_emails.data}
         
         # Filter out leads that already have emails
@@ -106,87 +113,106 @@ async def generate_emails_for_campaign(campaign_id: str):
         
         client = anthropic.AsyncAnthropic(api_key=anthropic_api_key)
         
+        # Hold credits for every email (0.5 each) - unused credits are returned on settle
+        try:
+            reservation = await reserve_credits(
+                supabase,
+                user_id,
+                len(leads_to_process) * CREDITS_PER_EMAIL,
+                f"Email generation for campaign {campaign_id}",
+                {'campaign_id': campaign_id, 'email_count': len(leads_to_process)}
+            )
+        except InsufficientCreditsError as e:
+            raise HTTPException(status_code=402, detail=str(e))
+        
         # 6. Generate emails for each lead
         generated_count = 0
         failed_count = 0
         errors = []
         
-        for lead in leads_to_process:
+        # Charge what was generated even if the loop is aborted (cancellation, DB failure);
+        # a failed settle must not turn the generated emails into a 500
+        try:
+            for lead in leads_to_process:
+                try:
+                    # Get email config
+                    email_config = campaign.get("email_config", {})
+                    custom_prompt = email_config.get("custom_prompt")
+                    
+                    # Build AI prompt (custom or default)
+                    if custom_prompt:
+                        # Replace variables in custom prompt
+                        prompt = custom_prompt.format(
+                            company_name=lead.get("company_name", "Ihr Unternehmen"),
+                            user_name=profile.get("full_name", ""),
+                            word_count=email_config.get("max_words", 200),
+                            lead_industry=lead.get("industry", ""),
+                            lead_website=lead.get("website", ""),
+                            lead_location=lead.get("location", ""),
+                            user_company=profile.get("company_name", ""),
+                            user_position=profile.get("position", "Business Development"),
+                            tone=email_config.get("tone", "professional"),
+                            salutation=email_config.get("salutation", "sie"),
+                            language=email_config.get("language", "de"),
+                            goal=email_config.get("email_goal", "appointment"),
+                            meta_description=lead.get("meta_description", "Keine Angabe"),
+                            meta_keywords=lead.get("meta_keywords", "Keine Angabe"),
+                            services=lead.get("services", "Keine Angabe"),
+                            about_text=lead.get("about_text", "Keine Angabe")
+                        )
+                        system_prompt = "Du bist ein Experte für B2B-Akquise-Emails. Erstelle DSGVO-konforme, personalisierte Emails auf Deutsch."
+                    else:
+                        # Use default prompt
+                        prompt = build_email_prompt(profile, campaign, lead)
+                        system_prompt = "Du bist ein Experte für B2B-Akquise-Emails. Erstelle DSGVO-konforme, personalisierte Emails auf Deutsch."
+                    
+                    # Call Claude API (Haiku - only available model)
+                    with track_stage('llm'):
+                        message = await client.messages.create(
+                            model="claude-3-haiku-20240307",
+                            max_tokens=1024,
+                            temperature=0.3,
+                            system=system_prompt,
+                            messages=[
+                                {
+                                    "role": "user",
+                                    "content": prompt
+                                }
+                            ]
+                        )
+                    
+                    # Parse response
+                    ai_content = message.content[0].text
+                    email_data = parse_email_response(ai_content)
+                    
+                    # Save to database
+                    with track_stage('db_write'):
+                        await db_execute(supabase.table("campaign_emails").insert({
+                            "campaign_id": campaign_id,
+                            "lead_id": lead["id"],
+                            "subject": email_data["subject"],
+                            "body": email_data["body"],
+                            "status": "draft"
+                        }))
+                    
+                    # 7. Charge 0.5 credits per generated email (settled below)
+                    reservation.charge(CREDITS_PER_EMAIL, 'ai_generation')
+                    
+                    generated_count += 1
+                    
+                except Exception as e:
+                    failed_count += 1
+                    error_msg = f"Lead {lead.get('company_name', 'Unknown')}: {str(e)}"
+                    errors.append(error_msg)
+                    logger.exception("❌ Email generation error: %s", error_msg)
+        finally:
             try:
-                # Get email config
-                email_config = campaign.get("email_config", {})
-                custom_prompt = email_config.get("custom_prompt")
-                
-                # Build AI prompt (custom or default)
-                if custom_prompt:
-                    # Replace variables in custom prompt
-                    prompt = custom_prompt.format(
-                        company_name=lead.get("company_name", "Ihr Unternehmen"),
-                        user_name=profile.get("full_name", ""),
-                        word_count=email_config.get("max_words", 200),
-                        lead_industry=lead.get("industry", ""),
-                        lead_website=lead.get("website", ""),
-                        lead_location=lead.get("location", ""),
-                        user_company=profile.get("company_name", ""),
-                        user_position=profile.get("position", "Business Development"),
-                        tone=email_config.get("tone", "professional"),
-                        salutation=email_config.get("salutation", "sie"),
-                        language=email_config.get("language", "de"),
-                        goal=email_config.get("email_goal", "appointment"),
-                        meta_description=lead.get("meta_description", "Keine Angabe"),
-                        meta_keywords=lead.get("meta_keywords", "Keine Angabe"),
-                        services=lead.get("services", "Keine Angabe"),
-                        about_text=lead.get("about_text", "Keine Angabe")
-                    )
-                    system_prompt = "Du bist ein Experte für B2B-Akquise-Emails. Erstelle DSGVO-konforme, personalisierte Emails auf Deutsch."
-                else:
-                    # Use default prompt
-                    prompt = build_email_prompt(profile, campaign, lead)
-                    system_prompt = "Du bist ein Experte für B2B-Akquise-Emails. Erstelle DSGVO-konforme, personalisierte Emails auf Deutsch."
-                
-                # Call Claude API (Haiku - only available model)
-                message = await client.messages.create(
-                    model="claude-3-haiku-20240307",
-                    max_tokens=1024,
-                    temperature=0.3,
-                    system=system_prompt,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ]
+                await reservation.settle(
+                    f"Email generation for {generated_count} leads in campaign {campaign_id}",
+                    {'campaign_id': campaign_id, 'generated_count': generated_count, 'failed_count': failed_count}
                 )
-                
-                # Parse response
-                ai_content = message.content[0].text
-                email_data = parse_email_response(ai_content)
-                
-                # Save to database
-                supabase.table("campaign_emails").insert({
-                    "campaign_id": campaign_id,
-                    "lead_id": lead["id"],
-                    "subject": email_data["subject"],
-                    "body": email_data["body"],
-                    "status": "draft"
-                }).execute()
-                
-                # 7. Deduct credits (0.5 credits per generated email)
-                credits_to_deduct = 0.5
-                await supabase.rpc('deduct_credits', {
-                    'p_user_id': user_id, 
-                    'p_amount': credits_to_deduct, 
-                    'p_description': f"Email generation for lead {lead.get('id')} in campaign {campaign_id}"
-                }).execute()
-                
-                generated_count += 1
-                
             except Exception as e:
-                failed_count += 1
-                error_msg = f"Lead {lead.get('company_name', 'Unknown')}: {str(e)}"
-                errors.append(error_msg)
-                print(f"❌ Email generation error: {error_msg}")
-                traceback.print_exc()
+                logger.error("❌ Failed to settle credits for campaign %s: %s", campaign_id, e)
         
         return EmailGenerationResponse(
             generated_count=generated_count,
@@ -195,9 +221,10 @@ async def generate_emails_for_campaign(campaign_id: str):
             errors=errors if errors else None
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Campaign email generation error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Campaign email generation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -209,10 +236,11 @@ async def get_campaign_emails(campaign_id: str):
         supabase = get_supabase_client()
         
         # Get emails with lead data
-        response = supabase.table("campaign_emails")\
-            .select("*, leads(company_name)")\
-            .eq("campaign_id", campaign_id)\
-            .execute()
+        response = await db_execute(
+            supabase.table("campaign_emails")
+            .select("*, leads(company_name)")
+            .eq("campaign_id", campaign_id)
+        )
         
         emails = []
         for email in response.data:
@@ -231,8 +259,7 @@ async def get_campaign_emails(campaign_id: str):
         return emails
         
     except Exception as e:
-        print(f"❌ Get campaign emails error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Get campaign emails error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -243,25 +270,26 @@ async def update_campaign_email(campaign_id: str, email_id: str, update: EmailUp
         from services.supabase_client import get_supabase_client
         supabase = get_supabase_client()
         
-        response = supabase.table("campaign_emails")\
+        response = await db_execute(
+            supabase.table("campaign_emails")
             .update({
                 "subject": update.subject,
                 "body": update.body,
                 "edited_by_user": True,
                 "status": "edited"
-            })\
-            .eq("id", email_id)\
-            .eq("campaign_id", campaign_id)\
-            .execute()
+            })
+            .eq("id", email_id)
+            .eq("campaign_id", campaign_id)
+        )
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Email not found")
         
+        invalidate_campaign(campaign_id)
         return {"message": "Email updated successfully"}
         
     except Exception as e:
-        print(f"❌ Update email error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Update email error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -361,9 +389,8 @@ def parse_email_response(ai_content: str) -> dict:
     import json
     import re
     
-    # Debug: Log raw AI response
-    print(f"🔍 Raw AI response length: {len(ai_content)}")
-    print(f"🔍 Raw AI response (first 500 chars): {ai_content[:500]}")
+    # Debug: Log raw AI response (sampled, enable with LOG_LEVELS=routes.email_generation=DEBUG)
+    logger.debug("🔍 Raw AI response (%d chars): %.500s", len(ai_content), ai_content, extra=SAMPLED)
     
     # Check if response is empty
     if not ai_content or len(ai_content.strip()) == 0:
@@ -391,7 +418,7 @@ def parse_email_response(ai_content: str) -> dict:
         return result
     except (json.JSONDecodeError, ValueError):
         # If JSON parsing fails, treat as plain text email
-        print("ℹ️ AI returned plain text instead of JSON, auto-generating subject")
+        logger.info("ℹ️ AI returned plain text instead of JSON, auto-generating subject")
         
         # Extract first line as basis for subject
         lines = ai_content.split('\n')
@@ -1,10 +1,22 @@
+import asyncio
+import logging
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime, timedelta
 
 from services.supabase_client import get_supabase_client
+from services.async_db import db_execute
 from services.impressum_scraper import get_impressum_scraper
+from services.crawl_capacity import get_crawl_capacity
+from services.config_cache import get_campaign
+from services.impressum_cache import (
+    is_fresh, is_servable_stale, claim_refresh, schedule_refresh, save_successful_result, scrape_and_cache
+)
+from services.metrics import track_stage, record_cache
+from services.logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/impressum", tags=["Impressum"])
 
@@ -19,10 +31,13 @@ class BatchCrawlRequest(BaseModel):
 
 
 @router.post("/crawl")
-async def crawl_single(request: CrawlRequest):
+async def crawl_single(request: CrawlRequest, background_tasks: BackgroundTasks):
     """
     Crawl a single website for email addresses
     Synchronous endpoint for testing
+    
+    Entries past the soft TTL but within the hard TTL are returned immediately
+    with stale=true while a single background refresh updates the cache.
     """
     supabase = get_supabase_client()
     scraper = get_impressum_scraper()
@@ -32,24 +47,47 @@ async def crawl_single(request: CrawlRequest):
         domain = scraper.extract_domain(request.website)
         
         # Check cache first
-        cache_res = supabase.table('impressum_cache').select('*').eq('domain', domain).execute()
+        cache_res = await db_execute(supabase.table('impressum_cache').select('*').eq('domain', domain))
         
         if cache_res.data:
             cached = cache_res.data[0]
-            # Check if cache is still valid (90 days)
-            crawled_at = datetime.fromisoformat(cached['crawled_at'].replace('Z', '+00:00'))
-            if datetime.now(crawled_at.tzinfo) - crawled_at < timedelta(days=90):
-                print(f"✅ Using cached result for {domain}")
+            # Check if cache is still valid (90 days since crawl or last revalidation)
+            if is_fresh(cached):
+                logger.debug("✅ Using cached result for %s", domain, extra=SAMPLED)
+                record_cache('impressum', 'hit')
+                return {
+                    "success": cached.get('success', False),
+                    "email": cached.get('email'),
+                    "verified": cached.get('email_verified', False),
+                    "cached": True,
+                    "stale": False,
+                    "crawled_at": cached['crawled_at']
+                }
+            
+            # Stale-while-revalidate: serve the old result, refresh once in the background
+            if is_servable_stale(cached):
+                refreshing = claim_refresh(domain)
+                if refreshing:
+                    background_tasks.add_task(schedule_refresh, cached)
+                logger.info("⏳ Serving stale result for %s (refresh %s)", domain, 'scheduled' if refreshing else 'already running')
+                record_cache('impressum', 'stale')
                 return {
-                    "success": True,
+                    "success": cached.get('success', False),
                     "email": cached.get('email'),
                     "verified": cached.get('email_verified', False),
                     "cached": True,
+                    "stale": True,
                     "crawled_at": cached['crawled_at']
                 }
         
-        # Scrape website
-        result = scraper.scrape_website(request.website)
+        record_cache('impressum', 'miss')
+        
+        # Scrape website and upsert to cache (including validators for conditional re-crawls).
+        # Concurrent requests for the same domain share one scrape.
+        # Interactive request: priority lane of the shared crawl pool, ahead of batch crawls
+        result = await asyncio.wrap_future(
+            get_crawl_capacity().submit(scrape_and_cache, request.website, domain, priority=True)
+        )
         
         # Debug: Add raw data if requested
         debug_data = {}
@@ -59,29 +97,13 @@ async def crawl_single(request: CrawlRequest):
                 'scraped_from': result.get('scraped_from')
             }
         
-        # Save to cache
-        cache_data = {
-            "domain": domain,
-            "website": request.website,
-            "email": result.get('email'),
-            "email_verified": result.get('verified', False),
-            "is_personal": result.get('is_personal', False),
-            "all_emails": result.get('all_emails', []),
-            "scraped_from": result.get('scraped_from'),
-            "success": result['success'],
-            "error_message": result.get('error')
-        }
-        
-        # Upsert to cache
-        supabase.table('impressum_cache').upsert(cache_data, on_conflict='domain').execute()
-        
         # Update lead if lead_id provided
         if request.lead_id and result.get('email'):
-            supabase.table('leads').update({
+            await db_execute(supabase.table('leads').update({
                 'email': result['email'],
                 'email_source': 'impressum_crawler',
                 'email_verified': result.get('verified', False)
-            }).eq('id', request.lead_id).execute()
+            }).eq('id', request.lead_id))
         
         return {
             "success": result['success'],
@@ -93,7 +115,7 @@ async def crawl_single(request: CrawlRequest):
         }
         
     except Exception as e:
-        print(f"💥 Error in crawl_single: {str(e)}")
+        logger.exception("💥 Error in crawl_single: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -102,48 +124,42 @@ async def crawl_batch_background(websites: List[str], campaign_id: Optional[str]
     supabase = get_supabase_client()
     scraper = get_impressum_scraper()
     
-    print(f"🔍 Starting batch crawl for {len(websites)} websites")
+    logger.info("🔍 Starting batch crawl for %d websites", len(websites))
+    
+    # Queue the batch under the campaign owner's fair share of the crawl pool
+    user_id = None
+    if campaign_id:
+        campaign = await get_campaign(supabase, campaign_id)
+        user_id = campaign.get('user_id') if campaign else None
     
-    results = scraper.scrape_batch(websites)
+    # Cache rows are written by whichever caller actually scraped the domain (successes only)
+    results = await run_in_threadpool(
+        scraper.scrape_batch, websites, after_scrape=save_successful_result, user_id=user_id, campaign_id=campaign_id
+    )
     
-    # Save results to cache and update leads
+    # Update leads
     for result in results:
         if not result['success']:
             continue
         
-        domain = result['domain']
-        
-        # Save to cache
-        cache_data = {
-            "domain": domain,
-            "website": result['url'],
-            "email": result.get('email'),
-            "email_verified": result.get('verified', False),
-            "is_personal": result.get('is_personal', False),
-            "all_emails": result.get('all_emails', []),
-            "scraped_from": result.get('scraped_from'),
-            "success": True
-        }
-        
-        supabase.table('impressum_cache').upsert(cache_data, on_conflict='domain').execute()
-        
         # Update leads with this website
         if result.get('email'):
             # Find leads with this website
-            leads_res = supabase.table('leads').select('id').eq('website', result['url']).execute()
+            leads_res = await db_execute(supabase.table('leads').select('id').eq('website', result['url']))
             
             if campaign_id:
-                leads_res = supabase.table('leads').select('id').eq('website', result['url']).eq('campaign_id', campaign_id).execute()
+                leads_res = await db_execute(supabase.table('leads').select('id').eq('website', result['url']).eq('campaign_id', campaign_id))
             
             if leads_res.data:
                 for lead in leads_res.data:
-                    supabase.table('leads').update({
-                        'email': result['email'],
-                        'email_source': 'impressum_crawler',
-                        'email_verified': result.get('verified', False)
-                    }).eq('id', lead['id']).execute()
+                    with track_stage('db_write'):
+                        await db_execute(supabase.table('leads').update({
+                            'email': result['email'],
+                            'email_source': 'impressum_crawler',
+                            'email_verified': result.get('verified', False)
+                        }).eq('id', lead['id']))
     
-    print(f"✅ Batch crawl completed! Processed {len(results)} websites")
+    logger.info("✅ Batch crawl completed! Processed %d websites", len(results))
 
 
 @router.post("/batch")
@@ -181,15 +197,16 @@ async def debug_crawl(request: CrawlRequest):
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
         
-        response = scraper.session.get(url, timeout=10)
-        homepage_html = response.text
+        # Streamed and size-capped, same as the real scraper
+        page = await run_in_threadpool(scraper.fetcher.fetch, url)
+        homepage_html = page.text
         
-        # Find Impressum
-        impressum_url = scraper.find_impressum_url(url, homepage_html)
+        # Find Impressum (robots.txt, sitemaps and URL probes - blocking HTTP)
+        impressum_url = await run_in_threadpool(scraper.find_impressum_url, url, homepage_html)
         
         if impressum_url:
-            impressum_response = scraper.session.get(impressum_url, timeout=10)
-            html = impressum_response.text
+            page = await run_in_threadpool(scraper.fetcher.fetch, impressum_url, max_bytes=scraper.fetcher.IMPRESSUM_MAX_BYTES)
+            html = page.text
         else:
             html = homepage_html
         
@@ -208,7 +225,10 @@ async def debug_crawl(request: CrawlRequest):
             "impressum_url": impressum_url or url,
             "emails_found": emails,
             "text_preview": text_preview,
-            "html_length": len(html)
+            "html_length": len(html),
+            "bytes_read": page.bytes_read,
+            "truncated": page.truncated,
+            "content_type": page.content_type
         }
         
     except Exception as e:
@@ -221,22 +241,22 @@ async def get_cache(domain: str):
     supabase = get_supabase_client()
     
     try:
-        cache_res = supabase.table('impressum_cache').select('*').eq('domain', domain).execute()
+        cache_res = await db_execute(supabase.table('impressum_cache').select('*').eq('domain', domain))
         
         if not cache_res.data:
             raise HTTPException(status_code=404, detail="Domain not found in cache")
         
         cached = cache_res.data[0]
         
-        # Check if cache is still valid (90 days)
-        crawled_at = datetime.fromisoformat(cached['crawled_at'].replace('Z', '+00:00'))
-        is_valid = datetime.now(crawled_at.tzinfo) - crawled_at < timedelta(days=90)
+        # Check if cache is still valid (90 days since crawl or last revalidation)
+        is_valid = is_fresh(cached)
         
         return {
             "domain": cached['domain'],
             "email": cached.get('email'),
             "verified": cached.get('email_verified', False),
             "crawled_at": cached['crawled_at'],
+            "revalidated_at": cached.get('revalidated_at'),
             "is_valid": is_valid,
             "success": cached.get('success', False)
         }
@@ -244,6 +264,6 @@ async def get_cache(domain: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"💥 Error in get_cache: {str(e)}")
+        logger.exception("💥 Error in get_cache: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
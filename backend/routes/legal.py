@@ -1,8 +1,13 @@
+import logging
 from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 from services.supabase_client import get_supabase_client
+from services.async_db import db_execute
+from services.config_cache import get_profile, invalidate_profile
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/legal", tags=["Legal"])
 
@@ -32,17 +37,18 @@ async def sign_avv(request: AVVSignRequest, req: Request):
         
         # Try to insert (will fail if already signed due to UNIQUE constraint)
         try:
-            supabase.table('avv_logs').insert(log_data).execute()
+            await db_execute(supabase.table('avv_logs').insert(log_data))
         except Exception as e:
             if "unique constraint" in str(e).lower():
                 # Already signed, just update the signature? 
                 # For now, we assume one signature is enough.
-                print(f"User {request.user_id} already signed AVV")
+                logger.info("User %s already signed AVV", request.user_id)
             else:
                 raise e
         
         # 2. Update profile
-        supabase.table('profiles').update({'is_avv_signed': True}).eq('id', request.user_id).execute()
+        await db_execute(supabase.table('profiles').update({'is_avv_signed': True}).eq('id', request.user_id))
+        invalidate_profile(request.user_id)
         
         return {
             "success": True,
@@ -50,7 +56,7 @@ async def sign_avv(request: AVVSignRequest, req: Request):
         }
         
     except Exception as e:
-        print(f"💥 Error signing AVV: {str(e)}")
+        logger.exception("💥 Error signing AVV: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/avv/status/{user_id}")
@@ -61,15 +67,15 @@ async def get_avv_status(user_id: str):
     supabase = get_supabase_client()
     
     try:
-        res = supabase.table('profiles').select('is_avv_signed').eq('id', user_id).single().execute()
+        profile = await get_profile(supabase, user_id)
         
-        if not res.data:
+        if not profile:
             return {"is_signed": False}
             
-        return {"is_signed": res.data.get('is_avv_signed', False)}
+        return {"is_signed": profile.get('is_avv_signed', False)}
         
     except Exception as e:
-        print(f"💥 Error checking AVV status: {str(e)}")
+        logger.exception("💥 Error checking AVV status: %s", e)
         return {"is_signed": False}
 
 @router.get("/avv/signature/{user_id}")
@@ -81,7 +87,7 @@ async def get_avv_signature(user_id: str):
     
     try:
         # Get signature from avv_logs
-        res = supabase.table('avv_logs').select('signature_data, signed_at').eq('user_id', user_id).order('signed_at', desc=True).limit(1).execute()
+        res = await db_execute(supabase.table('avv_logs').select('signature_data, signed_at').eq('user_id', user_id).order('signed_at', desc=True).limit(1))
         
         if not res.data or len(res.data) == 0:
             return {
@@ -99,7 +105,7 @@ async def get_avv_signature(user_id: str):
         }
         
     except Exception as e:
-        print(f"💥 Error fetching AVV signature: {str(e)}")
+        logger.exception("💥 Error fetching AVV signature: %s", e)
         return {
             "is_signed": False,
             "signature_data": None,
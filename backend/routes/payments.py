@@ -3,13 +3,19 @@ Stripe Payment Routes for Voyanero
 Handles credit purchases and webhook events
 """
 
+import logging
 from fastapi import APIRouter, HTTPException, Request, Header
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import stripe
 import os
 from typing import Optional
 
 from services.supabase_client import get_supabase_client
+from services.async_db import db_execute
+from services.config_cache import invalidate_profile
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/payments", tags=["Payments"])
 
@@ -47,7 +53,8 @@ async def create_checkout_session(request: CreateCheckoutRequest):
         package_info = packages[request.package]
         
         # Create checkout session
-        session = stripe.checkout.Session.create(
+        session = await run_in_threadpool(
+            stripe.checkout.Session.create,
             payment_method_types=['card'],
             line_items=[{
                 'price_data': {
@@ -116,12 +123,13 @@ async def stripe_webhook(request: Request, stripe_signature: str = Header(None))
         supabase = get_supabase_client()
         
         try:
-            result = supabase.rpc('add_credits', {
+            result = await db_execute(supabase.rpc('add_credits', {
                 'p_user_id': user_id,
                 'p_amount': credits,
                 'p_description': f'Purchase: {package_name}',
                 'p_payment_intent_id': payment_intent
-            }).execute()
+            }))
+            invalidate_profile(user_id)
             
             if result.data and result.data.get('success'):
                 return {
@@ -132,11 +140,11 @@ async def stripe_webhook(request: Request, stripe_signature: str = Header(None))
                 }
             else:
                 # Log error but return 200 to Stripe (don't retry)
-                print(f"Error adding credits: {result.data}")
+                logger.error("Error adding credits: %s", result.data)
                 return {"received": True, "error": "Failed to add credits"}
                 
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.exception("Database error: %s", e)
             return {"received": True, "error": str(e)}
     
     # Return 200 for all events
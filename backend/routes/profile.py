@@ -1,12 +1,14 @@
+import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, HttpUrl
 import httpx
 from bs4 import BeautifulSoup
 import os
 import json
-import traceback
 import anthropic
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/profile", tags=["profile"])
 
 
@@ -144,8 +146,7 @@ Antworte NUR mit einem JSON-Objekt in diesem Format:
             )
 
     except Exception as e:
-        print(f"❌ Auto-fill error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Auto-fill error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Unerwarteter Fehler: {str(e)}"
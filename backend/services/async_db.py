@@ -0,0 +1,103 @@
+"""
+Async Database Access
+Runs the synchronous supabase-py client on a dedicated thread pool so async
+route handlers can await queries instead of freezing the event loop.
+
+    supabase = get_supabase_client()
+    res = await db_execute(supabase.table('leads').select('*').eq('id', lead_id))
+
+The pool has SUPABASE_POOL_SIZE threads, matching the keep-alive connection
+pool of the Supabase HTTP session (see supabase_client.py), and every call is
+bounded by SUPABASE_QUERY_TIMEOUT seconds. The HTTP session uses the same
+timeout, so a call that timed out here does not keep its thread busy for long.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', 20))
+QUERY_TIMEOUT = float(os.getenv('SUPABASE_QUERY_TIMEOUT', 10))
+
+
+class DatabaseTimeoutError(TimeoutError):
+    """A database call did not finish within its timeout"""
+
+
+class AsyncDB:
+    """Thread-pool bridge for blocking Supabase calls"""
+
+    def __init__(self, max_workers: int = POOL_SIZE, timeout: float = QUERY_TIMEOUT):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='supabase')
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking call on the database pool
+
+        Args:
+            func: Blocking callable (e.g. a query's execute or an auth call)
+            timeout: Seconds to wait, defaults to SUPABASE_QUERY_TIMEOUT
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            DatabaseTimeoutError: If the call takes longer than the timeout
+        """
+        limit = self.timeout if timeout is None else timeout
+        # Carry context vars (e.g. the round trip scope of the local stand-in) into the worker
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+
+        future = asyncio.get_running_loop().run_in_executor(self._executor, call)
+        try:
+            return await asyncio.wait_for(future, limit)
+        except asyncio.TimeoutError:
+            name = getattr(func, '__qualname__', repr(func))
+            logger.warning("⏱️  Database call %s timed out after %ss", name, limit)
+            raise DatabaseTimeoutError(f"Database call timed out after {limit}s") from None
+
+    async def execute(self, query, timeout: Optional[float] = None):
+        """
+        Execute a built query (table/rpc builder) on the database pool
+
+        Args:
+            query: Query builder, e.g. supabase.table('leads').select('*').eq('id', lead_id)
+            timeout: Seconds to wait, defaults to SUPABASE_QUERY_TIMEOUT
+
+        Returns:
+            The query's APIResponse
+        """
+        return await self.run(query.execute, timeout=timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# Singleton instance
+_async_db: Optional[AsyncDB] = None
+
+
+def get_async_db() -> AsyncDB:
+    """Get or create AsyncDB singleton instance"""
+    global _async_db
+    if _async_db is None:
+        _async_db = AsyncDB()
+    return _async_db
+
+
+async def db_execute(query, timeout: Optional[float] = None):
+    """Shortcut for get_async_db().execute(query)"""
+    return await get_async_db().execute(query, timeout=timeout)
+
+
+async def db_run(func: Callable, *args, **kwargs) -> Any:
+    """Shortcut for get_async_db().run(func, ...)"""
+    return await get_async_db().run(func, *args, **kwargs)
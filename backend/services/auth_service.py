@@ -3,12 +3,17 @@ Authentication Service for Voyanero
 Handles all authentication operations using Supabase
 """
 
-from typing import Optional, Dict, Any
+import threading
+from typing import Callable, Optional, Dict, Any
 from supabase import create_client, Client
 from gotrue.errors import AuthApiError
 import os
 from datetime import datetime
 
+from services.async_db import db_execute, db_run
+from services.config_cache import get_profile, invalidate_profile
+from services.jwt_verifier import get_jwt_verifier, KeyUnavailableError, TokenVerificationError
+
 
 class AuthService:
     """Service class for handling authentication operations"""
@@ -22,6 +27,15 @@ class AuthService:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in environment")
 
         self.client: Client = create_client(supabase_url, supabase_key)
+        # set_session() changes state shared by all requests - keep set + action atomic
+        self._session_lock = threading.Lock()
+        self.jwt_verifier = get_jwt_verifier()
+
+    def _with_session(self, access_token: str, action: Callable[[], Any]) -> Any:
+        """Run a blocking auth action with the given session set (call via db_run)"""
+        with self._session_lock:
+            self.client.auth.set_session(access_token, access_token)  # Note: In production, store refresh token properly
+            return action()
 
     async def signup(
         self,
@@ -58,7 +72,7 @@ class AuthService:
                 raise ValueError("Company name is required")
 
             # Sign up user with metadata
-            response = self.client.auth.sign_up({
+            response = await db_run(self.client.auth.sign_up, {
                 "email": email,
                 "password": password,
                 "options": {
@@ -113,7 +127,7 @@ class AuthService:
                 raise ValueError("Email and password are required")
 
             # Sign in user
-            response = self.client.auth.sign_in_with_password({
+            response = await db_run(self.client.auth.sign_in_with_password, {
                 "email": email,
                 "password": password
             })
@@ -122,7 +136,7 @@ class AuthService:
                 raise AuthApiError("Login failed - invalid credentials")
 
             # Fetch user profile
-            profile_response = self.client.table("profiles").select("*").eq("id", response.user.id).single().execute()
+            profile_response = await db_execute(self.client.table("profiles").select("*").eq("id", response.user.id).single())
 
             return {
                 "user": {
@@ -159,8 +173,7 @@ class AuthService:
         """
         try:
             # Set the session before signing out
-            self.client.auth.set_session(access_token, access_token)  # Note: In production, store refresh token properly
-            self.client.auth.sign_out()
+            await db_run(self._with_session, access_token, self.client.auth.sign_out)
 
             return {"message": "Logout successful"}
 
@@ -173,6 +186,9 @@ class AuthService:
         """
         Get current user data from access token
 
+        The token is verified locally when possible (see services/jwt_verifier.py);
+        email_confirmed_at and created_at are not part of the token and are None then.
+
         Args:
             access_token: User's access token
 
@@ -183,30 +199,47 @@ class AuthService:
             AuthApiError: If token is invalid
         """
         try:
-            # Get user from token
-            user_response = self.client.auth.get_user(access_token)
-
-            if not user_response.user:
-                raise AuthApiError("Invalid or expired token")
-
-            # Fetch user profile
-            profile_response = self.client.table("profiles").select("*").eq("id", user_response.user.id).single().execute()
+            user = await self._verify_token(access_token)
+            profile = await get_profile(self.client, user["id"])
 
             return {
-                "user": {
-                    "id": user_response.user.id,
-                    "email": user_response.user.email,
-                    "email_confirmed_at": user_response.user.email_confirmed_at,
-                    "created_at": user_response.user.created_at
-                },
-                "profile": profile_response.data if profile_response.data else None
+                "user": user,
+                "profile": profile
             }
 
         except AuthApiError as e:
-            raise AuthApiError(f"Failed to get user: {str(e)}")
+            raise AuthApiError(f"Failed to get user: {str(e)}", e.status)
         except Exception as e:
             raise Exception(f"Unexpected error getting user: {str(e)}")
 
+    async def _verify_token(self, access_token: str) -> Dict[str, Any]:
+        """Check the token locally, or ask Supabase if no key is available for it"""
+        if self.jwt_verifier.enabled:
+            try:
+                claims = await self.jwt_verifier.verify(access_token)
+                return {
+                    "id": claims["sub"],
+                    "email": claims.get("email"),
+                    "email_confirmed_at": None,
+                    "created_at": None
+                }
+            except KeyUnavailableError:
+                pass
+            except TokenVerificationError:
+                raise AuthApiError("Invalid or expired token", 401)
+
+        user_response = await db_run(self.client.auth.get_user, access_token)
+
+        if not user_response.user:
+            raise AuthApiError("Invalid or expired token", 401)
+
+        return {
+            "id": user_response.user.id,
+            "email": user_response.user.email,
+            "email_confirmed_at": user_response.user.email_confirmed_at,
+            "created_at": user_response.user.created_at
+        }
+
     async def verify_email(self, token: str, type_: str = "signup") -> Dict[str, str]:
         """
         Verify user email with token
@@ -222,7 +255,7 @@ class AuthService:
             AuthApiError: If verification fails
         """
         try:
-            response = self.client.auth.verify_otp({
+            response = await db_run(self.client.auth.verify_otp, {
                 "token_hash": token,
                 "type": type_
             })
@@ -254,7 +287,7 @@ class AuthService:
             if not email:
                 raise ValueError("Email is required")
 
-            self.client.auth.reset_password_email(email)
+            await db_run(self.client.auth.reset_password_email, email)
 
             return {"message": "Password reset email sent. Please check your inbox."}
 
@@ -283,8 +316,10 @@ class AuthService:
                 raise ValueError("Password must be at least 6 characters")
 
             # Set session and update password
-            self.client.auth.set_session(access_token, access_token)
-            self.client.auth.update_user({"password": new_password})
+            await db_run(
+                self._with_session, access_token,
+                lambda: self.client.auth.update_user({"password": new_password})
+            )
 
             return {"message": "Password updated successfully"}
 
@@ -307,8 +342,7 @@ class AuthService:
             Exception: If query fails
         """
         try:
-            response = self.client.table("profiles").select("*").eq("id", user_id).single().execute()
-            return response.data if response.data else None
+            return await get_profile(self.client, user_id)
 
         except Exception as e:
             raise Exception(f"Failed to get user profile: {str(e)}")
@@ -347,7 +381,8 @@ class AuthService:
             if not update_data:
                 raise ValueError("No data provided for update")
 
-            response = self.client.table("profiles").update(update_data).eq("id", user_id).execute()
+            response = await db_execute(self.client.table("profiles").update(update_data).eq("id", user_id))
+            invalidate_profile(user_id)
 
             if not response.data:
                 raise Exception("Profile update failed")
@@ -0,0 +1,258 @@
+"""
+Crawl Cancellation
+Cooperative cancellation and wall-clock deadlines for running campaign crawls.
+
+Every crawl gets a CancellationToken from the registry. Pipeline stages check
+it between units of work (result pages, leads, scrape chunks, tiles) and raise
+CrawlCancelled; work that blocks (HTTP bodies, Selenium page loads) registers
+an abort callback that runs the moment the token is cancelled. The token
+reaches the Deep Scraper's worker threads through cancellation_scope(), so
+PageFetcher and Selenium pick it up without extra parameters.
+
+    token = get_crawl_registry().start(campaign_id, deadline_s=3600)
+    ...
+    get_crawl_registry().cancel(campaign_id)        # DELETE /api/campaigns/{id}
+
+Cancelling from another uvicorn worker goes through Redis (when configured):
+the flag is polled by token checks at most every CRAWL_CANCEL_POLL_SECONDS.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+from services.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock limit per crawl (below CREDIT_RESERVATION_TTL_MINUTES, so a crawl
+# stops and settles before its reservation could expire)
+CRAWL_DEADLINE_MINUTES = float(os.getenv('CRAWL_DEADLINE_MINUTES', 120))
+CRAWL_CANCEL_POLL_SECONDS = float(os.getenv('CRAWL_CANCEL_POLL_SECONDS', 1))
+
+
+class CrawlCancelled(Exception):
+    """The crawl was cancelled or ran past its deadline"""
+
+    def __init__(self, reason: str = 'cancelled'):
+        self.reason = reason
+        super().__init__(f"Crawl {reason}")
+
+
+class CancellationToken:
+    """Thread-safe cancel flag with an optional deadline and abort callbacks"""
+
+    def __init__(self, deadline_s: Optional[float] = None, remote_check: Optional[Callable[[], Optional[str]]] = None):
+        """
+        Args:
+            deadline_s: Seconds until the token cancels itself with reason 'deadline'
+                (None or <= 0 = no deadline)
+            remote_check: Returns the reason if another worker asked to cancel, else None (polled)
+        """
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self.reason: Optional[str] = None
+        if deadline_s is not None and deadline_s <= 0:
+            deadline_s = None
+        self.deadline = time.monotonic() + deadline_s if deadline_s else None
+        self._remote_check = remote_check
+        self._last_poll = 0.0
+        self._timer = None
+        if deadline_s:
+            self._timer = threading.Timer(deadline_s, self.cancel, args=('deadline',))
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self._remote_check and time.monotonic() - self._last_poll >= CRAWL_CANCEL_POLL_SECONDS:
+            self._last_poll = time.monotonic()
+            reason = self._remote_check()
+            if reason:
+                self.cancel(reason)
+                return True
+        return False
+
+    def cancel(self, reason: str = 'cancelled') -> None:
+        """Set the flag and run the abort callbacks (first call only)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+        logger.info("🛑 Cancelling crawl work (%s), aborting %d in-flight operation(s)", reason, len(callbacks))
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug("Abort callback failed: %s", e)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise CrawlCancelled(self.reason)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (None = no deadline)"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def sleep(self, seconds: float) -> None:
+        """time.sleep that wakes up and raises as soon as the token is cancelled"""
+        if self._event.wait(seconds):
+            raise CrawlCancelled(self.reason)
+        self.raise_if_cancelled()
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """Run callback (e.g. close a response, quit a browser) if cancelled while inside the block"""
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+            else:
+                callback_id = None
+        if callback_id is None:
+            raise CrawlCancelled(self.reason)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.pop(callback_id, None)
+
+    def close(self) -> None:
+        """Stop the deadline timer (crawl finished)"""
+        if self._timer is not None:
+            self._timer.cancel()
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar('crawl_cancellation_token', default=None)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Token of the crawl this thread/task works for (None outside crawls)"""
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: Optional[CancellationToken]) -> Iterator[None]:
+    """Make token visible to current_token() / check_cancelled() in this context"""
+    reset = _current_token.set(token)
+    try:
+        yield
+    finally:
+        _current_token.reset(reset)
+
+
+def check_cancelled() -> None:
+    """Raise CrawlCancelled if the current crawl was cancelled (no-op outside crawls)"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class CrawlRegistry:
+    """Tokens of the crawls running in this process, by campaign"""
+
+    def __init__(self, redis_client=None, namespace: str = 'crawl:cancel'):
+        self.redis = redis_client
+        self.namespace = namespace
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._lock = threading.Lock()
+
+    def _remote_check(self, campaign_id: str) -> Optional[Callable[[], Optional[str]]]:
+        if self.redis is None:
+            return None
+        key = f"{self.namespace}:{campaign_id}"
+
+        def check() -> Optional[str]:
+            # The flag holds the reason ('cancelled', 'deleted'), so the crawl
+            # takes the same path as when cancelled in its own worker
+            try:
+                reason = self.redis.get(key)
+            except Exception as e:
+                logger.debug("Cancel flag lookup failed: %s", e)
+                return None
+            if reason is None:
+                return None
+            return (reason.decode() if isinstance(reason, bytes) else reason) or 'cancelled'
+        return check
+
+    def start(self, campaign_id: str, deadline_s: Optional[float] = None) -> CancellationToken:
+        """
+        Register a crawl
+
+        Args:
+            campaign_id: Campaign being crawled
+            deadline_s: Wall-clock limit in seconds (None = no deadline)
+
+        Returns:
+            Token to check and pass to the pipeline stages
+        """
+        if self.redis is not None:
+            try:
+                # A cancel flag left over from an earlier run must not stop this one
+                self.redis.delete(f"{self.namespace}:{campaign_id}")
+            except Exception as e:
+                logger.debug("Could not clear cancel flag: %s", e)
+        token = CancellationToken(deadline_s, self._remote_check(campaign_id))
+        with self._lock:
+            previous = self._tokens.get(campaign_id)
+            self._tokens[campaign_id] = token
+        if previous is not None:
+            previous.cancel('superseded')
+        return token
+
+    def cancel(self, campaign_id: str, reason: str = 'cancelled') -> bool:
+        """
+        Cancel a running crawl (here or, through Redis, in another worker)
+
+        Returns:
+            True if the crawl was running in this process
+        """
+        with self._lock:
+            token = self._tokens.get(campaign_id)
+        if token is not None:
+            token.cancel(reason)
+        elif self.redis is not None:
+            try:
+                self.redis.set(f"{self.namespace}:{campaign_id}", reason, ex=int(CRAWL_DEADLINE_MINUTES * 60) or 3600)
+            except Exception as e:
+                logger.warning("⚠️  Could not publish cancel flag for campaign %s: %s", campaign_id, e)
+        return token is not None
+
+    def finish(self, campaign_id: str, token: CancellationToken) -> None:
+        """Unregister a finished crawl"""
+        token.close()
+        with self._lock:
+            if self._tokens.get(campaign_id) is token:
+                del self._tokens[campaign_id]
+
+    def running(self) -> List[str]:
+        with self._lock:
+            return list(self._tokens)
+
+
+# Singleton instance
+_crawl_registry = None
+_crawl_registry_lock = threading.Lock()
+
+def get_crawl_registry() -> CrawlRegistry:
+    """Get or create CrawlRegistry instance"""
+    global _crawl_registry
+    if _crawl_registry is None:
+        with _crawl_registry_lock:
+            if _crawl_registry is None:
+                _crawl_registry = CrawlRegistry(redis_client=get_single_flight().redis)
+    return _crawl_registry
@@ -0,0 +1,179 @@
+"""
+Config Cache
+Per-process TTL + LRU cache for rows that are read on almost every request
+but rarely written: profiles and campaign configs.
+
+Write paths call invalidate_profile / invalidate_campaign. Other uvicorn
+workers keep their copy until it expires, so the TTLs are short
+(PROFILE_CACHE_TTL_SECONDS, CAMPAIGN_CACHE_TTL_SECONDS).
+
+Hit/miss counts and approximate memory use are exported on /metrics
+(voyanero_cache_requests_total, voyanero_cache_entries, voyanero_cache_bytes).
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from services.async_db import db_execute
+from services.metrics import record_cache, record_cache_size
+
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv('PROFILE_CACHE_TTL_SECONDS', 30))
+CAMPAIGN_CACHE_TTL_SECONDS = float(os.getenv('CAMPAIGN_CACHE_TTL_SECONDS', 60))
+CONFIG_CACHE_MAX_ENTRIES = int(os.getenv('CONFIG_CACHE_MAX_ENTRIES', 5000))
+
+MISSING = object()
+
+
+def approximate_size(value: Any) -> int:
+    """Rough deep size of JSON-like data (dicts, lists, scalars) in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approximate_size(item) for item in value)
+    return size
+
+
+class TTLCache:
+    """Thread-safe cache with per-entry expiry and least-recently-used eviction"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at, value, size)
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any, int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or MISSING if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                record_cache(self.name, 'hit')
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+        record_cache(self.name, 'miss')
+        return MISSING
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = approximate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+            self._report()
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._report()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._report()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value, loaded with loader() on a miss (None results are not cached)
+
+        Args:
+            key: Cache key
+            loader: Coroutine function returning the value to cache
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        value = self.get(key)
+        if value is MISSING:
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes}
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _report(self) -> None:
+        record_cache_size(self.name, len(self._entries), self._bytes)
+
+
+profile_cache = TTLCache('profile', CONFIG_CACHE_MAX_ENTRIES, PROFILE_CACHE_TTL_SECONDS)
+campaign_cache = TTLCache('campaign', CONFIG_CACHE_MAX_ENTRIES, CAMPAIGN_CACHE_TTL_SECONDS)
+
+
+async def get_profile(supabase, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Profile row (select *), cached per user
+
+    Args:
+        supabase: Supabase client to load with on a miss
+        user_id: Profile / user ID
+
+    Returns:
+        Copy of the profile row, or None if it does not exist
+    """
+    async def load():
+        response = await db_execute(supabase.table('profiles').select('*').eq('id', user_id).maybe_single())
+        return response.data if response and response.data else None
+
+    profile = await profile_cache.get_or_load(user_id, load)
+    return dict(profile) if profile else None
+
+
+async def get_campaign(supabase, campaign_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Campaign row (select *), cached per campaign
+
+    Args:
+        supabase: Supabase client to load with on a miss
+        campaign_id: Campaign ID
+
+    Returns:
+        Copy of the campaign row, or None if it does not exist
+    """
+    async def load():
+        response = await db_execute(supabase.table('campaigns').select('*').eq('id', campaign_id).maybe_single())
+        return response.data if response and response.data else None
+
+    campaign = await campaign_cache.get_or_load(campaign_id, load)
+    return dict(campaign) if campaign else None
+
+
+def cache_campaign(campaign: Dict[str, Any]) -> None:
+    """Prime the cache with a campaign row that was just written"""
+    campaign_cache.set(campaign['id'], dict(campaign))
+
+
+def invalidate_profile(user_id: str) -> None:
+    """Call after writing a profile (including credit balance changes)"""
+    profile_cache.invalidate(user_id)
+
+
+def invalidate_campaign(campaign_id: str) -> None:
+    """Call after writing a campaign"""
+    campaign_cache.invalidate(campaign_id)
@@ -0,0 +1,273 @@
+"""
+Crawl Capacity
+One process-wide pool for all website scraping, shared fairly between users
+and campaigns instead of a ThreadPoolExecutor per scrape_batch call:
+
+    CRAWL_HTTP_CONCURRENCY   websites scraped at once by batch work
+                             (campaign Deep Scraper, /api/impressum/batch)
+    CRAWL_PRIORITY_SLOTS     extra slots only the priority lane may use, so an
+                             interactive crawl_single never waits behind batches
+    CRAWL_BROWSER_SESSIONS   Selenium browsers open at once
+
+Queued batch work is dispatched by weighted fair queuing on two levels: the
+user with the least service so far goes next, and within that user the
+campaign (flow) with the least service. Service is virtual time, advanced by
+1/weight per dispatched website. A user or flow that becomes active starts
+at the current minimum, so idle time is not saved up for a later burst.
+
+    capacity = get_crawl_capacity()
+    future = capacity.submit(scrape, url, user_id=user_id, flow=campaign_id, max_running=10)
+    future = capacity.submit(scrape_and_cache, website, domain, priority=True)
+"""
+
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import copy_context
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from services.cancellation import check_cancelled
+from services.metrics import record_crawl_capacity
+
+logger = logging.getLogger(__name__)
+
+CRAWL_HTTP_CONCURRENCY = int(os.getenv('CRAWL_HTTP_CONCURRENCY', 20))
+CRAWL_PRIORITY_SLOTS = int(os.getenv('CRAWL_PRIORITY_SLOTS', 2))
+CRAWL_BROWSER_SESSIONS = int(os.getenv('CRAWL_BROWSER_SESSIONS', 2))
+
+
+class _Task:
+    __slots__ = ('fn', 'args', 'future', 'context', 'flow')
+
+    def __init__(self, fn: Callable, args: tuple):
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+        # Contextvars (cancellation token, log context) as seen by the caller
+        self.context = copy_context()
+        self.flow: Optional['_Flow'] = None
+
+
+class _Flow:
+    """Queued and running batch work of one campaign (or one anonymous batch)"""
+
+    def __init__(self, key: str, user: '_User', vtime: float):
+        self.key = key
+        self.user = user
+        self.queue: Deque[_Task] = deque()
+        self.running = 0
+        self.max_running: Optional[int] = None
+        self.weight = 1.0
+        self.vtime = vtime
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.queue) and (self.max_running is None or self.running < self.max_running)
+
+
+class _User:
+    def __init__(self, key: str, vtime: float):
+        self.key = key
+        self.flows: Dict[str, _Flow] = {}
+        self.weight = 1.0
+        self.vtime = vtime
+
+
+class CrawlCapacity:
+    """Shared scrape pool with fair queuing, a priority lane and a browser cap"""
+
+    def __init__(
+        self,
+        http_concurrency: int = CRAWL_HTTP_CONCURRENCY,
+        priority_slots: int = CRAWL_PRIORITY_SLOTS,
+        browser_sessions: int = CRAWL_BROWSER_SESSIONS
+    ):
+        """
+        Args:
+            http_concurrency: Websites scraped at once by batch work
+            priority_slots: Additional slots reserved for the priority lane
+            browser_sessions: Selenium browsers open at once
+        """
+        self.http_concurrency = max(1, http_concurrency)
+        self.priority_slots = max(0, priority_slots)
+        self.browser_sessions = max(1, browser_sessions)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.http_concurrency + self.priority_slots, thread_name_prefix='crawl'
+        )
+        self._browsers = threading.BoundedSemaphore(self.browser_sessions)
+        self._lock = threading.Lock()
+        self._users: Dict[str, _User] = {}
+        self._priority: Deque[_Task] = deque()
+        self._running_batch = 0
+        self._running_priority = 0
+        self._browsers_open = 0
+
+    def submit(
+        self,
+        fn: Callable,
+        *args: Any,
+        user_id: Optional[str] = None,
+        flow: Optional[str] = None,
+        priority: bool = False,
+        max_running: Optional[int] = None,
+        weight: float = 1.0
+    ) -> Future:
+        """
+        Queue fn(*args) for a scrape slot
+
+        Args:
+            fn: Blocking callable (runs in the shared pool with the caller's contextvars)
+            user_id: Tenant the work is billed to (None = shared 'anonymous' tenant)
+            flow: Campaign or batch within the user's share (None = a flow of its own)
+            priority: Interactive work - dispatched before all batch work and
+                may use the reserved priority slots
+            max_running: Cap on this flow's running tasks (scrape_batch's max_workers)
+            weight: Relative share of this flow and its user (default 1)
+
+        Returns:
+            Future of the result; cancelling it while queued drops the task
+        """
+        task = _Task(fn, args)
+        with self._lock:
+            if priority:
+                self._priority.append(task)
+            else:
+                user = self._users.get(user_id or 'anonymous')
+                if user is None:
+                    user = _User(user_id or 'anonymous', self._min_vtime(self._users.values()))
+                    self._users[user.key] = user
+                flow_key = flow or uuid.uuid4().hex
+                flow_state = user.flows.get(flow_key)
+                if flow_state is None:
+                    flow_state = _Flow(flow_key, user, self._min_vtime(user.flows.values()))
+                    user.flows[flow_key] = flow_state
+                flow_state.max_running = max_running
+                flow_state.weight = user.weight = max(weight, 0.01)
+                flow_state.queue.append(task)
+            self._dispatch_locked()
+        return task.future
+
+    @staticmethod
+    def _min_vtime(entries) -> float:
+        return min((entry.vtime for entry in entries), default=0.0)
+
+    def _next_task_locked(self) -> Optional[_Task]:
+        running = self._running_batch + self._running_priority
+        if self._priority and running < self.http_concurrency + self.priority_slots:
+            self._running_priority += 1
+            return self._priority.popleft()
+
+        if self._running_batch >= self.http_concurrency or running >= self.http_concurrency + self.priority_slots:
+            return None
+
+        # Least-served user first, then that user's least-served flow
+        for user in sorted(self._users.values(), key=lambda u: u.vtime):
+            ready = [flow for flow in user.flows.values() if flow.ready]
+            if not ready:
+                continue
+            flow = min(ready, key=lambda f: f.vtime)
+            task = flow.queue.popleft()
+            task.flow = flow
+            flow.running += 1
+            flow.vtime += 1 / flow.weight
+            user.vtime += 1 / user.weight
+            self._running_batch += 1
+            return task
+        return None
+
+    def _dispatch_locked(self) -> None:
+        while True:
+            task = self._next_task_locked()
+            if task is None:
+                break
+            self._executor.submit(self._run, task)
+        self._record_locked()
+
+    def _run(self, task: _Task) -> None:
+        try:
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    result = task.context.run(task.fn, *task.args)
+                except BaseException as e:
+                    task.future.set_exception(e)
+                else:
+                    task.future.set_result(result)
+        finally:
+            with self._lock:
+                flow = task.flow
+                if flow is None:
+                    self._running_priority -= 1
+                else:
+                    self._running_batch -= 1
+                    flow.running -= 1
+                    self._forget_idle_locked(flow)
+                self._dispatch_locked()
+
+    def _forget_idle_locked(self, flow: _Flow) -> None:
+        if flow.queue or flow.running:
+            return
+        user = flow.user
+        if user.flows.get(flow.key) is flow:
+            del user.flows[flow.key]
+        if not user.flows and self._users.get(user.key) is user:
+            del self._users[user.key]
+
+    def _record_locked(self) -> None:
+        queued = sum(len(flow.queue) for user in self._users.values() for flow in user.flows.values())
+        record_crawl_capacity('batch', self._running_batch, queued)
+        record_crawl_capacity('priority', self._running_priority, len(self._priority))
+
+    @contextmanager
+    def browser_session(self) -> Iterator[None]:
+        """
+        Hold one of the CRAWL_BROWSER_SESSIONS browser slots
+
+        Waiting for a slot stops with CrawlCancelled if the current crawl is cancelled.
+        """
+        while not self._browsers.acquire(timeout=0.5):
+            check_cancelled()
+        with self._lock:
+            self._browsers_open += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._browsers_open -= 1
+            self._browsers.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Running and queued work per lane, and queued websites per user"""
+        with self._lock:
+            return {
+                'running': self._running_batch,
+                'running_priority': self._running_priority,
+                'queued_priority': len(self._priority),
+                'browsers_open': self._browsers_open,
+                'queued_by_user': {
+                    user.key: sum(len(flow.queue) for flow in user.flows.values())
+                    for user in self._users.values()
+                },
+            }
+
+
+# Singleton instance
+_crawl_capacity = None
+_crawl_capacity_lock = threading.Lock()
+
+def get_crawl_capacity() -> CrawlCapacity:
+    """Get or create CrawlCapacity instance"""
+    global _crawl_capacity
+    if _crawl_capacity is None:
+        with _crawl_capacity_lock:
+            if _crawl_capacity is None:
+                _crawl_capacity = CrawlCapacity()
+                logger.info(
+                    "🚦 Crawl capacity: %d scrapes (+%d priority), %d browsers",
+                    _crawl_capacity.http_concurrency, _crawl_capacity.priority_slots,
+                    _crawl_capacity.browser_sessions
+                )
+    return _crawl_capacity
@@ -0,0 +1,161 @@
+"""
+Crawl Checkpoints
+Progress of a campaign crawl, saved after every Outscraper result page and
+Deep Scraper chunk (see database/crawl_checkpoints.sql):
+
+    stage      'search' (Outscraper + filter/dedup/insert) -> 'enrich' (Deep Scraper)
+    search     SearchProgress - seed offset, planned and finished tiles
+    processed  place keys already filtered, deduplicated or inserted
+    scraped    websites the Deep Scraper already visited
+    counters   leads_added, places_received, found_count, skip reasons
+
+A crawl that failed or whose worker died is resumed from its checkpoint:
+finished seed pages and tiles are not requested from Outscraper again,
+processed places are not yielded again (no second dedup RPC) and scraped
+websites are not scraped again. Search progress is taken over only once a
+page is fully processed and saved per page, so at most the page being
+processed when the crawl stopped is handled twice (the dedup check then skips
+the leads it already inserted).
+"""
+
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from services.async_db import db_execute
+from services.search_planner import SearchProgress
+
+logger = logging.getLogger(__name__)
+
+# Deep Scraper websites per checkpoint save
+CRAWL_CHECKPOINT_SCRAPE_CHUNK = int(os.getenv('CRAWL_CHECKPOINT_SCRAPE_CHUNK', 50))
+# A 'crawling' campaign whose checkpoint was not saved for this long is
+# considered dead (worker restart) and may be resumed
+CRAWL_CHECKPOINT_STALE_SECONDS = int(os.getenv('CRAWL_CHECKPOINT_STALE_SECONDS', 900))
+
+
+@dataclass
+class CrawlCheckpoint:
+    """Resumable state of one campaign crawl"""
+    campaign_id: str
+    user_id: str
+    request: Dict[str, Any]
+    stage: str = 'search'
+    search: SearchProgress = field(default_factory=SearchProgress)
+    processed: Set[str] = field(default_factory=set)
+    scraped: Set[str] = field(default_factory=set)
+    leads_added: int = 0
+    places_received: int = 0
+    found_count: int = 0
+    skipped: Counter = field(default_factory=Counter)
+    updated_at: Optional[str] = None
+    # Added since the last save (save_crawl_checkpoint appends them)
+    _new_processed: List[str] = field(default_factory=list, repr=False)
+    _new_scraped: List[str] = field(default_factory=list, repr=False)
+
+    def mark_processed(self, keys: Iterable[Optional[str]]) -> None:
+        for key in keys:
+            if key and key not in self.processed:
+                self.processed.add(key)
+                self._new_processed.append(key)
+
+    def mark_scraped(self, urls: Iterable[str]) -> None:
+        for url in urls:
+            if url not in self.scraped:
+                self.scraped.add(url)
+                self._new_scraped.append(url)
+
+    def is_stale(self) -> bool:
+        """No save for CRAWL_CHECKPOINT_STALE_SECONDS (the crawl is no longer running)"""
+        if not self.updated_at:
+            return True
+        updated_at = datetime.fromisoformat(self.updated_at.replace('Z', '+00:00'))
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - updated_at > timedelta(seconds=CRAWL_CHECKPOINT_STALE_SECONDS)
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            'request': self.request,
+            'stage': self.stage,
+            'search': self.search.to_dict(),
+            'leads_added': self.leads_added,
+            'places_received': self.places_received,
+            'found_count': self.found_count,
+            'skipped': dict(self.skipped),
+        }
+
+    async def save(self, supabase) -> bool:
+        """
+        Persist the checkpoint (one RPC, only new place IDs and URLs are sent)
+
+        Args:
+            supabase: Supabase client
+
+        Returns:
+            True if saved - a failed save is logged and retried with the next one
+        """
+        processed, scraped = self._new_processed, self._new_scraped
+        try:
+            await db_execute(supabase.rpc('save_crawl_checkpoint', {
+                'p_campaign_id': self.campaign_id,
+                'p_user_id': self.user_id,
+                'p_state': self.state(),
+                'p_processed': processed,
+                'p_scraped': scraped
+            }))
+        except Exception as e:
+            logger.warning("⚠️  Could not save crawl checkpoint for campaign %s: %s", self.campaign_id, e)
+            return False
+
+        self._new_processed, self._new_scraped = [], []
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+        return True
+
+    async def delete(self, supabase) -> None:
+        """Drop the stored checkpoint (crawl completed, or a new crawl replaces it)"""
+        try:
+            await db_execute(supabase.table('crawl_checkpoints').delete().eq('campaign_id', self.campaign_id))
+        except Exception as e:
+            logger.warning("⚠️  Could not delete crawl checkpoint for campaign %s: %s", self.campaign_id, e)
+
+
+async def load_crawl_checkpoint(supabase, campaign_id: str) -> Optional[CrawlCheckpoint]:
+    """
+    Checkpoint of a campaign's last crawl
+
+    Args:
+        supabase: Supabase client
+        campaign_id: Campaign to look up
+
+    Returns:
+        CrawlCheckpoint, or None if the campaign has none (never crawled or completed)
+    """
+    res = await db_execute(
+        supabase.table('crawl_checkpoints')
+        .select('campaign_id, user_id, state, processed_place_ids, scraped_urls, updated_at')
+        .eq('campaign_id', campaign_id)
+        .limit(1)
+    )
+    row = res.data[0] if res.data else None
+    if not row:
+        return None
+
+    state = row.get('state') or {}
+    return CrawlCheckpoint(
+        campaign_id=row['campaign_id'],
+        user_id=row['user_id'],
+        request=state.get('request') or {},
+        stage=state.get('stage', 'search'),
+        search=SearchProgress.from_dict(state.get('search')),
+        processed=set(row.get('processed_place_ids') or []),
+        scraped=set(row.get('scraped_urls') or []),
+        leads_added=state.get('leads_added', 0),
+        places_received=state.get('places_received', 0),
+        found_count=state.get('found_count', 0),
+        skipped=Counter(state.get('skipped') or {}),
+        updated_at=row.get('updated_at'),
+    )
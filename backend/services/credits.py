@@ -0,0 +1,206 @@
+"""
+Credit Reservations
+Reserve a job's expected cost when it starts, record usage in memory while it
+runs and settle once at the end (see database/credit_reservations.sql):
+
+    reservation = await reserve_credits(supabase, user_id, 150, "Crawl for campaign ...")
+    reservation.charge(1.0, 'leads')           # per lead - no database call
+    await reservation.settle("Crawled 120 leads for campaign ...")
+
+Two RPCs per job instead of one deduct_credits call (and profiles row lock)
+per lead or email. Unused credits go back to the balance on settle; a job that
+never settles has its reservation returned after CREDIT_RESERVATION_TTL_MINUTES.
+
+Amounts are summed as Decimal (0.5 per email, 1.6 per AI lead) so many small
+charges do not drift, and settle writes one transaction row per line item in a
+single insert. charge_credits() does the same for usage that is known up
+front, without a reservation (deduct_credits_batch).
+"""
+
+import logging
+import os
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Union
+
+from services.async_db import db_execute
+from services.config_cache import invalidate_profile
+
+logger = logging.getLogger(__name__)
+
+CREDIT_RESERVATION_TTL_MINUTES = int(os.getenv('CREDIT_RESERVATION_TTL_MINUTES', 180))
+
+# credits_balance / credit_transactions.amount are NUMERIC(10, 2)
+CREDIT_PRECISION = Decimal('0.01')
+
+Amount = Union[int, float, str, Decimal]
+
+
+def to_credits(amount: Amount) -> Decimal:
+    """Credit amount as Decimal, rounded to the ledger's two decimal places"""
+    return Decimal(str(amount)).quantize(CREDIT_PRECISION, rounding=ROUND_HALF_UP)
+
+
+def _line_item(amount: Decimal, description: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """JSON line item for the ledger RPCs (PostgREST sends floats, Postgres reads NUMERIC)"""
+    return {'amount': float(amount), 'description': description, 'metadata': metadata or {}}
+
+
+class InsufficientCreditsError(Exception):
+    """The balance does not cover the reservation"""
+
+    def __init__(self, balance: float, required: float):
+        self.balance = balance
+        self.required = required
+        super().__init__(
+            f"Insufficient credits. You have {balance} credits but need {required} credits. "
+            f"Please purchase more credits."
+        )
+
+
+class CreditReservationError(Exception):
+    """Reserve or settle RPC failed"""
+
+
+class CreditReservation:
+    """Credits held for one job, with usage accumulated per line item"""
+
+    def __init__(self, supabase, reservation_id: str, user_id: str, amount: Amount):
+        self.supabase = supabase
+        self.id = reservation_id
+        self.user_id = user_id
+        self.amount = to_credits(amount)
+        self.usage: Dict[str, Decimal] = defaultdict(Decimal)
+        self.quantities: Dict[str, int] = defaultdict(int)
+        self.settled = False
+
+    @property
+    def charged(self) -> Decimal:
+        """Usage recorded so far"""
+        return to_credits(sum(self.usage.values(), Decimal(0)))
+
+    def charge(self, amount: Amount, item: str = 'usage', quantity: int = 1) -> None:
+        """Record usage (settled later in one call)"""
+        self.usage[item] += Decimal(str(amount))
+        self.quantities[item] += quantity
+
+    async def settle(self, description: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Charge the recorded usage and return the rest of the reservation
+
+        Args:
+            description: Transaction description shown in the credit history
+            metadata: Extra metadata for every line item's transaction row
+
+        Returns:
+            RPC result (amount_charged, amount_released, uncovered, new_balance, transaction_count)
+
+        Raises:
+            CreditReservationError: If the reservation could not be settled
+        """
+        if self.settled:
+            raise CreditReservationError(f"Reservation {self.id} is already settled")
+
+        items = [
+            _line_item(to_credits(amount), f"{description} - {item}",
+                       {'item': item, 'quantity': self.quantities[item]})
+            for item, amount in self.usage.items() if to_credits(amount) > 0
+        ]
+        result = await db_execute(self.supabase.rpc('settle_credit_reservation', {
+            'p_reservation_id': self.id,
+            'p_amount': float(self.charged),
+            'p_description': description,
+            'p_metadata': metadata or {},
+            'p_items': items
+        }))
+        self.settled = True
+        invalidate_profile(self.user_id)
+
+        data = result.data or {}
+        if not data.get('success'):
+            raise CreditReservationError(f"Failed to settle reservation {self.id}: {data.get('error')}")
+        if data.get('uncovered'):
+            logger.warning("⚠️  %s credits of reservation %s exceeded the balance and were not charged",
+                           data['uncovered'], self.id)
+        return data
+
+
+async def reserve_credits(
+    supabase,
+    user_id: str,
+    amount: Amount,
+    description: str,
+    metadata: Optional[Dict[str, Any]] = None
+) -> CreditReservation:
+    """
+    Hold credits for a job
+
+    Args:
+        supabase: Supabase client
+        user_id: User to reserve from
+        amount: Credits to hold (the job's expected cost)
+        description: What the reservation is for
+        metadata: Extra reservation metadata (e.g. campaign_id)
+
+    Returns:
+        CreditReservation to record usage on and settle
+
+    Raises:
+        InsufficientCreditsError: If the balance does not cover amount
+        CreditReservationError: If the user does not exist or the RPC failed
+    """
+    result = await db_execute(supabase.rpc('reserve_credits', {
+        'p_user_id': user_id,
+        'p_amount': float(to_credits(amount)),
+        'p_description': description,
+        'p_metadata': metadata or {},
+        'p_ttl_minutes': CREDIT_RESERVATION_TTL_MINUTES
+    }))
+    invalidate_profile(user_id)
+
+    data = result.data or {}
+    if not data.get('success'):
+        if data.get('error') == 'Insufficient credits':
+            raise InsufficientCreditsError(data.get('current_balance'), data.get('required'))
+        raise CreditReservationError(f"Failed to reserve credits: {data.get('error')}")
+
+    return CreditReservation(supabase, data['reservation_id'], user_id, amount)
+
+
+async def charge_credits(
+    supabase,
+    user_id: str,
+    items: List[Dict[str, Any]],
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Deduct several line items at once (one RPC, one profiles row lock, one insert)
+
+    Args:
+        supabase: Supabase client
+        user_id: User to charge
+        items: Line items as {'amount', 'description', 'metadata'} (amount may be fractional)
+        metadata: Extra metadata for every transaction row
+
+    Returns:
+        RPC result (previous_balance, new_balance, amount_deducted, transaction_count)
+
+    Raises:
+        InsufficientCreditsError: If the balance does not cover the whole batch
+        CreditReservationError: If the user does not exist or an amount is not positive
+    """
+    payload = [_line_item(to_credits(item['amount']), item.get('description'), item.get('metadata'))
+               for item in items]
+    result = await db_execute(supabase.rpc('deduct_credits_batch', {
+        'p_user_id': user_id,
+        'p_items': payload,
+        'p_metadata': metadata or {}
+    }))
+    invalidate_profile(user_id)
+
+    data = result.data or {}
+    if not data.get('success'):
+        if data.get('error') == 'Insufficient credits':
+            raise InsufficientCreditsError(data.get('current_balance'), data.get('required'))
+        raise CreditReservationError(f"Failed to charge credits: {data.get('error')}")
+    return data
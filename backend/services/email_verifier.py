@@ -3,11 +3,16 @@ Email Verifier Service
 Validates email addresses with syntax check, MX record verification, and fake email filtering
 """
 
+import logging
 from email_validator import validate_email, EmailNotValidError
 import dns.resolver
 from typing import Optional, Dict
 import re
 
+from services.logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
+
 class EmailVerifier:
     """Service for email validation and verification"""
     
@@ -65,7 +70,7 @@ class EmailVerifier:
         except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers, IndexError):
             return False
         except Exception as e:
-            print(f"⚠️  MX verification error for {email}: {str(e)}")
+            logger.debug("⚠️  MX verification error for %s: %s", email, e, extra=SAMPLED)
             return False
     
     def is_fake_email(self, email: str) -> bool:
@@ -0,0 +1,304 @@
+"""
+Impressum Cache Service
+TTL handling, persistence and conditional revalidation for the impressum_cache table
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict
+
+from services.supabase_client import get_supabase_client
+from services.impressum_scraper import get_impressum_scraper
+from services.cancellation import CrawlCancelled
+from services.crawl_capacity import get_crawl_capacity
+from services.metrics import track_stage
+from services.single_flight import SingleFlight, get_single_flight
+from services.logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+# Soft TTL: entries are fresh for 90 days after the last crawl or successful revalidation
+CACHE_SOFT_TTL_DAYS = int(os.getenv('IMPRESSUM_CACHE_SOFT_TTL_DAYS', os.getenv('IMPRESSUM_CACHE_TTL_DAYS', 90)))
+
+# Hard TTL: between soft and hard TTL a stale entry is served while it is refreshed in the background
+CACHE_HARD_TTL_DAYS = int(os.getenv('IMPRESSUM_CACHE_HARD_TTL_DAYS', 180))
+
+# Background refresher revalidates entries this many days before they expire
+REFRESH_WINDOW_DAYS = int(os.getenv('IMPRESSUM_REFRESH_WINDOW_DAYS', 7))
+REFRESH_INTERVAL_SECONDS = int(os.getenv('IMPRESSUM_REFRESH_INTERVAL_SECONDS', 3600))
+REFRESH_BATCH_SIZE = int(os.getenv('IMPRESSUM_REFRESH_BATCH_SIZE', 50))
+
+# Refreshes share the crawl pool's normal lane; cap how many slots they may hold at once
+REFRESH_MAX_RUNNING = int(os.getenv('IMPRESSUM_REFRESH_MAX_RUNNING', 2))
+REFRESH_FLOW = 'impressum_cache_refresh'
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a Supabase timestamp (naive timestamps are UTC)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def cache_age(cached: Dict) -> timedelta:
+    """Age of a cache entry, counted from the last crawl or revalidation"""
+    reference = cached.get('revalidated_at') or cached['crawled_at']
+    return datetime.now(timezone.utc) - parse_timestamp(reference)
+
+
+def is_fresh(cached: Dict) -> bool:
+    """Check if cache entry is still within the soft TTL"""
+    return cache_age(cached) < timedelta(days=CACHE_SOFT_TTL_DAYS)
+
+
+def is_servable_stale(cached: Dict) -> bool:
+    """Check if an expired entry may still be served while it is refreshed (within the hard TTL)"""
+    return cache_age(cached) < timedelta(days=CACHE_HARD_TTL_DAYS)
+
+
+def build_cache_row(result: Dict, website: Optional[str] = None) -> Dict:
+    """Build an impressum_cache row from a scrape_website result"""
+    return {
+        "domain": result['domain'],
+        "website": website or result['url'],
+        "email": result.get('email'),
+        "email_verified": result.get('verified', False),
+        "is_personal": result.get('is_personal', False),
+        "all_emails": result.get('all_emails', []),
+        "scraped_from": result.get('scraped_from'),
+        "success": result['success'],
+        "error_message": result.get('error'),
+        "validators": result.get('validators', {}),
+        # upsert only touches the columns we send, so the TTL reference must be reset explicitly
+        "crawled_at": datetime.now(timezone.utc).isoformat(),
+        "revalidated_at": None
+    }
+
+
+def save_result(result: Dict, website: Optional[str] = None) -> Dict:
+    """Upsert a scrape result into impressum_cache"""
+    supabase = get_supabase_client()
+    cache_data = build_cache_row(result, website)
+    with track_stage('db_write'):
+        supabase.table('impressum_cache').upsert(cache_data, on_conflict='domain').execute()
+    return cache_data
+
+
+def save_successful_result(result: Dict) -> None:
+    """
+    Upsert a batch scrape result only if it succeeded
+
+    Failures (timeouts, 403s) are not cached, so the next batch tries the domain
+    again instead of serving "no email" for the whole soft TTL.
+    """
+    if result['success']:
+        save_result(result)
+
+
+def scrape_and_cache(website: str, domain: Optional[str] = None) -> Dict:
+    """
+    Scrape a website and upsert the result into impressum_cache
+
+    Concurrent calls for the same domain share one scrape, and only that
+    leader writes the cache row.
+    """
+    def _save(result: Dict):
+        save_result({**result, 'domain': domain or result['domain']}, website)
+
+    return get_impressum_scraper().scrape_website_coalesced(website, after_scrape=_save)
+
+
+def is_unchanged(validators: Dict) -> bool:
+    """
+    Check stored pages with conditional requests
+
+    A page is unchanged if the server answers 304 or the body hash matches.
+    Nothing is parsed here - only hashed.
+
+    Args:
+        validators: {'homepage': {...}, 'impressum': {...}} as stored by build_cache_row
+
+    Returns:
+        True if every validated page is unchanged
+    """
+    if not validators or 'homepage' not in validators:
+        return False
+
+    scraper = get_impressum_scraper()
+
+    for role, page_validators in validators.items():
+        max_bytes = scraper.fetcher.IMPRESSUM_MAX_BYTES if role == 'impressum' else scraper.fetcher.DEFAULT_MAX_BYTES
+        try:
+            page = scraper.fetcher.fetch(
+                page_validators['url'],
+                max_bytes=max_bytes,
+                headers=scraper.fetcher.conditional_headers(page_validators)
+            )
+        except CrawlCancelled:
+            raise
+        except Exception as e:
+            logger.info("⚠️  Revalidation request failed for %s: %s", page_validators.get('url'), e)
+            return False
+
+        if page.not_modified:
+            continue
+        if page.content_hash and page.content_hash == page_validators.get('content_hash'):
+            continue
+        return False
+
+    return True
+
+
+def revalidate_entry(cached: Dict) -> str:
+    """
+    Revalidate a cache entry, re-scraping only if the pages changed
+
+    Args:
+        cached: impressum_cache row
+
+    Returns:
+        'unchanged' if the TTL was extended, 'recrawled' if the site was scraped again
+    """
+    supabase = get_supabase_client()
+
+    if is_unchanged(cached.get('validators') or {}):
+        supabase.table('impressum_cache').update({
+            'revalidated_at': datetime.now(timezone.utc).isoformat()
+        }).eq('domain', cached['domain']).execute()
+        logger.debug("♻️  %s unchanged - extended cache TTL", cached['domain'], extra=SAMPLED)
+        return 'unchanged'
+
+    scrape_and_cache(cached['website'], cached['domain'])
+    logger.debug("🔄 %s changed - re-scraped", cached['domain'], extra=SAMPLED)
+    return 'recrawled'
+
+
+# Domains with a background refresh in progress (request coalescing). With Redis
+# the claim is shared by all workers and this process keeps the claim tokens;
+# without Redis the set coalesces within this process only.
+_refreshing_domains = set()
+_refresh_tokens: Dict[str, str] = {}
+_refreshing_lock = threading.Lock()
+
+
+def _refresh_key(domain: str) -> str:
+    return f"{get_single_flight().namespace}:refresh:{domain}"
+
+
+def claim_refresh(domain: str) -> bool:
+    """
+    Claim the background refresh for a domain (across workers when Redis is configured)
+
+    Returns:
+        True if the caller should schedule the refresh, False if one is already running
+    """
+    flight = get_single_flight()
+    if flight.redis is not None:
+        token = uuid.uuid4().hex
+        try:
+            # Expires like a single-flight lock, so a crashed worker doesn't block refreshes
+            acquired = flight.redis.set(_refresh_key(domain), token, nx=True, px=int(flight.lock_ttl * 1000))
+        except Exception as e:
+            logger.warning("⚠️  Could not claim refresh for %s through Redis: %s", domain, e)
+        else:
+            if acquired:
+                with _refreshing_lock:
+                    _refresh_tokens[domain] = token
+            return bool(acquired)
+
+    with _refreshing_lock:
+        if domain in _refreshing_domains:
+            return False
+        _refreshing_domains.add(domain)
+        return True
+
+
+def release_refresh(domain: str) -> None:
+    """Release a claim taken with claim_refresh"""
+    with _refreshing_lock:
+        _refreshing_domains.discard(domain)
+        token = _refresh_tokens.pop(domain, None)
+    if token is None:
+        return
+    flight = get_single_flight()
+    try:
+        flight.redis.eval(SingleFlight.RELEASE_SCRIPT, 1, _refresh_key(domain), token)
+    except Exception as e:
+        logger.debug("Could not release refresh claim for %s: %s", domain, e)
+
+
+def refresh_stale_entry(cached: Dict):
+    """Background task: revalidate a stale entry claimed with claim_refresh"""
+    try:
+        revalidate_entry(cached)
+    except Exception as e:
+        logger.warning("⚠️  Background refresh failed for %s: %s", cached.get('domain'), e)
+    finally:
+        release_refresh(cached['domain'])
+
+
+def schedule_refresh(cached: Dict) -> None:
+    """Queue refresh_stale_entry for a claimed entry in the crawl pool's normal lane"""
+    try:
+        get_crawl_capacity().submit(
+            refresh_stale_entry, cached, flow=REFRESH_FLOW, max_running=REFRESH_MAX_RUNNING
+        )
+    except Exception:
+        release_refresh(cached['domain'])
+        raise
+
+
+def refresh_expiring_entries(limit: int = REFRESH_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Revalidate successful cache entries that expire within REFRESH_WINDOW_DAYS
+
+    Returns:
+        Counts per outcome
+    """
+    supabase = get_supabase_client()
+    threshold = (datetime.now(timezone.utc) - timedelta(days=CACHE_SOFT_TTL_DAYS - REFRESH_WINDOW_DAYS)).isoformat()
+
+    expiring_res = supabase.table('impressum_cache') \
+        .select('*') \
+        .eq('success', True) \
+        .lt('crawled_at', threshold) \
+        .or_(f'revalidated_at.is.null,revalidated_at.lt.{threshold}') \
+        .order('crawled_at') \
+        .limit(limit) \
+        .execute()
+
+    # Queued behind interactive crawls, sharing the normal lane with batch work
+    capacity = get_crawl_capacity()
+    futures = [
+        (cached, capacity.submit(revalidate_entry, cached, flow=REFRESH_FLOW, max_running=REFRESH_MAX_RUNNING))
+        for cached in expiring_res.data or []
+    ]
+
+    stats = {'unchanged': 0, 'recrawled': 0, 'failed': 0}
+    for cached, future in futures:
+        try:
+            stats[future.result()] += 1
+        except Exception as e:
+            stats['failed'] += 1
+            logger.warning("⚠️  Failed to refresh %s: %s", cached.get('domain'), e)
+
+    return stats
+
+
+async def run_cache_refresher():
+    """Background loop that keeps expiring cache entries fresh"""
+    logger.info("🔁 Impressum cache refresher started (every %ss)", REFRESH_INTERVAL_SECONDS)
+    while True:
+        try:
+            # Waits on the crawl pool - keep it off the event loop
+            stats = await asyncio.get_running_loop().run_in_executor(None, refresh_expiring_entries)
+            if any(stats.values()):
+                logger.info("🔁 Cache refresh: %s", stats, extra=stats)
+        except Exception as e:
+            logger.exception("⚠️  Cache refresher error: %s", e)
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
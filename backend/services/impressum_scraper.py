@@ -2,17 +2,39 @@
 Impressum Scraper Service
 Crawls websites to extract email addresses from Impressum/Contact pages
 Supports both static HTML and JavaScript-rendered content via Selenium
+
+scrape_batch(cancel=token) stops a campaign's batch when the crawl is cancelled:
+queued websites are skipped, and open responses and browsers are closed.
+Batches share one process-wide crawl pool and browser cap (crawl_capacity).
+SPA shells and bot walls are recognised from the first response and rendered
+right away; the render mode is remembered per domain (render_mode).
 """
 
+import logging
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
 import json
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Callable
 from services.email_verifier import get_email_verifier
+from services.page_fetcher import PageFetcher, FetchedPage, UnsupportedContentTypeError
+from services.page_archive import get_page_archive
+from services.sitemap_discovery import SitemapDiscovery
+from services.single_flight import get_single_flight, normalize_domain
+from services.cancellation import (
+    CancellationToken, CrawlCancelled, cancellation_scope, check_cancelled, current_token
+)
+from services.crawl_capacity import get_crawl_capacity
+from services.render_mode import BROWSER, STATIC, detect_bot_wall, detect_render_need, get_render_modes
+from services.metrics import track_stage, timed_stage, record_retry, record_fallback, record_discovery
+from services.logging_config import SAMPLED
 import time
 import os
+import uuid
+from contextlib import ExitStack, nullcontext
+
+logger = logging.getLogger(__name__)
 
 # Selenium imports
 try:
@@ -26,7 +48,103 @@ try:
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
-    print("⚠️  Selenium not available - JavaScript-rendered sites won't work")
+    logger.warning("⚠️  Selenium not available - JavaScript-rendered sites won't work")
+
+
+class SeleniumSession:
+    """
+    Selenium renders of one scrape
+    
+    The browser is started on the first render and navigates to every further
+    page, instead of one Chrome per page. Renders are memoized by URL, so a page
+    (e.g. the homepage that is also the scraped page) is rendered only once.
+    The CRAWL_BROWSER_SESSIONS slot is held from the first render until close().
+    
+        with SeleniumSession(scraper._open_browser) as browser:
+            html = browser.render(impressum_url)
+            homepage_html = browser.render(url)
+    """
+    
+    # Time JavaScript gets to render after the page has loaded
+    RENDER_WAIT_SECONDS = 3
+    
+    def __init__(self, open_browser: Callable):
+        """
+        Args:
+            open_browser: Starts a WebDriver (ImpressumScraper._open_browser)
+        """
+        self._open_browser = open_browser
+        self._pages: Dict[str, Optional[str]] = {}
+        self._driver = None
+        self._resources = ExitStack()
+        self.renders = 0
+    
+    def __enter__(self) -> 'SeleniumSession':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    @timed_stage('selenium')
+    def render(self, url: str) -> Optional[str]:
+        """
+        Args:
+            url: Page to load
+        
+        Returns:
+            Rendered HTML, or None if the page could not be loaded (also memoized)
+        """
+        if url in self._pages:
+            logger.debug("♻️  Reusing Selenium render of %s", url, extra=SAMPLED)
+            return self._pages[url]
+        
+        token = current_token()
+        try:
+            check_cancelled()
+            logger.info("🌐 Using Selenium for %s", url)
+            driver = self._driver or self._start()
+            self.renders += 1
+            
+            # Cancelling the crawl quits the browser - a pending driver.get() fails right away
+            with token.on_cancel(driver.quit) if token is not None else nullcontext():
+                # Load page
+                driver.get(url)
+                
+                # Give JavaScript time to render
+                if token is not None:
+                    token.sleep(self.RENDER_WAIT_SECONDS)
+                else:
+                    time.sleep(self.RENDER_WAIT_SECONDS)
+                
+                # Get page source
+                html = driver.page_source
+            
+            logger.debug("✅ Selenium loaded %d bytes", len(html), extra=SAMPLED)
+            
+        except CrawlCancelled:
+            raise
+        except Exception as e:
+            if token is not None and token.cancelled:
+                raise CrawlCancelled(token.reason) from e
+            logger.error("❌ Selenium error for %s: %s", url, e)
+            html = None
+            # The browser may be unusable now - the next page gets a fresh one
+            self.close()
+        
+        self._pages[url] = html
+        return html
+    
+    def _start(self):
+        # Browsers are heavy - at most CRAWL_BROWSER_SESSIONS per process, shared by all crawls
+        self._resources.enter_context(get_crawl_capacity().browser_session())
+        self._driver = self._open_browser()
+        self._resources.callback(self._driver.quit)
+        return self._driver
+    
+    def close(self) -> None:
+        """Quit the browser and free its slot (renders stay memoized)"""
+        self._driver = None
+        self._resources.close()
 
 
 class ImpressumScraper:
@@ -81,6 +199,9 @@ class ImpressumScraper:
     def __init__(self):
         self.email_verifier = get_email_verifier()
         self.session = requests.Session()
+        self.fetcher = PageFetcher(self.session)
+        self.discovery = SitemapDiscovery(self.fetcher)
+        self.archive = get_page_archive()  # None unless PAGE_ARCHIVE_BACKEND is set
         self.current_ua_index = 0
         self._update_headers()
     
@@ -101,28 +222,44 @@ class ImpressumScraper:
         })
         self.current_ua_index += 1
     
-    def _make_request_with_retry(self, url: str, max_retries: int = 3) -> Optional[requests.Response]:
+    def _make_request_with_retry(
+        self,
+        url: str,
+        max_retries: int = 3,
+        max_bytes: Optional[int] = None
+    ) -> Optional[FetchedPage]:
         """
         Make HTTP request with retry logic for 403 errors
         
+        The body is streamed through the PageFetcher, so non-HTML responses are
+        rejected before download and large pages are cut off at max_bytes.
+        
         Args:
             url: URL to fetch
             max_retries: Maximum number of retry attempts
+            max_bytes: Byte cap for the body (defaults to PageFetcher.DEFAULT_MAX_BYTES)
         
         Returns:
-            Response object or None if all retries failed
+            FetchedPage or None if all retries failed
         """
         for attempt in range(max_retries):
             try:
-                response = self.session.get(url, timeout=10, allow_redirects=True)
-                response.raise_for_status()
-                return response
+                return self.fetcher.fetch(url, max_bytes=max_bytes)
             except requests.exceptions.HTTPError as e:
+                # A challenge page answers every User-Agent the same - leave it to the browser
+                if e.response.status_code == 403 and detect_bot_wall(403, e.response.headers):
+                    logger.info("🧱 Bot wall on %s, not retrying", url)
+                    raise
                 if e.response.status_code == 403 and attempt < max_retries - 1:
                     # Rotate User-Agent and retry with exponential backoff
                     wait_time = 2 ** attempt  # 1s, 2s, 4s
-                    print(f"⚠️  403 Forbidden on {url}, retrying in {wait_time}s with new User-Agent...")
-                    time.sleep(wait_time)
+                    logger.info("⚠️  403 Forbidden on %s, retrying in %ss with new User-Agent...", url, wait_time)
+                    record_retry('http_403')
+                    token = current_token()
+                    if token is not None:
+                        token.sleep(wait_time)  # Wakes up if the crawl is cancelled
+                    else:
+                        time.sleep(wait_time)
                     self._update_headers()  # Rotate to next User-Agent
                     continue
                 else:
@@ -131,17 +268,22 @@ class ImpressumScraper:
                 # Try HTTP if HTTPS fails
                 if url.startswith('https://'):
                     url = url.replace('https://', 'http://')
-                    try:
-                        response = self.session.get(url, timeout=10, allow_redirects=True)
-                        response.raise_for_status()
-                        return response
-                    except:
-                        raise
+                    record_fallback('https_to_http')
+                    return self.fetcher.fetch(url, max_bytes=max_bytes)
                 else:
                     raise
         
         return None
     
+    def _archive_page(self, website: str, role: str, url: str, html: str, rendered: bool = False):
+        """Store raw HTML in the page archive (if enabled) - never fails the scrape"""
+        if not self.archive or not html:
+            return
+        try:
+            self.archive.put_page(self.extract_domain(website), website, role, url, html, rendered=rendered)
+        except Exception as e:
+            logger.warning("⚠️  Failed to archive %s: %s", url, e)
+    
     def extract_domain(self, url: str) -> str:
         """Extract domain from URL"""
         try:
@@ -150,6 +292,7 @@ class ImpressumScraper:
         except:
             return url
     
+    @timed_stage('discover')
     def find_impressum_url(self, base_url: str, html: str) -> Optional[str]:
         """
         Find Impressum page URL from homepage
@@ -161,15 +304,23 @@ class ImpressumScraper:
         Returns:
             URL to Impressum page or None
         """
-        soup = BeautifulSoup(html, 'lxml')
+        # First, look it up in sitemap.xml (via robots.txt) - one or two requests instead of up to 15 HEADs
+        sitemap_url = self.discovery.find_impressum_url(base_url)
+        if sitemap_url:
+            record_discovery('sitemap')
+            return sitemap_url
+        
+        soup = self._parse_html(html)
         
-        # First, try direct URL patterns
+        # Then try direct URL patterns
         for pattern in self.IMPRESSUM_PATTERNS:
+            check_cancelled()
             test_url = urljoin(base_url, pattern)
             try:
                 response = self.session.head(test_url, timeout=5, allow_redirects=True)
                 if response.status_code == 200:
-                    print(f"✅ Found Impressum at: {test_url}")
+                    logger.debug("✅ Found Impressum at: %s", test_url, extra=SAMPLED)
+                    record_discovery('url_pattern')
                     return test_url
             except:
                 continue
@@ -185,24 +336,28 @@ class ImpressumScraper:
             for pattern in self.IMPRESSUM_LINK_TEXTS:
                 if pattern in link_text:
                     impressum_url = urljoin(base_url, href)
-                    print(f"✅ Found Impressum link: {impressum_url}")
+                    logger.debug("✅ Found Impressum link: %s", impressum_url, extra=SAMPLED)
+                    record_discovery('link_text')
                     return impressum_url
     
         # Third, as a last resort, try common URL patterns directly
         # This helps when Selenium loads the page but link detection fails
-        print(f"⚠️  No Impressum link found in HTML, trying standard URL patterns...")
+        logger.debug("⚠️  No Impressum link found in HTML for %s, trying standard URL patterns...", base_url, extra=SAMPLED)
         fallback_patterns = ['/impressum/', '/impressum', '/kontakt/', '/contact/', '/imprint/']
         for pattern in fallback_patterns:
+            check_cancelled()
             test_url = urljoin(base_url, pattern)
             try:
                 response = self.session.head(test_url, timeout=3, allow_redirects=True)
                 if response.status_code == 200:
-                    print(f"✅ Found Impressum via fallback pattern: {test_url}")
+                    logger.debug("✅ Found Impressum via fallback pattern: %s", test_url, extra=SAMPLED)
+                    record_discovery('fallback_pattern')
                     return test_url
             except:
                 continue
         
-        print(f"⚠️  No Impressum page found for {base_url}")
+        logger.debug("⚠️  No Impressum page found for %s", base_url, extra=SAMPLED)
+        record_discovery('none')
         return None
     
     def is_tracking_email(self, email: str) -> bool:
@@ -220,6 +375,11 @@ class ImpressumScraper:
         except:
             return True
     
+    def _parse_html(self, html: str) -> BeautifulSoup:
+        with track_stage('parse'):
+            return BeautifulSoup(html, 'lxml')
+    
+    @timed_stage('extract')
     def extract_metadata(self, html: str) -> Dict:
         """
         Extract metadata from HTML (description, keywords, services, about text, schema.org, headlines)
@@ -230,7 +390,7 @@ class ImpressumScraper:
         Returns:
             Dictionary with extracted metadata
         """
-        soup = BeautifulSoup(html, 'lxml')
+        soup = self._parse_html(html)
         metadata = {
             'meta_description': '',
             'meta_keywords': '',
@@ -349,6 +509,7 @@ class ImpressumScraper:
         
         return metadata
 
+    @timed_stage('extract')
     def extract_emails_from_html(self, html: str) -> List[str]:
         """
         Extract all email addresses from HTML with improved accuracy
@@ -360,7 +521,7 @@ class ImpressumScraper:
         Returns:
             List of clean email addresses
         """
-        soup = BeautifulSoup(html, 'lxml')
+        soup = self._parse_html(html)
         emails = set()  # Use set to avoid duplicates
         
         # Method 1: Extract from mailto: links (most reliable)
@@ -424,7 +585,7 @@ class ImpressumScraper:
                 continue
             valid_emails.append(email)
         
-        print(f"📧 Found {len(valid_emails)} valid email(s) after filtering: {valid_emails}")
+        logger.debug("📧 Found %d valid email(s) after filtering", len(valid_emails), extra={**SAMPLED, 'emails': valid_emails})
         
         return valid_emails
     
@@ -510,121 +671,246 @@ class ImpressumScraper:
         return True
 
     
-    def scrape_with_selenium(self, url: str) -> Optional[str]:
+    def _merge_secondary_metadata(self, metadata: Dict, html: str) -> Dict:
+        """Fill gaps in homepage metadata from a secondary page (Impressum)"""
+        secondary_metadata = self.extract_metadata(html)
+        metadata['meta_description'] = secondary_metadata['meta_description']
+        if not metadata['meta_keywords']:
+            metadata['meta_keywords'] = secondary_metadata['meta_keywords']
+        # Merge services
+        metadata['services'] = list(set(metadata['services'] + secondary_metadata['services']))[:5]
+        # Merge about text
+        if not metadata['about_text']:
+            metadata['about_text'] = secondary_metadata['about_text']
+        return metadata
+    
+    def extract_from_archive(self, manifest: Dict) -> Optional[Dict]:
+        """
+        Re-run the extractors over archived pages (no network I/O)
+        
+        Args:
+            manifest: Domain manifest from the PageArchive
+        
+        Returns:
+            Result dict in the same shape as scrape_website, or None if the homepage is not archived
+        """
+        pages = manifest.get('pages', {})
+        if 'homepage' not in pages:
+            return None
+        
+        homepage_html = self.archive.load_html(pages['homepage'])
+        if homepage_html is None:
+            return None
+        
+        url = manifest['website']
+        html_to_scrape = homepage_html
+        scraped_url = url
+        if 'impressum' in pages:
+            impressum_html = self.archive.load_html(pages['impressum'])
+            if impressum_html is not None:
+                html_to_scrape = impressum_html
+                scraped_url = pages['impressum']['url']
+        
+        metadata = self.extract_metadata(homepage_html)
+        if not metadata['meta_description']:
+            metadata = self._merge_secondary_metadata(metadata, html_to_scrape)
+        
+        emails = self.extract_emails_from_html(html_to_scrape)
+        # get_best_email only does syntax/pattern checks - MX lookups are skipped on replay
+        best_email = self.email_verifier.get_best_email(emails)
+        
+        return {
+            'success': best_email is not None,
+            'url': url,
+            'domain': manifest['domain'],
+            'email': best_email,
+            'all_emails': emails,
+            'is_personal': self.email_verifier.is_personal_email(best_email) if best_email else False,
+            'scraped_from': scraped_url,
+            'error': None if best_email else ('No valid emails found' if emails else 'No emails found'),
+            'meta_description': metadata['meta_description'],
+            'meta_keywords': metadata['meta_keywords'],
+            'services': metadata['services'],
+            'about_text': metadata['about_text']
+        }
+    
+    def scrape_with_selenium(self, url: str, browser: Optional[SeleniumSession] = None) -> Optional[str]:
         """
         Scrape website using Selenium (for JavaScript-rendered content)
         
         Args:
             url: Website URL to scrape
+            browser: Session of the current scrape - reuses its browser and
+                its earlier renders (default: a browser just for this page)
         
         Returns:
             HTML content or None
         """
         if not SELENIUM_AVAILABLE:
-            print("⚠️  Selenium not available")
+            logger.warning("⚠️  Selenium not available")
             return None
         
-        driver = None
-        try:
-            print(f"🌐 Using Selenium for {url}")
-            
-            # Setup Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')  # Run in background
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            
-            # Set binary location if using Chromium in Docker
-            if os.environ.get('CHROME_BIN'):
-                chrome_options.binary_location = os.environ.get('CHROME_BIN')
-            
-            # Initialize driver
-            # In Docker we use system installed chromedriver
-            if os.environ.get('CHROMEDRIVER_PATH'):
-                service = Service(executable_path=os.environ.get('CHROMEDRIVER_PATH'))
-            else:
-                # Fallback for local development
-                try:
-                    service = Service(ChromeDriverManager().install())
-                except:
-                    # Try default path
-                    service = Service()
-
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # Load page
-            driver.get(url)
-            
-            # Wait for page to load (max 10 seconds)
-            time.sleep(3)  # Give JavaScript time to render
-            
-            # Get page source
-            html = driver.page_source
-            
-            print(f"✅ Selenium loaded {len(html)} bytes")
-            return html
-            
-        except Exception as e:
-            print(f"❌ Selenium error: {str(e)}")
-            return None
-        finally:
-            if driver:
-                driver.quit()
+        if browser is not None:
+            return browser.render(url)
+        with SeleniumSession(self._open_browser) as browser:
+            return browser.render(url)
+    
+    def _open_browser(self):
+        """Start a headless Chrome (caller holds a browser session slot)"""
+        # Setup Chrome options
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')  # Run in background
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        
+        # Set binary location if using Chromium in Docker
+        if os.environ.get('CHROME_BIN'):
+            chrome_options.binary_location = os.environ.get('CHROME_BIN')
+        
+        # Initialize driver
+        # In Docker we use system installed chromedriver
+        if os.environ.get('CHROMEDRIVER_PATH'):
+            service = Service(executable_path=os.environ.get('CHROMEDRIVER_PATH'))
+        else:
+            # Fallback for local development
+            try:
+                service = Service(ChromeDriverManager().install())
+            except:
+                # Try default path
+                service = Service()
 
+        return webdriver.Chrome(service=service, options=chrome_options)
     
     def scrape_website(self, url: str) -> Dict:
         """
         Scrape website for email addresses
         
+        Static fetch first, Selenium when the first response is a SPA shell or
+        bot wall, or when the static pages have no email. After a rendered
+        homepage the Impressum page is rendered as well. Domains remembered as
+        JS sites skip the static fetch; domains where the browser did not help
+        are not escalated again (see render_mode).
+        
         Args:
             url: Website URL to scrape
         
         Returns:
             Dictionary with scraping results
         """
+        # One browser for all renders of this site, opened only if needed
+        browser = SeleniumSession(self._open_browser)
         try:
-            print(f"🔍 Scraping: {url}")
+            logger.debug("🔍 Scraping: %s", url, extra=SAMPLED)
             
             # Ensure URL has protocol
             if not url.startswith(('http://', 'https://')):
                 url = 'https://' + url
             
             
+            domain = normalize_domain(url)
+            render_modes = get_render_modes()
+            known_mode = render_modes.get(domain)
+            render_mode = None
+            homepage_html = None
+            use_selenium = False
+            
+            # Known JS site: the static fetch would only return the empty shell again
+            if known_mode == BROWSER and SELENIUM_AVAILABLE:
+                logger.info("⚡ %s is known to need JavaScript, using Selenium", url)
+                record_fallback('selenium_known_js')
+                homepage_html = self.scrape_with_selenium(url, browser)
+                if homepage_html:
+                    use_selenium = True
+                    truncated = False
+                    validators = {}
+                    self._archive_page(url, 'homepage', url, homepage_html, rendered=True)
+            
             # Fetch homepage with retry logic
             try:
-                response = self._make_request_with_retry(url)
-                if not response:
-                    raise Exception("Failed to fetch homepage after retries")
-                
-                homepage_html = response.text
-                use_selenium = False
+                if homepage_html is None:
+                    response = self._make_request_with_retry(url)
+                    if not response:
+                        raise Exception("Failed to fetch homepage after retries")
+                    
+                    homepage_html = response.text
+                    truncated = response.truncated
+                    validators = {'homepage': response.validators}
+                    self._archive_page(url, 'homepage', response.url, homepage_html)
+                    
+                    # SPA shell or bot wall: the static HTML has no content, render it right away
+                    reason = detect_render_need(response.status_code, response.headers, homepage_html)
+                    if reason and SELENIUM_AVAILABLE and known_mode is None:
+                        logger.info("⚡ %s looks JS-rendered (%s), switching to Selenium", url, reason)
+                        record_fallback(f"selenium_{reason.split(':')[0]}")
+                        rendered_html = self.scrape_with_selenium(url, browser)
+                        if rendered_html:
+                            homepage_html = rendered_html
+                            use_selenium = True
+                            self._archive_page(url, 'homepage', url, homepage_html, rendered=True)
+            except CrawlCancelled:
+                raise
             except Exception as e:
                 # If we get 403 or other errors, try Selenium immediately
                 if '403' in str(e) and SELENIUM_AVAILABLE:
-                    print(f"⚡ Got 403 error, switching to Selenium for {url}")
-                    homepage_html = self.scrape_with_selenium(url)
+                    logger.info("⚡ Got 403 error, switching to Selenium for %s", url)
+                    record_fallback('selenium_after_403')
+                    homepage_html = self.scrape_with_selenium(url, browser)
                     if not homepage_html:
                         raise Exception(f"Failed with both requests and Selenium: {str(e)}")
                     use_selenium = True
+                    truncated = False
+                    validators = {}
+                    self._archive_page(url, 'homepage', url, homepage_html, rendered=True)
                 else:
                     raise
+            finally:
+                # Static discovery comes next - don't hold a browser slot meanwhile
+                # (unless the homepage needed it: its Impressum page is rendered next)
+                if not use_selenium:
+                    browser.close()
             
-            # Try to find Impressum page
-            impressum_url = self.find_impressum_url(url, homepage_html)
+            # Try to find Impressum page - unless the homepage is still a challenge page,
+            # then every other path of the site is walled off too
+            if detect_bot_wall(0, {}, homepage_html):
+                logger.info("🧱 %s is behind a bot wall, skipping Impressum discovery", url)
+                impressum_url = None
+            else:
+                impressum_url = self.find_impressum_url(url, homepage_html)
 
             # Extract metadata from HOMEPAGE (primary source for description/keywords)
             metadata = self.extract_metadata(homepage_html)
             
             # Scrape Impressum page if found, otherwise use homepage
-            # Skip if we're already using Selenium (it loaded the full page with JS)
-            if impressum_url and not use_selenium:
-                impressum_response = self._make_request_with_retry(impressum_url)
+            if impressum_url and use_selenium:
+                # JS site: the Impressum page is rendered too, in the homepage's browser
+                rendered_impressum = self.scrape_with_selenium(impressum_url, browser)
+                if rendered_impressum:
+                    html_to_scrape = rendered_impressum
+                    scraped_url = impressum_url
+                    self._archive_page(url, 'impressum', impressum_url, html_to_scrape, rendered=True)
+                else:
+                    html_to_scrape = homepage_html
+                    scraped_url = url
+            elif impressum_url:
+                try:
+                    impressum_response = self._make_request_with_retry(
+                        impressum_url,
+                        max_bytes=self.fetcher.IMPRESSUM_MAX_BYTES
+                    )
+                except UnsupportedContentTypeError as e:
+                    # e.g. Impressum linked as PDF - fall back to the homepage
+                    logger.debug("⏭️  Skipping Impressum page: %s", e, extra=SAMPLED)
+                    record_fallback('impressum_unsupported_type')
+                    impressum_response = None
                 if impressum_response:
                     html_to_scrape = impressum_response.text
                     scraped_url = impressum_url
+                    truncated = truncated or impressum_response.truncated
+                    validators['impressum'] = impressum_response.validators
+                    self._archive_page(url, 'impressum', impressum_url, html_to_scrape)
                 else:
                     html_to_scrape = homepage_html
                     scraped_url = url
@@ -635,35 +921,53 @@ class ImpressumScraper:
             # Extract emails from HTML (Impressum or Homepage)
             emails = self.extract_emails_from_html(html_to_scrape)
             
+            # The rendered homepage may carry the address itself (e.g. in the footer)
+            if not emails and use_selenium and scraped_url != url:
+                emails = self.extract_emails_from_html(homepage_html)
+                if emails:
+                    scraped_url = url
+            
             # If metadata from homepage was empty, try extracting from current page (Impressum)
             if not metadata['meta_description']:
-                secondary_metadata = self.extract_metadata(html_to_scrape)
-                metadata['meta_description'] = secondary_metadata['meta_description']
-                if not metadata['meta_keywords']:
-                    metadata['meta_keywords'] = secondary_metadata['meta_keywords']
-                # Merge services
-                metadata['services'] = list(set(metadata['services'] + secondary_metadata['services']))[:5]
-                # Merge about text
-                if not metadata['about_text']:
-                    metadata['about_text'] = secondary_metadata['about_text']
+                metadata = self._merge_secondary_metadata(metadata, html_to_scrape)
+            
+            # Remember what this domain needs: static HTML, or a browser - the
+            # latter only if rendering actually produced the address
+            if use_selenium:
+                render_mode = BROWSER if emails else None
+            elif emails:
+                render_mode = STATIC
             
             # HYBRID APPROACH: If no emails found and not already using Selenium, try it
-            if not emails and not use_selenium and SELENIUM_AVAILABLE:
-                print(f"⚡ No emails found with normal scraping, trying Selenium...")
-                selenium_html = self.scrape_with_selenium(scraped_url)
+            # (unless the browser found nothing more than the static fetch on this domain before)
+            if not emails and not use_selenium and SELENIUM_AVAILABLE and known_mode != STATIC:
+                logger.info("⚡ No emails found with normal scraping on %s, trying Selenium...", scraped_url)
+                record_fallback('selenium_no_emails')
+                selenium_html = self.scrape_with_selenium(scraped_url, browser)
                 if selenium_html:
+                    self._archive_page(url, 'impressum', scraped_url, selenium_html, rendered=True)
                     emails = self.extract_emails_from_html(selenium_html)
+                    render_mode = BROWSER if emails else STATIC
                     # Update metadata from Selenium HTML ONLY if homepage metadata was empty
                     # AND use the homepage URL, not the impressum URL
                     if not metadata['meta_description']:
-                        selenium_homepage_html = self.scrape_with_selenium(url)  # Use original homepage URL
+                        selenium_homepage_html = self.scrape_with_selenium(url, browser)  # Use original homepage URL (reused if already rendered)
                         if selenium_homepage_html:
+                            self._archive_page(url, 'homepage', url, selenium_homepage_html, rendered=True)
                             metadata = self.extract_metadata(selenium_homepage_html)
                     if emails:
-                        print(f"✅ Selenium found {len(emails)} email(s)!")
+                        logger.debug("✅ Selenium found %d email(s)!", len(emails), extra=SAMPLED)
+            elif not emails and known_mode == STATIC:
+                logger.debug("⏭️  Skipping Selenium for %s (static site)", url, extra=SAMPLED)
+            
+            if render_mode:
+                render_modes.remember(domain, render_mode)
+            
+            # Rendering is done - free the browser slot before email verification
+            browser.close()
             
             if not emails:
-                print(f"❌ No emails found on {scraped_url}")
+                logger.debug("❌ No emails found on %s", scraped_url, extra=SAMPLED)
                 return {
                     'success': False,
                     'url': url,
@@ -675,16 +979,18 @@ class ImpressumScraper:
                     'meta_description': metadata['meta_description'],
                     'meta_keywords': metadata['meta_keywords'],
                     'services': metadata['services'],
-                    'about_text': metadata['about_text']
+                    'about_text': metadata['about_text'],
+                    'truncated': truncated,
+                    'validators': validators
                 }
             
-            print(f"📧 Found {len(emails)} email(s): {emails}")
+            logger.debug("📧 Found %d email(s) on %s", len(emails), scraped_url, extra={**SAMPLED, 'emails': emails})
             
             # Verify and get best email
             best_email = self.email_verifier.get_best_email(emails)
             
             if not best_email:
-                print(f"⚠️  All emails failed verification")
+                logger.debug("⚠️  All emails failed verification for %s", url, extra=SAMPLED)
                 return {
                     'success': False,
                     'url': url,
@@ -696,13 +1002,16 @@ class ImpressumScraper:
                     'meta_description': metadata['meta_description'],
                     'meta_keywords': metadata['meta_keywords'],
                     'services': metadata['services'],
-                    'about_text': metadata['about_text']
+                    'about_text': metadata['about_text'],
+                    'truncated': truncated,
+                    'validators': validators
                 }
             
             # Verify the best email
-            verification = self.email_verifier.verify_email(best_email, check_mx=True)
+            with track_stage('verify'):
+                verification = self.email_verifier.verify_email(best_email, check_mx=True)
             
-            print(f"✅ Best email: {best_email} (verified: {verification['valid']})")
+            logger.debug("✅ Best email: %s (verified: %s)", best_email, verification['valid'], extra=SAMPLED)
             
             return {
                 'success': True,
@@ -717,11 +1026,15 @@ class ImpressumScraper:
                 'meta_description': metadata['meta_description'],
                 'meta_keywords': metadata['meta_keywords'],
                 'services': metadata['services'],
-                'about_text': metadata['about_text']
+                'about_text': metadata['about_text'],
+                'truncated': truncated,
+                'validators': validators
             }
             
+        except CrawlCancelled:
+            raise
         except requests.exceptions.Timeout:
-            print(f"⏱️  Timeout scraping {url}")
+            logger.warning("⏱️  Timeout scraping %s", url)
             return {
                 'success': False,
                 'url': url,
@@ -730,7 +1043,7 @@ class ImpressumScraper:
                 'error': 'Timeout'
             }
         except requests.exceptions.RequestException as e:
-            print(f"❌ Request error scraping {url}: {str(e)}")
+            logger.warning("❌ Request error scraping %s: %s", url, e)
             return {
                 'success': False,
                 'url': url,
@@ -739,7 +1052,7 @@ class ImpressumScraper:
                 'error': f'Request error: {str(e)}'
             }
         except Exception as e:
-            print(f"💥 Error scraping {url}: {str(e)}")
+            logger.exception("💥 Error scraping %s: %s", url, e)
             return {
                 'success': False,
                 'url': url,
@@ -747,42 +1060,126 @@ class ImpressumScraper:
                 'email': None,
                 'error': str(e)
             }
+        finally:
+            browser.close()
+    
+    def scrape_website_coalesced(self, url: str, after_scrape: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Scrape website, sharing one in-flight scrape per domain
+        
+        Concurrent callers for the same domain (other threads, other requests and,
+        through Redis, other uvicorn workers) wait for the leader's result instead
+        of scraping again.
+        
+        Args:
+            url: Website URL to scrape
+            after_scrape: Called with the result by the leader only (e.g. cache write)
+        
+        Returns:
+            Dictionary with scraping results
+        """
+        def _scrape():
+            result = self.scrape_website(url)
+            if after_scrape:
+                after_scrape(result)
+            return result
+        
+        # A cancelled leader's CrawlCancelled belongs to its crawl only - the
+        # followers (other campaigns, crawl_single) scrape the domain themselves
+        result = get_single_flight().do(
+            f"scrape:{normalize_domain(url)}", _scrape, leader_errors=(CrawlCancelled,)
+        )
+        
+        # A shared result may come from a different URL of the same domain (www, http)
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        return {**result, 'url': url, 'domain': self.extract_domain(url)}
     
-    def scrape_batch(self, urls: List[str], max_workers: int = 5) -> List[Dict]:
+    def scrape_batch(
+        self,
+        urls: List[str],
+        max_workers: int = 5,
+        after_scrape: Optional[Callable[[Dict], None]] = None,
+        cancel: Optional[CancellationToken] = None,
+        user_id: Optional[str] = None,
+        campaign_id: Optional[str] = None
+    ) -> List[Dict]:
         """
         Scrape multiple websites in parallel
         
+        Websites run in the shared crawl pool (see crawl_capacity), queued
+        fairly against other users' and campaigns' batches.
+        
         Args:
             urls: List of URLs to scrape
-            max_workers: Number of concurrent threads (default 5)
+            max_workers: Most websites of this batch scraped at once (default 5)
+            after_scrape: Passed to scrape_website_coalesced
+            cancel: Crawl token - once cancelled, no further website is started,
+                running fetches and browsers are aborted and the batch returns
+            user_id: User the batch runs for (fair share across users)
+            campaign_id: Campaign the batch belongs to (fair share within the user)
         
         Returns:
-            List of scraping results
+            List of scraping results (only the finished websites if cancelled)
         """
         import concurrent.futures
         
         results = []
-        print(f"🚀 Starting parallel scrape for {len(urls)} websites with {max_workers} workers")
+        logger.info("🚀 Starting parallel scrape for %d websites with %d workers", len(urls), max_workers)
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Create a future for each URL
-            future_to_url = {executor.submit(self.scrape_website, url): url for url in urls}
-            
-            for i, future in enumerate(concurrent.futures.as_completed(future_to_url)):
-                url = future_to_url[future]
-                try:
-                    data = future.result()
-                    results.append(data)
-                    print(f"[{i+1}/{len(urls)}] ✅ Completed {url}")
-                except Exception as exc:
-                    print(f"[{i+1}/{len(urls)}] 💥 Generated an exception for {url}: {exc}")
+        def _scrape(url: str) -> Dict:
+            with cancellation_scope(cancel):
+                check_cancelled()
+                return self.scrape_website_coalesced(url, after_scrape)
+        
+        capacity = get_crawl_capacity()
+        # One flow per batch: chunks of a campaign share the campaign's flow
+        flow = campaign_id or uuid.uuid4().hex
+        # Create a future for each URL
+        future_to_url = {
+            capacity.submit(_scrape, url, user_id=user_id, flow=flow, max_running=max_workers): url
+            for url in urls
+        }
+        pending = set(future_to_url)
+        completed = 0
+        try:
+            while pending:
+                if cancel is not None and cancel.cancelled:
+                    logger.info("🛑 Scrape batch cancelled with %d of %d websites done", completed, len(urls))
+                    break
+                # Short timeout while cancellable, so a cancel is noticed even if nothing finishes
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=0.5 if cancel is not None else None,
+                    return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    url = future_to_url[future]
+                    completed += 1
+                    try:
+                        data = future.result()
+                        results.append(data)
+                        logger.debug("[%d/%d] ✅ Completed %s", completed, len(urls), url, extra=SAMPLED)
+                        continue
+                    except (CrawlCancelled, concurrent.futures.CancelledError) as exc:
+                        # Only this batch's own cancellation drops a website silently
+                        if cancel is not None and cancel.cancelled:
+                            continue
+                        error = exc
+                    except Exception as exc:
+                        error = exc
+                    logger.error("[%d/%d] 💥 Generated an exception for %s: %s", completed, len(urls), url, error)
                     results.append({
                         'success': False,
                         'url': url,
                         'domain': self.extract_domain(url),
                         'email': None,
-                        'error': str(exc)
+                        'error': str(error) or error.__class__.__name__
                     })
+        finally:
+            # Cancelled: drop the queued websites, don't wait for connects/followers
+            # that cannot be interrupted
+            for future in pending:
+                future.cancel()
         
         return results
 
@@ -0,0 +1,171 @@
+"""
+JWT Verifier
+Verifies Supabase access tokens locally (signature, expiry, audience) so an
+authenticated request does not need an auth.get_user round trip.
+
+Keys:
+    HS256          SUPABASE_JWT_SECRET (project JWT secret)
+    RS256/ES256    JWKS from SUPABASE_JWKS_URL (default {SUPABASE_URL}/auth/v1/.well-known/jwks.json),
+                   cached for SUPABASE_JWKS_TTL_SECONDS and refetched when a token names an
+                   unknown kid (key rotation), at most once per JWKS_MIN_REFRESH_SECONDS
+
+A token stays valid until it expires, even after logout - the same trade-off
+every stateless JWT check makes. Set AUTH_LOCAL_VERIFY=false to always ask Supabase.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+try:
+    import jwt
+    JWT_AVAILABLE = True
+except ImportError:
+    JWT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ('RS256', 'ES256')
+JWKS_MIN_REFRESH_SECONDS = 30
+
+
+class TokenVerificationError(Exception):
+    """Token is malformed, expired, or its signature does not match"""
+
+
+class KeyUnavailableError(TokenVerificationError):
+    """No key to check the token with (not configured, JWKS unreachable) - verify remotely instead"""
+
+
+class JWTVerifier:
+    """Local verification of Supabase access tokens with a cached key set"""
+
+    def __init__(
+        self,
+        secret: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        audience: str = 'authenticated',
+        jwks_ttl: float = 600,
+        leeway: float = 10
+    ):
+        self.secret = secret
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.jwks_ttl = jwks_ttl
+        self.leeway = leeway
+
+        self._keys: Dict[str, Any] = {}
+        self._keys_expire_at = 0.0
+        self._last_fetch_attempt: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'JWTVerifier':
+        supabase_url = os.getenv('SUPABASE_URL', '').rstrip('/')
+        default_jwks_url = f"{supabase_url}/auth/v1/.well-known/jwks.json" if supabase_url else None
+        return cls(
+            secret=os.getenv('SUPABASE_JWT_SECRET') or None,
+            jwks_url=os.getenv('SUPABASE_JWKS_URL', default_jwks_url),
+            jwks_ttl=float(os.getenv('SUPABASE_JWKS_TTL_SECONDS', 600)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether tokens can be verified locally at all"""
+        if not JWT_AVAILABLE or os.getenv('AUTH_LOCAL_VERIFY', 'true').lower() != 'true':
+            return False
+        return bool(self.secret or self.jwks_url)
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify signature, expiry and audience of an access token
+
+        Args:
+            token: Bearer token from the Authorization header
+
+        Returns:
+            Token claims (sub, email, role, exp, ...)
+
+        Raises:
+            TokenVerificationError: If the token is not valid
+            KeyUnavailableError: If the token cannot be checked locally
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Malformed token: {e}")
+
+        algorithm = header.get('alg')
+        key = await self._key_for(algorithm, header.get('kid'))
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                leeway=self.leeway,
+                options={'require': ['exp', 'sub']},
+            )
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(str(e))
+
+        return claims
+
+    async def _key_for(self, algorithm: Optional[str], kid: Optional[str]):
+        if algorithm == 'HS256':
+            if not self.secret:
+                raise KeyUnavailableError("HS256 token but SUPABASE_JWT_SECRET is not set")
+            return self.secret
+
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise TokenVerificationError(f"Unsupported token algorithm: {algorithm}")
+        if not self.jwks_url:
+            raise KeyUnavailableError("Asymmetric token but no JWKS URL configured")
+
+        # Unknown kid - keys may have been rotated since the last fetch
+        if time.monotonic() >= self._keys_expire_at or kid not in self._keys:
+            await self._refresh_keys()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise KeyUnavailableError(f"Unknown signing key: {kid}")
+        return key
+
+    async def _refresh_keys(self):
+        async with self._refresh_lock:
+            # Also covers requests that waited while another one refreshed
+            now = time.monotonic()
+            if self._last_fetch_attempt is not None and now - self._last_fetch_attempt < JWKS_MIN_REFRESH_SECONDS:
+                return
+            self._last_fetch_attempt = now
+
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                    keys = jwt.PyJWKSet.from_dict(response.json()).keys
+            except (httpx.HTTPError, ValueError, jwt.PyJWTError) as e:
+                # Keep serving the previous keys
+                logger.warning("⚠️  Failed to fetch JWKS from %s: %s", self.jwks_url, e)
+                return
+
+            self._keys = {key.key_id: key.key for key in keys if key.key_id}
+            self._keys_expire_at = time.monotonic() + self.jwks_ttl
+            logger.info("🔑 Loaded %d signing keys from JWKS", len(self._keys))
+
+
+# Singleton instance
+_jwt_verifier: Optional[JWTVerifier] = None
+
+
+def get_jwt_verifier() -> JWTVerifier:
+    """Get or create JWTVerifier singleton instance"""
+    global _jwt_verifier
+    if _jwt_verifier is None:
+        _jwt_verifier = JWTVerifier.from_env()
+    return _jwt_verifier
@@ -0,0 +1,67 @@
+"""
+Lead Filter
+Quality filters for crawled places, applied to a whole result page at once.
+
+The page is turned into columns (one list per field) and each predicate is
+evaluated over its column. A place is skipped for the first predicate it
+fails, in the order of FILTER_REASONS, and the skip counts per reason are
+returned with the survivors - only those reach the dedup and insert stages.
+"""
+
+from collections import Counter
+from typing import Any, List, Optional, Sequence, Tuple
+
+from services.lead_record import LeadRecord
+
+# Skip reasons in evaluation order
+FILTER_REASONS = ('no_name', 'no_website', 'no_address', 'no_contact', 'low_rating', 'few_reviews')
+
+
+def _present(column: List[Any]) -> List[bool]:
+    return [bool(value) for value in column]
+
+
+class LeadFilter:
+    """Campaign quality requirements (min_rating / min_reviews come from the crawl request)"""
+
+    def __init__(self, min_rating: float = 0, min_reviews: int = 0):
+        self.min_rating = min_rating or 0
+        self.min_reviews = min_reviews or 0
+
+    def _masks(self, records: Sequence[LeadRecord]) -> List[Tuple[str, List[bool]]]:
+        """One boolean column per reason (True = passes)"""
+        names = [r.name for r in records]
+        websites = [r.website for r in records]
+        addresses = [r.address or r.city for r in records]
+        contacts = [r.phone or r.website or r.email for r in records]
+        ratings = [r.rating for r in records]
+        reviews = [r.reviews for r in records]
+
+        return [
+            ('no_name', _present(names)),
+            # User Requirement: Skip leads without website
+            ('no_website', _present(websites)),
+            ('no_address', _present(addresses)),
+            # Must have at least phone OR website OR email
+            ('no_contact', _present(contacts)),
+            ('low_rating', [rating >= self.min_rating for rating in ratings]),
+            ('few_reviews', [count >= self.min_reviews for count in reviews]),
+        ]
+
+    def apply(self, records: Sequence[LeadRecord]) -> Tuple[List[LeadRecord], Counter]:
+        """
+        Filter one page of records
+
+        Args:
+            records: Lead records of a result page
+
+        Returns:
+            (accepted records in input order, Counter of skip reasons)
+        """
+        rejected_by: List[Optional[str]] = [None] * len(records)
+        for reason, mask in self._masks(records):
+            rejected_by = [previous or (None if ok else reason) for previous, ok in zip(rejected_by, mask)]
+
+        accepted = [record for record, reason in zip(records, rejected_by) if reason is None]
+        skipped = Counter(reason for reason in rejected_by if reason is not None)
+        return accepted, skipped
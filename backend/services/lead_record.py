@@ -0,0 +1,123 @@
+"""
+Lead Record
+Compact, slotted representation of an Outscraper place inside the crawl pipeline.
+
+A LeadRecord holds only the fields the quality filters, the dedup check and
+the leads row need - the Outscraper payload is not referenced afterwards and
+can be freed as soon as its page is processed. to_row() is the single
+projection to a leads row.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+
+def extract_email(place: Dict) -> Optional[str]:
+    """
+    Extract email from Outscraper place data
+
+    Args:
+        place: Place dictionary from Outscraper
+
+    Returns:
+        Email address or None
+    """
+    # Outscraper enrichment returns email_1, email_2, email_3
+    email = place.get('email_1') or place.get('email_2') or place.get('email_3')
+
+    if email and isinstance(email, str) and '@' in email:
+        return email
+
+    return None
+
+
+@dataclass(slots=True)
+class LeadRecord:
+    place_id: Optional[str]
+    name: Optional[str]
+    address: Optional[str]
+    city: Optional[str]
+    phone: Optional[str]
+    website: Optional[str]
+    email: Optional[str]
+    rating: float
+    reviews: int
+    latitude: Optional[float]
+    longitude: Optional[float]
+    category: Optional[str]
+    verified: bool
+
+    @classmethod
+    def from_place(cls, place: Dict) -> 'LeadRecord':
+        """
+        Project an Outscraper place onto the fields the pipeline uses
+
+        Args:
+            place: Place dictionary from Outscraper
+
+        Returns:
+            LeadRecord without a reference to the place
+        """
+        return cls(
+            place_id=place.get('place_id') or place.get('google_id'),
+            name=place.get('name'),
+            address=place.get('full_address'),
+            city=place.get('city') or place.get('borough'),
+            phone=place.get('phone'),
+            website=place.get('site'),
+            email=extract_email(place),
+            rating=place.get('rating') or 0,
+            reviews=place.get('reviews') or 0,
+            latitude=place.get('latitude'),
+            longitude=place.get('longitude'),
+            category=place.get('category'),
+            verified=place.get('verified', False),
+        )
+
+    @property
+    def domain(self) -> Optional[str]:
+        """Website host without www. (for deduplication)"""
+        if not self.website:
+            return None
+        try:
+            return urlparse(self.website).netloc.replace('www.', '')
+        except ValueError:
+            return None
+
+    def to_row(self, user_id: str, campaign_id: str) -> Dict[str, Any]:
+        """
+        leads row for this record
+
+        Args:
+            user_id: Owner of the lead
+            campaign_id: Campaign the lead was crawled for
+
+        Returns:
+            Dict ready for supabase.table('leads').insert()
+        """
+        return {
+            "user_id": user_id,
+            "campaign_id": campaign_id,
+            "company_name": self.name,
+            "address": self.address,
+            "city": self.city,
+            "phone": self.phone,
+            "website": self.website,
+            "email": self.email,  # Email from Outscraper!
+            "email_source": "outscraper" if self.email else None,
+            "email_verified": False,
+            "lead_score": int(self.rating * 20),  # 5 stars = 100 score
+            "status": "new",
+            "metadata": {
+                "place_id": self.place_id,
+                "rating": self.rating,
+                "reviews": self.reviews,
+                "address": self.address,
+                "latitude": self.latitude,
+                "longitude": self.longitude,
+                "category": self.category,
+                "verified": self.verified,
+                "source": "outscraper"
+            }
+        }
@@ -0,0 +1,638 @@
+"""
+Local Supabase Stand-in
+In-process implementation of the table()/rpc() surface the routes use, for
+load-testing database paths offline. Counts round trips and can add a fixed
+latency per call to model the network hop to PostgREST.
+
+Enable with SUPABASE_BACKEND=local (see services/supabase_client.py).
+"""
+
+import contextvars
+import copy
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+class LocalAPIError(Exception):
+    """Error raised by the stand-in where PostgREST would return an error response"""
+
+
+class APIResponse:
+    """Mirrors postgrest's APIResponse (.data / .count)"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class RoundTripScope:
+    """Round trips recorded while a scope is active (e.g. one HTTP request)"""
+
+    def __init__(self):
+        self.round_trips = 0
+        self.by_target: Counter = Counter()
+
+
+_current_scope: contextvars.ContextVar[Optional[RoundTripScope]] = contextvars.ContextVar(
+    'local_supabase_scope', default=None
+)
+
+
+class RoundTripStats:
+    """Thread-safe round trip counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.by_target: Counter = Counter()
+
+    def record(self, target: str):
+        with self._lock:
+            self.total += 1
+            self.by_target[target] += 1
+        scope = _current_scope.get()
+        if scope is not None:
+            scope.round_trips += 1
+            scope.by_target[target] += 1
+
+    def reset(self):
+        with self._lock:
+            self.total = 0
+            self.by_target.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'total': self.total, 'by_target': dict(self.by_target.most_common())}
+
+    @contextmanager
+    def scope(self):
+        """
+        Count round trips made in the current context
+
+        Contextvars follow asyncio tasks and run_in_threadpool, but not plain
+        ThreadPoolExecutor workers - those only show up in the global counters.
+        """
+        scope = RoundTripScope()
+        token = _current_scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _current_scope.reset(token)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _compare(op: str, value: Any, target: Any) -> bool:
+    if op == 'eq':
+        return value is not None and value == target
+    if op == 'neq':
+        # PostgREST sends neq.None as a string; NULL never matches a comparison
+        return value is not None and value != target
+    if op == 'is':
+        return value is None if target in (None, 'null') else value is target
+    if op == 'in':
+        return value in target
+    if value is None:
+        return False
+    if op == 'lt':
+        return value < target
+    if op == 'lte':
+        return value <= target
+    if op == 'gt':
+        return value > target
+    if op == 'gte':
+        return value >= target
+    if op in ('like', 'ilike'):
+        pattern = '^' + re.escape(str(target)).replace('%', '.*') + '$'
+        return re.match(pattern, str(value), re.I if op == 'ilike' else 0) is not None
+    raise LocalAPIError(f"Unsupported filter operator: {op}")
+
+
+def _parse_or_filter(expression: str) -> List[tuple]:
+    """Parse a PostgREST or_() expression like 'email.is.null,email_source.eq.manual'"""
+    conditions = []
+    for term in expression.split(','):
+        column, op, raw = term.strip().split('.', 2)
+        value: Any = None if raw == 'null' else raw
+        conditions.append((column, op, value))
+    return conditions
+
+
+class LocalQuery:
+    """Query builder for one table (select/insert/update/upsert/delete + filters)"""
+
+    def __init__(self, client: 'LocalSupabaseClient', table: str):
+        self.client = client
+        self.table_name = table
+        self.operation = 'select'
+        self.columns: Optional[List[str]] = None
+        self.count_mode: Optional[str] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.filters: List[Callable[[Dict], bool]] = []
+        self.order_by: List[tuple] = []
+        self.limit_count: Optional[int] = None
+        self.offset = 0
+        self.single_row = False
+        self.maybe_single_row = False
+
+    # Operations
+
+    def select(self, columns: str = '*', count: Optional[str] = None):
+        self.operation = 'select'
+        self.columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',') if c.strip()]
+        self.count_mode = count
+        return self
+
+    def insert(self, data):
+        self.operation, self.payload = 'insert', data
+        return self
+
+    def upsert(self, data, on_conflict: Optional[str] = None, **kwargs):
+        self.operation, self.payload, self.on_conflict = 'upsert', data, on_conflict or 'id'
+        return self
+
+    def update(self, data: Dict):
+        self.operation, self.payload = 'update', data
+        return self
+
+    def delete(self):
+        self.operation = 'delete'
+        return self
+
+    # Filters
+
+    def _filter(self, column: str, op: str, value: Any):
+        self.filters.append(lambda row: _compare(op, row.get(column), value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self._filter(column, 'lte', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self._filter(column, 'gte', value)
+
+    def like(self, column, value):
+        return self._filter(column, 'like', value)
+
+    def ilike(self, column, value):
+        return self._filter(column, 'ilike', value)
+
+    def is_(self, column, value):
+        return self._filter(column, 'is', value)
+
+    def in_(self, column, values):
+        return self._filter(column, 'in', list(values))
+
+    def or_(self, expression: str):
+        conditions = _parse_or_filter(expression)
+        self.filters.append(lambda row: any(_compare(op, row.get(col), val) for col, op, val in conditions))
+        return self
+
+    # Modifiers
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, count: int):
+        self.limit_count = count
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.limit_count = start, end - start + 1
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def maybe_single(self):
+        self.maybe_single_row = True
+        return self
+
+    def execute(self) -> APIResponse:
+        return self.client._execute(f"{self.operation}:{self.table_name}", lambda: self._run())
+
+    def _matches(self, row: Dict) -> bool:
+        return all(f(row) for f in self.filters)
+
+    def _project(self, row: Dict) -> Dict:
+        if self.columns is None:
+            return copy.deepcopy(row)
+        return {column: copy.deepcopy(row.get(column)) for column in self.columns}
+
+    def _run(self) -> APIResponse:
+        rows = self.client._table(self.table_name)
+
+        if self.operation == 'insert':
+            inserted = [self.client._insert_row(self.table_name, row) for row in self._payload_rows()]
+            return APIResponse(copy.deepcopy(inserted))
+
+        if self.operation == 'upsert':
+            keys = [key.strip() for key in self.on_conflict.split(',')]
+            written = []
+            for row in self._payload_rows():
+                existing = next((r for r in rows if all(r.get(k) == row.get(k) for k in keys)), None)
+                if existing is not None:
+                    existing.update(copy.deepcopy(row))
+                    written.append(existing)
+                else:
+                    written.append(self.client._insert_row(self.table_name, row))
+            return APIResponse(copy.deepcopy(written))
+
+        matched = [row for row in rows if self._matches(row)]
+
+        if self.operation == 'update':
+            for row in matched:
+                row.update(copy.deepcopy(self.payload))
+            return APIResponse(copy.deepcopy(matched))
+
+        if self.operation == 'delete':
+            self.client._tables[self.table_name] = [row for row in rows if not self._matches(row)]
+            return APIResponse(copy.deepcopy(matched))
+
+        for column, desc in reversed(self.order_by):
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        count = len(matched) if self.count_mode else None
+        end = self.offset + self.limit_count if self.limit_count is not None else None
+        data = [self._project(row) for row in matched[self.offset:end]]
+
+        if self.single_row or self.maybe_single_row:
+            if len(data) > 1 or (self.single_row and not data):
+                raise LocalAPIError(f"JSON object requested, multiple (or no) rows returned ({len(data)})")
+            return APIResponse(data[0] if data else None, count)
+        return APIResponse(data, count)
+
+    def _payload_rows(self) -> List[Dict]:
+        return self.payload if isinstance(self.payload, list) else [self.payload]
+
+
+class LocalRPC:
+    """Pending rpc() call"""
+
+    def __init__(self, client: 'LocalSupabaseClient', name: str, params: Dict):
+        self.client = client
+        self.name = name
+        self.params = params or {}
+
+    def execute(self) -> APIResponse:
+        function = self.client._functions.get(self.name)
+        if function is None:
+            raise LocalAPIError(f"Could not find the function public.{self.name}")
+        return self.client._execute(f"rpc:{self.name}", lambda: APIResponse(function(self.client, **self.params)))
+
+
+class LocalSupabaseClient:
+    """In-memory Supabase client with round trip accounting and simulated latency"""
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds to sleep per round trip (models the PostgREST hop)
+        """
+        self.latency = latency
+        self.stats = RoundTripStats()
+        self._tables: Dict[str, List[Dict]] = {}
+        self._functions: Dict[str, Callable] = dict(DEFAULT_FUNCTIONS)
+        # One big lock: the stand-in trades concurrency for simple, consistent semantics
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> 'LocalSupabaseClient':
+        return cls(latency=float(os.getenv('LOCAL_SUPABASE_LATENCY_MS', 0)) / 1000)
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def from_(self, name: str) -> LocalQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> LocalRPC:
+        return LocalRPC(self, name, params)
+
+    def register_rpc(self, name: str, function: Callable):
+        """Register an RPC implementation: function(client, **params) -> data"""
+        self._functions[name] = function
+
+    def seed(self, table: str, rows: List[Dict]) -> List[Dict]:
+        """Insert rows without counting round trips"""
+        with self._lock:
+            return [self._insert_row(table, row) for row in rows]
+
+    def rows(self, table: str) -> List[Dict]:
+        """Direct read access for assertions and reports (not counted)"""
+        with self._lock:
+            return copy.deepcopy(self._table(table))
+
+    def _table(self, name: str) -> List[Dict]:
+        return self._tables.setdefault(name, [])
+
+    def _insert_row(self, table: str, row: Dict) -> Dict:
+        stored = copy.deepcopy(row)
+        stored.setdefault('id', str(uuid.uuid4()))
+        stored.setdefault('created_at', _now())
+        self._table(table).append(stored)
+        return stored
+
+    def _execute(self, target: str, run: Callable[[], APIResponse]) -> APIResponse:
+        self.stats.record(target)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            return run()
+
+
+# RPC implementations (mirroring database/*.sql and migrations/update_credits_to_decimal.sql)
+
+def _find_profile(client: LocalSupabaseClient, user_id: str) -> Optional[Dict]:
+    return next((p for p in client._table('profiles') if p.get('id') == user_id), None)
+
+
+def _change_balance(client, user_id, amount, description, tx_type, metadata=None, check_balance=False):
+    amount = float(amount)
+    if amount <= 0:
+        return {'success': False, 'error': 'Amount must be positive', 'amount': amount}
+    profile = _find_profile(client, user_id)
+    if profile is None:
+        return {'success': False, 'error': 'User not found', 'user_id': user_id}
+
+    current = float(profile.get('credits_balance') or 0)
+    delta = -amount if tx_type == 'usage' else amount
+    if check_balance and current < amount:
+        return {'success': False, 'error': 'Insufficient credits', 'current_balance': current,
+                'required': amount, 'missing': amount - current}
+
+    profile['credits_balance'] = round(current + delta, 2)
+    profile['updated_at'] = _now()
+    transaction = client._insert_row('credit_transactions', {
+        'user_id': user_id,
+        'amount': delta,
+        'type': tx_type,
+        'description': description,
+        'metadata': {'previous_balance': current, 'new_balance': profile['credits_balance'], **(metadata or {})}
+    })
+    key = {'usage': 'amount_deducted', 'purchase': 'amount_added', 'refund': 'amount_refunded'}[tx_type]
+    return {'success': True, 'previous_balance': current, 'new_balance': profile['credits_balance'],
+            key: amount, 'transaction_id': transaction['id']}
+
+
+def _deduct_credits(client, p_user_id, p_amount, p_description, p_metadata=None):
+    return _change_balance(client, p_user_id, p_amount, p_description, 'usage', p_metadata, check_balance=True)
+
+
+def _add_credits(client, p_user_id, p_amount, p_description='Credits purchased', p_metadata=None):
+    return _change_balance(client, p_user_id, p_amount, p_description, 'purchase', p_metadata)
+
+
+def _refund_credits(client, p_user_id, p_amount, p_description, p_original_transaction_id=None):
+    return _change_balance(client, p_user_id, p_amount, p_description, 'refund',
+                           {'original_transaction_id': p_original_transaction_id})
+
+
+def _reserve_credits(client, p_user_id, p_amount, p_description, p_metadata=None, p_ttl_minutes=180):
+    amount = float(p_amount)
+    if amount <= 0:
+        return {'success': False, 'error': 'Amount must be positive', 'amount': amount}
+    profile = _find_profile(client, p_user_id)
+    if profile is None:
+        return {'success': False, 'error': 'User not found', 'user_id': p_user_id}
+
+    now = datetime.now(timezone.utc)
+    current = float(profile.get('credits_balance') or 0)
+    for reservation in client._table('credit_reservations'):
+        if (reservation['user_id'] == p_user_id and reservation['status'] == 'active'
+                and datetime.fromisoformat(reservation['expires_at']) < now):
+            reservation.update(status='expired', settled_at=_now())
+            current += reservation['amount']
+    profile['credits_balance'] = round(current, 2)
+
+    if current < amount:
+        return {'success': False, 'error': 'Insufficient credits', 'current_balance': current,
+                'required': amount, 'missing': amount - current}
+
+    profile['credits_balance'] = round(current - amount, 2)
+    profile['updated_at'] = _now()
+    reservation = client._insert_row('credit_reservations', {
+        'user_id': p_user_id,
+        'amount': amount,
+        'charged': 0,
+        'status': 'active',
+        'description': p_description,
+        'metadata': p_metadata or {},
+        'expires_at': (now + timedelta(minutes=p_ttl_minutes)).isoformat(),
+        'settled_at': None,
+    })
+    return {'success': True, 'reservation_id': reservation['id'], 'amount_reserved': amount,
+            'previous_balance': current, 'new_balance': profile['credits_balance']}
+
+
+def _settle_credit_reservation(client, p_reservation_id, p_amount, p_description, p_metadata=None, p_items=None):
+    amount = float(p_amount)
+    if amount < 0:
+        return {'success': False, 'error': 'Amount must not be negative', 'amount': amount}
+    reservation = next((r for r in client._table('credit_reservations') if r['id'] == p_reservation_id), None)
+    if reservation is None or reservation['status'] != 'active':
+        return {'success': False, 'error': 'Reservation not active', 'reservation_id': p_reservation_id,
+                'status': reservation['status'] if reservation else None}
+
+    profile = _find_profile(client, reservation['user_id'])
+    current = float(profile.get('credits_balance') or 0)
+    covered = min(amount, reservation['amount'])
+    overflow = min(amount - covered, max(current, 0))
+    charged = round(covered + overflow, 2)
+    profile['credits_balance'] = round(current + (reservation['amount'] - covered) - overflow, 2)
+    profile['updated_at'] = _now()
+    reservation.update(status='settled', charged=charged, settled_at=_now())
+
+    transaction_id = None
+    count = 0
+    if charged > 0 and p_items:
+        # Line items in order, cut once the charged total is used up
+        balance, remaining = round(profile['credits_balance'] + charged, 2), charged
+        for item in p_items:
+            item_charged = round(min(float(item['amount']), max(remaining, 0)), 2)
+            if item_charged <= 0:
+                continue
+            remaining = round(remaining - item_charged, 2)
+            client._insert_row('credit_transactions', {
+                'user_id': reservation['user_id'],
+                'amount': -item_charged,
+                'type': 'usage',
+                'description': item.get('description') or p_description,
+                'metadata': {'reservation_id': p_reservation_id, 'reserved': reservation['amount'],
+                             'previous_balance': balance, 'new_balance': round(balance - item_charged, 2),
+                             **(p_metadata or {}), **(item.get('metadata') or {})}
+            })
+            balance = round(balance - item_charged, 2)
+            count += 1
+    elif charged > 0:
+        count = 1
+        transaction_id = client._insert_row('credit_transactions', {
+            'user_id': reservation['user_id'],
+            'amount': -charged,
+            'type': 'usage',
+            'description': p_description,
+            'metadata': {'reservation_id': p_reservation_id, 'reserved': reservation['amount'],
+                         'previous_balance': round(profile['credits_balance'] + charged, 2),
+                         'new_balance': profile['credits_balance'], **(p_metadata or {})}
+        })['id']
+    return {'success': True, 'amount_charged': charged, 'amount_released': round(reservation['amount'] - covered, 2),
+            'uncovered': round(amount - charged, 2), 'new_balance': profile['credits_balance'],
+            'transaction_id': transaction_id, 'transaction_count': count}
+
+
+def _deduct_credits_batch(client, p_user_id, p_items, p_metadata=None):
+    amounts = [item.get('amount') for item in p_items or []]
+    if not amounts or any(amount is None or float(amount) <= 0 for amount in amounts):
+        return {'success': False, 'error': 'Every line item needs a positive amount'}
+    profile = _find_profile(client, p_user_id)
+    if profile is None:
+        return {'success': False, 'error': 'User not found', 'user_id': p_user_id}
+
+    current = float(profile.get('credits_balance') or 0)
+    total = round(sum(float(amount) for amount in amounts), 2)
+    if current < total:
+        return {'success': False, 'error': 'Insufficient credits', 'current_balance': current,
+                'required': total, 'missing': round(total - current, 2)}
+
+    balance = current
+    for item in p_items:
+        amount = float(item['amount'])
+        client._insert_row('credit_transactions', {
+            'user_id': p_user_id,
+            'amount': -amount,
+            'type': 'usage',
+            'description': item.get('description'),
+            'metadata': {'previous_balance': balance, 'new_balance': round(balance - amount, 2),
+                         **(p_metadata or {}), **(item.get('metadata') or {})}
+        })
+        balance = round(balance - amount, 2)
+    profile['credits_balance'] = balance
+    profile['updated_at'] = _now()
+    return {'success': True, 'previous_balance': current, 'new_balance': balance,
+            'amount_deducted': total, 'transaction_count': len(p_items)}
+
+
+def _get_credit_usage_summary(client, p_user_id, p_since=None, p_bucket='day'):
+    if p_bucket not in ('day', 'week', 'month'):
+        return []
+    since = datetime.fromisoformat(p_since) if p_since else datetime.now(timezone.utc) - timedelta(days=90)
+
+    totals: Dict[tuple, List[float]] = {}
+    for transaction in client._table('credit_transactions'):
+        created = datetime.fromisoformat(transaction['created_at'])
+        if transaction.get('user_id') != p_user_id or created < since:
+            continue
+        day = created.replace(hour=0, minute=0, second=0, microsecond=0)
+        if p_bucket == 'week':
+            day -= timedelta(days=day.weekday())
+        elif p_bucket == 'month':
+            day = day.replace(day=1)
+        entry = totals.setdefault((day.isoformat(), transaction['type']), [0.0, 0])
+        entry[0] = round(entry[0] + float(transaction['amount']), 2)
+        entry[1] += 1
+
+    # ORDER BY bucket DESC, type
+    keys = sorted(sorted(totals), key=lambda key: key[0], reverse=True)
+    return [{'bucket': bucket, 'type': tx_type, 'amount': totals[(bucket, tx_type)][0],
+             'transactions': totals[(bucket, tx_type)][1]} for bucket, tx_type in keys]
+
+
+def _save_crawl_checkpoint(client, p_campaign_id, p_user_id, p_state, p_processed=None, p_scraped=None):
+    checkpoint = next((c for c in client._table('crawl_checkpoints') if c['campaign_id'] == p_campaign_id), None)
+    if checkpoint is None:
+        client._insert_row('crawl_checkpoints', {
+            'campaign_id': p_campaign_id,
+            'user_id': p_user_id,
+            'state': p_state,
+            'processed_place_ids': list(p_processed or []),
+            'scraped_urls': list(p_scraped or []),
+            'updated_at': _now(),
+        })
+        return None
+    checkpoint['state'] = copy.deepcopy(p_state)
+    checkpoint['processed_place_ids'] += list(p_processed or [])
+    checkpoint['scraped_urls'] += list(p_scraped or [])
+    checkpoint['updated_at'] = _now()
+    return None
+
+
+def _store_outscraper_cache(client, p_query_key, p_query, p_language, p_region, p_result_limit, p_places, p_ttl_seconds):
+    row = next((r for r in client._table('outscraper_cache') if r['query_key'] == p_query_key), None)
+    if row is not None:
+        fetched_at = datetime.fromisoformat(row['fetched_at'])
+        if row['result_limit'] > p_result_limit and datetime.now(timezone.utc) - fetched_at <= timedelta(seconds=p_ttl_seconds):
+            return False
+        client._table('outscraper_cache').remove(row)
+    client._insert_row('outscraper_cache', {
+        'query_key': p_query_key,
+        'query': p_query,
+        'language': p_language,
+        'region': p_region,
+        'result_limit': p_result_limit,
+        'result_count': len(p_places),
+        'places': p_places,
+        'fetched_at': _now(),
+    })
+    return True
+
+
+def _get_user_credits(client, p_user_id):
+    profile = _find_profile(client, p_user_id)
+    return float(profile.get('credits_balance') or 0) if profile else 0
+
+
+def _check_duplicate_lead(client, p_user_id, p_place_id=None, p_domain=None, p_email=None):
+    leads = [lead for lead in client._table('leads') if lead.get('user_id') == p_user_id]
+
+    if p_place_id:
+        for lead in leads:
+            if (lead.get('place_id') or (lead.get('metadata') or {}).get('place_id')) == p_place_id:
+                return [{'is_duplicate': True, 'duplicate_reason': 'place_id', 'existing_lead_id': lead['id']}]
+    if p_domain:
+        domain = p_domain.lower()
+        for lead in leads:
+            if domain in (lead.get('website') or '').lower() or (lead.get('email') or '').lower().endswith('@' + domain):
+                return [{'is_duplicate': True, 'duplicate_reason': 'domain', 'existing_lead_id': lead['id']}]
+    if p_email:
+        for lead in leads:
+            if lead.get('email') == p_email:
+                return [{'is_duplicate': True, 'duplicate_reason': 'email', 'existing_lead_id': lead['id']}]
+    return [{'is_duplicate': False, 'duplicate_reason': None, 'existing_lead_id': None}]
+
+
+DEFAULT_FUNCTIONS: Dict[str, Callable] = {
+    'deduct_credits': _deduct_credits,
+    'deduct_credits_batch': _deduct_credits_batch,
+    'add_credits': _add_credits,
+    'refund_credits': _refund_credits,
+    'reserve_credits': _reserve_credits,
+    'settle_credit_reservation': _settle_credit_reservation,
+    'get_user_credits': _get_user_credits,
+    'get_credit_usage_summary': _get_credit_usage_summary,
+    'check_duplicate_lead': _check_duplicate_lead,
+    'save_crawl_checkpoint': _save_crawl_checkpoint,
+    'store_outscraper_cache': _store_outscraper_cache,
+}
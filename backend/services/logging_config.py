@@ -0,0 +1,116 @@
+"""
+Logging Configuration
+Leveled, structured logging for the backend. Records are handed to a queue
+and written by a single listener thread, so crawl threads never block on
+stdout. Per-item debug lines can be sampled.
+
+Environment:
+    LOG_LEVEL              Root level (default INFO)
+    LOG_LEVELS             Per-module overrides, e.g. "services.impressum_scraper=DEBUG,routes.campaigns=WARNING"
+    LOG_FORMAT             text | json (default text)
+    LOG_DEBUG_SAMPLE_RATE  Share of sampled per-item lines to keep, 0.0-1.0 (default 1.0)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+# Pass as extra= on per-item lines (one per place, email, URL...) to make them subject to sampling
+SAMPLED = {'sample': True}
+
+# Attributes every LogRecord has - anything else came in through extra= and is logged as a field
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'sample'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with extra= fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = ' '.join(f"{key}={value}" for key, value in vars(record).items() if key not in _RESERVED_ATTRS)
+        return f"{line} {fields}" if fields else line
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a share of the records logged with extra=SAMPLED"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or not getattr(record, 'sample', False):
+            return True
+        return random.random() < self.rate
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def _parse_level(value: str, default: int = logging.INFO) -> int:
+    level = logging.getLevelName((value or '').strip().upper())
+    return level if isinstance(level, int) else default
+
+
+def configure_logging(level: Optional[str] = None):
+    """
+    Install the queue-based handler on the root logger (idempotent)
+
+    Args:
+        level: Root level, overrides LOG_LEVEL (e.g. for CLI scripts)
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        formatter = JsonFormatter() if os.getenv('LOG_FORMAT', 'text').lower() == 'json' else TextFormatter()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # Dropped before they are enqueued, so sampled lines cost almost nothing
+        queue_handler.addFilter(SamplingFilter(float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))))
+
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(_parse_level(level or os.getenv('LOG_LEVEL', 'INFO')))
+
+        for override in filter(None, os.getenv('LOG_LEVELS', '').split(',')):
+            name, _, module_level = override.partition('=')
+            logging.getLogger(name.strip()).setLevel(_parse_level(module_level))
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
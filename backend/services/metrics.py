@@ -0,0 +1,170 @@
+"""
+Metrics Service
+Per-stage latency histograms and pipeline counters, exported in Prometheus
+format on /metrics (see main.py).
+
+Stages: fetch, parse, discover, extract, verify, selenium, db_write,
+outscraper, llm, campaign. Stages can nest (extract includes the parse it
+triggers, campaign includes everything), so compare a stage with itself over
+time rather than summing stages.
+
+With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory so /metrics aggregates all workers.
+"""
+
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+
+# Stage latencies range from sub-millisecond parsing to multi-minute campaigns
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class _NoopMetric:
+    """Stand-in when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+if METRICS_AVAILABLE:
+    STAGE_SECONDS = Histogram(
+        'voyanero_stage_duration_seconds', 'Latency per pipeline stage', ['stage', 'outcome'],
+        buckets=STAGE_BUCKETS
+    )
+    FETCH_BYTES = Counter('voyanero_fetch_bytes_total', 'Decoded body bytes read by the page fetcher')
+    FETCH_TRUNCATED = Counter('voyanero_fetch_truncated_total', 'Responses cut off at the byte cap')
+    RETRIES = Counter('voyanero_retries_total', 'Retried operations', ['reason'])
+    FALLBACKS = Counter('voyanero_fallbacks_total', 'Fallback paths taken', ['kind'])
+    CACHE_REQUESTS = Counter('voyanero_cache_requests_total', 'Cache lookups', ['cache', 'result'])
+    DISCOVERY = Counter('voyanero_impressum_discovery_total', 'How the Impressum page was found', ['method'])
+    CACHE_ENTRIES = Gauge('voyanero_cache_entries', 'Entries held by in-process caches', ['cache'], multiprocess_mode='livesum')
+    CACHE_BYTES = Gauge('voyanero_cache_bytes', 'Approximate memory held by in-process caches', ['cache'], multiprocess_mode='livesum')
+    CRAWL_RUNNING = Gauge('voyanero_crawl_running', 'Scrapes running in the shared crawl pool', ['lane'], multiprocess_mode='livesum')
+    CRAWL_QUEUED = Gauge('voyanero_crawl_queued', 'Scrapes waiting for a crawl pool slot', ['lane'], multiprocess_mode='livesum')
+else:
+    STAGE_SECONDS = FETCH_BYTES = FETCH_TRUNCATED = RETRIES = FALLBACKS = CACHE_REQUESTS = DISCOVERY = _NoopMetric()
+    CACHE_ENTRIES = CACHE_BYTES = CRAWL_RUNNING = CRAWL_QUEUED = _NoopMetric()
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Time a block as one pipeline stage (outcome label is 'error' if it raises)
+
+    Args:
+        stage: Stage name (fetch, parse, discover, extract, verify, selenium, db_write, outscraper, llm, campaign)
+    """
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage=stage, outcome=outcome).observe(time.perf_counter() - started)
+
+
+def timed_stage(stage: str):
+    """Decorator version of track_stage (works for sync and async functions)"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track_stage(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_fetch(bytes_read: int, truncated: bool):
+    FETCH_BYTES.inc(bytes_read)
+    if truncated:
+        FETCH_TRUNCATED.inc()
+
+
+def record_retry(reason: str):
+    RETRIES.labels(reason=reason).inc()
+
+
+def record_fallback(kind: str):
+    FALLBACKS.labels(kind=kind).inc()
+
+
+def record_cache(cache: str, result: str):
+    """
+    Args:
+        cache: Cache name (impressum, robots, ...)
+        result: hit, miss or stale
+    """
+    CACHE_REQUESTS.labels(cache=cache, result=result).inc()
+
+
+def record_cache_size(cache: str, entries: int, size_bytes: int):
+    CACHE_ENTRIES.labels(cache=cache).set(entries)
+    CACHE_BYTES.labels(cache=cache).set(size_bytes)
+
+
+def record_crawl_capacity(lane: str, running: int, queued: int):
+    """
+    Args:
+        lane: batch or priority
+    """
+    CRAWL_RUNNING.labels(lane=lane).set(running)
+    CRAWL_QUEUED.labels(lane=lane).set(queued)
+
+
+def record_discovery(method: str):
+    DISCOVERY.labels(method=method).inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format
+
+    Returns:
+        (body, content type)
+    """
+    if not METRICS_AVAILABLE:
+        return b'# prometheus_client not installed\n', 'text/plain; charset=utf-8'
+
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,11 +1,84 @@
 """
 Outscraper Service for Google Maps Scraping
 Replaces Google Places API with Outscraper for better scalability
+
+Search results are cached in the outscraper_cache table, keyed by the normalized
+(query, language, region). One row keeps the largest result set fetched for a
+query, so a cached 500-place search also serves later searches for 100 places.
+Searches pinned to coordinates (see services/search_planner.py) are cached per
+coordinates.
+
+iter_places pages through a search with Outscraper's skip parameter, so callers
+can start working on the first page and stop before buying the rest - and a
+resumed crawl can continue after the places it already has (start).
 """
 
+import logging
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
 from outscraper import ApiClient
 import os
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
+
+from services.lead_record import extract_email
+from services.metrics import timed_stage, record_cache
+from services.single_flight import SingleFlight, get_single_flight
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the result cache
+OUTSCRAPER_CACHE_TTL_HOURS = float(os.getenv("OUTSCRAPER_CACHE_TTL_HOURS", 168))
+# Places per request in iter_places (Outscraper skips in steps of 20)
+OUTSCRAPER_PAGE_SIZE = max(20, int(os.getenv("OUTSCRAPER_PAGE_SIZE", 100)) // 20 * 20)
+
+# Fields requested from Outscraper - also the only fields kept in the result cache
+PLACE_FIELDS = [
+    'name',
+    'full_address',
+    'borough',
+    'street',
+    'city',
+    'postal_code',
+    'country_code',
+    'country',
+    'state',
+    'latitude',
+    'longitude',
+    'site',
+    'phone',
+    'type',
+    'category',
+    'rating',
+    'reviews',
+    'google_id',
+    'place_id',
+    'business_status',
+    'verified',
+    'working_hours',
+    # Email fields (from enrichment)
+    'email_1',
+    'email_2',
+    'email_3',
+    'domain'
+]
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and Unicode-form-insensitive form of a search query"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', query)).strip().casefold()
+
+
+def search_cache_key(query: str, language: str, region: str, coordinates: Optional[str] = None) -> str:
+    key = f"{normalize_query(query)}|{language.lower()}|{region.upper()}"
+    return f"{key}|{coordinates}" if coordinates else key
+
+
+def compact_place(place: Dict) -> Dict:
+    """Requested fields only, without empty values"""
+    return {field: place[field] for field in PLACE_FIELDS if place.get(field) not in (None, '', [], {})}
+
 
 class OutscraperService:
     def __init__(self):
@@ -14,28 +87,164 @@ class OutscraperService:
             raise ValueError("OUTSCRAPER_API_KEY not found in environment variables")
         
         self.client = ApiClient(api_key=self.api_key)
+        self.cache_ttl = timedelta(hours=OUTSCRAPER_CACHE_TTL_HOURS)
+        # Identical searches running at the same time share one paid API call.
+        # Searches can take minutes, longer than the scrape default lock TTL.
+        self.flight = SingleFlight(redis_client=get_single_flight().redis, namespace='outscraper', lock_ttl=900)
     
     def search_places(
         self,
         query: str,
         limit: int = 100,
         language: str = "de",
-        region: str = "DE"
+        region: str = "DE",
+        coordinates: Optional[str] = None
     ) -> List[Dict]:
         """
-        Search for places using Outscraper Google Maps Scraper
+        Search for places using Outscraper Google Maps Scraper (cached)
         
         Args:
             query: Search query (e.g., "Restaurant in München")
-            limit: Maximum number of results (10-5000)
+            limit: Maximum number of results (Google returns at most ~400 per query)
             language: Language code (default: de)
             region: Region code (default: DE)
+            coordinates: Map viewport to search in, e.g. "@48.137,11.575,14z" (optional)
         
         Returns:
             List of place dictionaries with business information
         """
+        if not self.cache_ttl:
+            return self._fetch_places(query, limit, language, region, coordinates)
+
+        key = search_cache_key(query, language, region, coordinates)
+        cached = self._load_cached(key, limit)
+        if cached is not None:
+            logger.info("✅ Outscraper: Using %d cached places for '%s'", len(cached), query)
+            return cached
+
+        def fetch():
+            places = self._fetch_places(query, limit, language, region, coordinates)
+            self._store_cached(key, query, language, region, limit, places)
+            return places
+
+        return self.flight.do(f"{key}|{limit}", fetch)
+
+    def iter_places(
+        self,
+        query: str,
+        limit: int = 100,
+        language: str = "de",
+        region: str = "DE",
+        coordinates: Optional[str] = None,
+        page_size: int = OUTSCRAPER_PAGE_SIZE,
+        start: int = 0
+    ) -> Iterator[List[Dict]]:
+        """
+        Search for places page by page (cached)
+
+        Each page is a separate Outscraper request, made only when the caller asks
+        for it - stop iterating and the remaining places are never fetched (or paid).
+        Whatever was fetched is cached when the iteration ends (unless it started
+        after the first place - the cache holds result sets from the beginning -
+        or a fresh set fetched with a larger limit is cached already).
+
+        Args:
+            query: Search query (e.g., "Restaurant in München")
+            limit: Maximum number of results over all pages
+            language: Language code (default: de)
+            region: Region code (default: DE)
+            coordinates: Map viewport to search in (optional)
+            page_size: Places per request (multiple of 20)
+            start: Places to skip (already processed by a resumed crawl; multiple of 20)
+
+        Yields:
+            Lists of up to page_size places
+        """
+        key = search_cache_key(query, language, region, coordinates)
+        if self.cache_ttl:
+            cached = self._load_cached(key, limit)
+            if cached is not None:
+                logger.info("✅ Outscraper: Using %d cached places for '%s'", len(cached), query)
+                for offset in range(start, len(cached), page_size):
+                    yield cached[offset:offset + page_size]
+                return
+
+        fetched: List[Dict] = []
+        requested = start
+        try:
+            while requested < limit:
+                size = min(page_size, limit - requested)
+                page = self.flight.do(
+                    f"{key}|{requested}+{size}",
+                    lambda skip=requested, size=size: self._fetch_places(query, size, language, region, coordinates, skip)
+                )
+                requested += size
+                fetched.extend(page)
+                if page:
+                    yield page
+                if len(page) < size:
+                    # Outscraper has no more places for this search
+                    break
+        finally:
+            if self.cache_ttl and fetched and not start:
+                self._store_cached(key, query, language, region, requested, fetched)
+
+    def _load_cached(self, key: str, limit: int) -> Optional[List[Dict]]:
+        """Cached places for a search, or None if missing, expired or smaller than limit"""
+        try:
+            res = get_supabase_client().table('outscraper_cache') \
+                .select('result_limit, result_count, places, fetched_at') \
+                .eq('query_key', key) \
+                .limit(1) \
+                .execute()
+        except Exception as e:
+            logger.warning("⚠️  Outscraper cache lookup failed: %s", e)
+            return None
+
+        row = res.data[0] if res.data else None
+        if not row:
+            record_cache('outscraper', 'miss')
+            return None
+
+        fetched_at = datetime.fromisoformat(row['fetched_at'].replace('Z', '+00:00'))
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - fetched_at > self.cache_ttl:
+            record_cache('outscraper', 'stale')
+            return None
+
+        # Fewer results than requested back then means Outscraper had no more - serves any limit
+        exhausted = row['result_count'] < row['result_limit']
+        if row['result_limit'] < limit and not exhausted:
+            record_cache('outscraper', 'miss')
+            return None
+
+        record_cache('outscraper', 'hit')
+        return row['places'][:limit]
+
+    def _store_cached(self, key: str, query: str, language: str, region: str, limit: int, places: List[Dict]):
+        """Cache a result set (a fresh one fetched with a larger limit is kept)"""
+        try:
+            get_supabase_client().rpc('store_outscraper_cache', {
+                'p_query_key': key,
+                'p_query': query,
+                'p_language': language,
+                'p_region': region,
+                'p_result_limit': limit,
+                'p_places': places,
+                'p_ttl_seconds': int(self.cache_ttl.total_seconds())
+            }).execute()
+        except Exception as e:
+            logger.warning("⚠️  Could not cache Outscraper results for '%s': %s", query, e)
+
+    @timed_stage('outscraper')
+    def _fetch_places(
+        self, query: str, limit: int, language: str, region: str, coordinates: Optional[str] = None, skip: int = 0
+    ) -> List[Dict]:
+        """Call the Outscraper API (paid, can take minutes)"""
         try:
-            print(f"🔍 Outscraper: Searching for '{query}' (limit: {limit})")
+            logger.info("🔍 Outscraper: Searching for '%s' %s(limit: %d, skip: %d)",
+                        query, f"at {coordinates} " if coordinates else "", limit, skip)
             
             # Call Outscraper API with enrichment enabled
             results = self.client.google_maps_search(
@@ -43,102 +252,31 @@ class OutscraperService:
                 limit=limit,
                 language=language,
                 region=region,
+                skip=skip,
+                coordinates=coordinates or '',
                 enrichment=['emails_and_contacts'],  # Enable email enrichment
-                fields=[
-                    'name',
-                    'full_address', 
-                    'borough',
-                    'street',
-                    'city',
-                    'postal_code',
-                    'country_code',
-                    'country',
-                    'state',
-                    'latitude',
-                    'longitude',
-                    'site',
-                    'phone',
-                    'type',
-                    'category',
-                    'rating',
-                    'reviews',
-                    'google_id',
-                    'place_id',
-                    'business_status',
-                    'verified',
-                    'working_hours',
-                    # Email fields (from enrichment)
-                    'email_1',
-                    'email_2',
-                    'email_3',
-                    'domain'
-                ]
+                fields=PLACE_FIELDS
             )
             
-            # Flatten results (Outscraper returns list of lists)
+            # Flatten results (Outscraper returns list of lists), keeping only the
+            # requested fields so the rest of the payload can be freed right away
             places = []
             for result_set in results:
                 if isinstance(result_set, list):
-                    places.extend(result_set)
+                    places.extend(compact_place(place) for place in result_set)
                 else:
-                    places.append(result_set)
+                    places.append(compact_place(result_set))
             
-            print(f"✅ Outscraper: Found {len(places)} places")
+            logger.info("✅ Outscraper: Found %d places", len(places))
             return places
             
         except Exception as e:
-            print(f"❌ Outscraper Error: {str(e)}")
+            logger.error("❌ Outscraper Error: %s", e)
             raise
     
     def extract_email(self, place: Dict) -> Optional[str]:
-        """
-        Extract email from Outscraper place data
-        
-        Args:
-            place: Place dictionary from Outscraper
-        
-        Returns:
-            Email address or None
-        """
-        # Outscraper enrichment returns email_1, email_2, email_3
-        email = place.get('email_1') or place.get('email_2') or place.get('email_3')
-        
-        if email and isinstance(email, str) and '@' in email:
-            return email
-        
-        return None
-    
-    def normalize_place_data(self, place: Dict) -> Dict:
-        """
-        Normalize Outscraper place data to our internal format
-        
-        Args:
-            place: Raw place data from Outscraper
-        
-        Returns:
-            Normalized place dictionary
-        """
-        return {
-            'place_id': place.get('place_id') or place.get('google_id'),
-            'name': place.get('name'),
-            'address': place.get('full_address'),
-            'city': place.get('city') or place.get('borough'),
-            'postal_code': place.get('postal_code'),
-            'country': place.get('country'),
-            'latitude': place.get('latitude'),
-            'longitude': place.get('longitude'),
-            'phone': place.get('phone'),
-            'website': place.get('site'),
-            'email': self.extract_email(place),
-            'rating': place.get('rating'),
-            'reviews_count': place.get('reviews'),
-            'category': place.get('category'),
-            'type': place.get('type'),
-            'verified': place.get('verified', False),
-            'business_status': place.get('business_status'),
-            'working_hours': place.get('working_hours'),
-            'raw_data': place  # Keep original data for reference
-        }
+        """Email address from Outscraper place data (see services/lead_record.py)"""
+        return extract_email(place)
 
 
 # Singleton instance
@@ -0,0 +1,239 @@
+"""
+Page Archive Service
+Optional compressed archive of raw crawled HTML, keyed by URL and content hash,
+so extractor improvements can be replayed over old crawls without re-fetching
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional, Dict, Iterator, List
+
+# zstd is optional - fall back to gzip from the standard library
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+class LocalArchiveStore:
+    """Blob store on local disk (one file per key)"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to temp file first so readers never see half-written blobs
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def list(self, prefix: str) -> Iterator[str]:
+        base = self._path(prefix)
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                rel = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                yield rel.replace(os.sep, '/')
+
+
+class S3ArchiveStore:
+    """Blob store in S3 or any S3-compatible object store (MinIO, LocalStack)"""
+
+    def __init__(self, bucket: str, prefix: str = 'page-archive', endpoint_url: Optional[str] = None):
+        import boto3
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}"
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception:
+            return False
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+            return obj['Body'].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def list(self, prefix: str) -> Iterator[str]:
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get('Contents', []):
+                yield obj['Key'][len(self.prefix) + 1:]
+
+
+class PageArchive:
+    """
+    Content-addressed HTML archive
+
+    Layout:
+        blobs/<hash[:2]>/<hash>.<zst|gz>   compressed HTML, deduplicated by SHA-256
+        manifests/<domain>.json            latest archived page per role for a domain
+    """
+
+    def __init__(self, store, codec: Optional[str] = None):
+        self.store = store
+        self.codec = codec or ('zst' if ZSTD_AVAILABLE else 'gz')
+        if self.codec == 'zst' and not ZSTD_AVAILABLE:
+            raise ValueError("zstd codec requested but 'zstandard' is not installed")
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        """SHA-256 of the UTF-8 encoded HTML"""
+        return hashlib.sha256(html.encode('utf-8', errors='replace')).hexdigest()
+
+    @staticmethod
+    def _blob_key(content_hash: str, codec: str) -> str:
+        return f"blobs/{content_hash[:2]}/{content_hash}.{codec}"
+
+    @staticmethod
+    def _manifest_key(domain: str) -> str:
+        return f"manifests/{domain}.json"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == 'zst':
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        if codec == 'zst':
+            if not ZSTD_AVAILABLE:
+                raise ValueError("Archive blob is zstd-compressed but 'zstandard' is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def put_page(self, domain: str, website: str, role: str, url: str, html: str, rendered: bool = False) -> str:
+        """
+        Archive a page and point the domain manifest at it
+
+        Args:
+            domain: Domain key (same as impressum_cache.domain)
+            website: Website URL the crawl started from
+            role: 'homepage' or 'impressum'
+            url: URL the HTML was fetched from
+            html: Page HTML
+            rendered: True if the HTML came from Selenium
+
+        Returns:
+            Content hash of the archived page
+        """
+        content_hash = self.content_hash(html)
+        blob_key = self._blob_key(content_hash, self.codec)
+
+        # Identical content is stored once, no matter how many URLs serve it
+        if not self.store.exists(blob_key):
+            self.store.put(blob_key, self._compress(html.encode('utf-8', errors='replace')))
+
+        manifest = self.get_manifest(domain) or {'domain': domain, 'website': website, 'pages': {}}
+        manifest['website'] = website
+        manifest['pages'][role] = {
+            'url': url,
+            'content_hash': content_hash,
+            'codec': self.codec,
+            'bytes': len(html),
+            'rendered': rendered,
+            'archived_at': datetime.now(timezone.utc).isoformat()
+        }
+        self.store.put(self._manifest_key(domain), json.dumps(manifest).encode('utf-8'))
+
+        return content_hash
+
+    def get_manifest(self, domain: str) -> Optional[Dict]:
+        """Get manifest for a domain or None if nothing is archived"""
+        data = self.store.get(self._manifest_key(domain))
+        return json.loads(data) if data else None
+
+    def iter_manifests(self) -> Iterator[Dict]:
+        """Iterate over all domain manifests"""
+        for key in self.store.list('manifests/'):
+            if key.endswith('.json'):
+                data = self.store.get(key)
+                if data:
+                    yield json.loads(data)
+
+    def load_html(self, page: Dict) -> Optional[str]:
+        """Load archived HTML for a manifest page entry"""
+        data = self.store.get(self._blob_key(page['content_hash'], page['codec']))
+        if data is None:
+            return None
+        return self._decompress(data, page['codec']).decode('utf-8', errors='replace')
+
+    def domains(self) -> List[str]:
+        """List archived domains"""
+        return [key[len('manifests/'):-len('.json')] for key in self.store.list('manifests/') if key.endswith('.json')]
+
+
+def create_page_archive_from_env() -> Optional[PageArchive]:
+    """
+    Build PageArchive from environment variables
+
+    PAGE_ARCHIVE_BACKEND: 'local' or 's3' (unset = archive disabled)
+    PAGE_ARCHIVE_DIR: Root directory for the local backend
+    PAGE_ARCHIVE_BUCKET / PAGE_ARCHIVE_PREFIX / PAGE_ARCHIVE_ENDPOINT_URL: S3 backend settings
+    PAGE_ARCHIVE_CODEC: 'zst' or 'gz' (default: zst if available)
+    """
+    backend = os.getenv('PAGE_ARCHIVE_BACKEND', '').lower()
+    if not backend:
+        return None
+
+    if backend == 'local':
+        store = LocalArchiveStore(os.getenv('PAGE_ARCHIVE_DIR', './page_archive'))
+    elif backend == 's3':
+        bucket = os.getenv('PAGE_ARCHIVE_BUCKET') or os.getenv('AWS_S3_BUCKET')
+        if not bucket:
+            raise ValueError("PAGE_ARCHIVE_BUCKET (or AWS_S3_BUCKET) must be set for the s3 archive backend")
+        store = S3ArchiveStore(
+            bucket=bucket,
+            prefix=os.getenv('PAGE_ARCHIVE_PREFIX', 'page-archive'),
+            endpoint_url=os.getenv('PAGE_ARCHIVE_ENDPOINT_URL') or None
+        )
+    else:
+        raise ValueError(f"Unknown PAGE_ARCHIVE_BACKEND '{backend}' (expected 'local' or 's3')")
+
+    return PageArchive(store, codec=os.getenv('PAGE_ARCHIVE_CODEC') or None)
+
+
+# Singleton instance
+_page_archive = None
+_page_archive_loaded = False
+
+def get_page_archive() -> Optional[PageArchive]:
+    """Get PageArchive instance or None if archiving is disabled"""
+    global _page_archive, _page_archive_loaded
+    if not _page_archive_loaded:
+        _page_archive = create_page_archive_from_env()
+        _page_archive_loaded = True
+    return _page_archive
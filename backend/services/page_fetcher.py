@@ -0,0 +1,252 @@
+"""
+Page Fetcher Service
+Streams HTTP responses with a byte cap and Content-Type gating so a single
+crawl worker never holds more than one bounded page in memory
+
+Inside a cancellation_scope (services/cancellation.py) a cancelled crawl closes
+the response being read, so the fetch stops mid-body with CrawlCancelled.
+"""
+
+import codecs
+import hashlib
+import logging
+import os
+import re
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Tuple
+
+import requests
+
+from services.cancellation import CrawlCancelled, current_token
+from services.metrics import track_stage, record_fetch
+from services.logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedContentTypeError(requests.exceptions.RequestException):
+    """Raised when a response is not an HTML/text document (PDF, images, archives...)"""
+
+    def __init__(self, url: str, content_type: str):
+        self.url = url
+        self.content_type = content_type
+        super().__init__(f"Unsupported content type '{content_type}' for {url}")
+
+
+@dataclass
+class FetchedPage:
+    """Decoded, size-bounded result of a streamed GET request"""
+    url: str
+    status_code: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    content_type: str = ''
+    encoding: str = 'utf-8'
+    text: str = ''
+    bytes_read: int = 0
+    truncated: bool = False
+    content_hash: str = ''
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        """True for a 304 answer to a conditional request"""
+        return self.status_code == 304
+
+    @property
+    def validators(self) -> Dict[str, Optional[str]]:
+        """Validators to store for later conditional requests"""
+        return {
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'content_hash': self.content_hash
+        }
+
+
+class PageFetcher:
+    """Streaming GET with byte caps, Content-Type gating and incremental decoding"""
+
+    # Documents we are willing to parse. Anything else is rejected before the body is read.
+    HTML_CONTENT_TYPES = (
+        'text/html',
+        'application/xhtml+xml',
+        'text/plain',
+    )
+
+    # Byte caps (decoded body). Impressum pages are often long legal texts, so they get more room.
+    DEFAULT_MAX_BYTES = int(os.getenv('SCRAPER_MAX_PAGE_BYTES', 1024 * 1024))
+    IMPRESSUM_MAX_BYTES = int(os.getenv('SCRAPER_MAX_IMPRESSUM_BYTES', 2 * 1024 * 1024))
+
+    CHUNK_SIZE = 16 * 1024
+
+    # <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+    META_CHARSET_REGEX = re.compile(rb'<meta[^>]+charset=["\']?\s*([a-zA-Z0-9_\-]+)', re.I)
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+
+    def fetch(
+        self,
+        url: str,
+        max_bytes: Optional[int] = None,
+        timeout: float = 10,
+        allowed_types: Optional[Tuple[str, ...]] = HTML_CONTENT_TYPES,
+        headers: Optional[Dict[str, str]] = None
+    ) -> FetchedPage:
+        """
+        Fetch a page without ever buffering more than max_bytes of body
+
+        A 304 answer to a conditional request is returned as an empty FetchedPage
+        (see FetchedPage.not_modified).
+
+        Args:
+            url: URL to fetch
+            max_bytes: Maximum number of (decompressed) body bytes to read
+            timeout: Connect/read timeout in seconds
+            allowed_types: Accepted MIME types, None to accept anything
+            headers: Extra request headers
+
+        Returns:
+            FetchedPage with the decoded text and truncation info
+
+        Raises:
+            requests.exceptions.HTTPError: On 4xx/5xx responses
+            UnsupportedContentTypeError: If the Content-Type is not allowed
+            CrawlCancelled: If the crawl this fetch belongs to was cancelled
+        """
+        with track_stage('fetch'):
+            page = self._fetch(url, max_bytes or self.DEFAULT_MAX_BYTES, timeout, allowed_types, headers)
+        record_fetch(page.bytes_read, page.truncated)
+        return page
+
+    def _fetch(
+        self,
+        url: str,
+        max_bytes: int,
+        timeout: float,
+        allowed_types: Optional[Tuple[str, ...]],
+        headers: Optional[Dict[str, str]]
+    ) -> FetchedPage:
+        token = current_token()
+        if token is not None:
+            token.raise_if_cancelled()
+        response = self.session.get(url, timeout=timeout, allow_redirects=True, stream=True, headers=headers)
+        try:
+            with token.on_cancel(response.close) if token is not None else nullcontext():
+                page = self._read(response, max_bytes, allowed_types)
+            # A closed response can also just end early - never return that partial body
+            if token is not None and token.cancelled:
+                raise CrawlCancelled(token.reason)
+            return page
+        except Exception as e:
+            # Reading a response closed by the cancel callback fails with a connection error
+            if token is not None and token.cancelled and not isinstance(e, CrawlCancelled):
+                raise CrawlCancelled(token.reason) from e
+            raise
+        finally:
+            # Releases the connection without draining the rest of the body
+            response.close()
+
+    def _read(
+        self,
+        response: requests.Response,
+        max_bytes: int,
+        allowed_types: Optional[Tuple[str, ...]]
+    ) -> FetchedPage:
+        response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', '')
+        mime_type = content_type.split(';')[0].strip().lower()
+        if response.status_code == 304:
+            mime_type = ''
+        # Missing Content-Type is common on small hosters - treat it as HTML
+        if mime_type and allowed_types and mime_type not in allowed_types:
+            raise UnsupportedContentTypeError(response.url, mime_type)
+
+        decoder = None
+        encoding = self._charset_from_header(content_type)
+        # Hash of the (capped) raw body - used for change detection on re-crawl
+        body_hash = hashlib.sha256()
+        parts = []
+        bytes_read = 0
+        truncated = False
+
+        # iter_content yields decompressed bytes, so the cap also protects against gzip bombs
+        for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+            if not chunk:
+                continue
+
+            remaining = max_bytes - bytes_read
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                truncated = True
+
+            if decoder is None:
+                encoding = encoding or self._charset_from_body(chunk) or 'utf-8'
+                decoder = self._incremental_decoder(encoding)
+
+            body_hash.update(chunk)
+            parts.append(decoder.decode(chunk))
+            bytes_read += len(chunk)
+
+            if truncated:
+                break
+
+        if decoder is not None:
+            parts.append(decoder.decode(b'', final=True))
+
+        if truncated:
+            logger.debug("✂️  Truncated %s after %d bytes", response.url, bytes_read, extra=SAMPLED)
+
+        return FetchedPage(
+            url=response.url,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content_type=mime_type,
+            encoding=encoding or 'utf-8',
+            text=''.join(parts),
+            bytes_read=bytes_read,
+            truncated=truncated,
+            content_hash=body_hash.hexdigest(),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+
+    def conditional_headers(self, validators: Dict) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from stored validators"""
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def _charset_from_header(self, content_type: str) -> Optional[str]:
+        """Read charset parameter from Content-Type header"""
+        match = re.search(r'charset=["\']?([a-zA-Z0-9_\-]+)', content_type, re.I)
+        if match and self._is_known_codec(match.group(1)):
+            return match.group(1).lower()
+        return None
+
+    def _charset_from_body(self, chunk: bytes) -> Optional[str]:
+        """Sniff <meta charset> from the first chunk of the body"""
+        match = self.META_CHARSET_REGEX.search(chunk[:4096])
+        if match:
+            charset = match.group(1).decode('ascii', errors='ignore')
+            if self._is_known_codec(charset):
+                return charset.lower()
+        return None
+
+    @staticmethod
+    def _is_known_codec(name: str) -> bool:
+        try:
+            codecs.lookup(name)
+            return True
+        except LookupError:
+            return False
+
+    @staticmethod
+    def _incremental_decoder(encoding: str):
+        return codecs.getincrementaldecoder(encoding)(errors='replace')
@@ -0,0 +1,213 @@
+"""
+Render Mode
+Decides from the first response whether a website needs a browser (Selenium)
+or whether the static fetch is enough:
+
+    bot wall   challenge pages (Cloudflare, SiteGround, Imperva, DataDome,
+               Sucuri, DDoS-Guard) - by status and headers, or body markers
+    spa shell  empty mount point (<div id="root"></div>) or an
+               "enable JavaScript" notice instead of content
+    builder    site builders that render client-side (Wix, Jimdo, Framer, ...)
+               with hardly any server-rendered text
+    scripts    mostly script, hardly any visible text
+
+The outcome of each scrape is remembered per domain (RENDER_MODE_TTL_DAYS,
+shared across workers through Redis when configured): known JS sites go
+straight to the browser, and sites where the browser found nothing the
+static fetch had missed are not escalated again.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Mapping, Optional
+
+from services.config_cache import MISSING, TTLCache
+from services.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+STATIC = 'static'
+BROWSER = 'browser'
+
+RENDER_MODE_TTL_DAYS = float(os.getenv('RENDER_MODE_TTL_DAYS', 30))
+RENDER_MODE_MAX_ENTRIES = int(os.getenv('RENDER_MODE_MAX_ENTRIES', 20000))
+# Pages with less visible text than this are candidates for client-side rendering
+JS_MIN_TEXT_CHARS = int(os.getenv('JS_MIN_TEXT_CHARS', 250))
+# ... and are treated as JS-rendered if their script outweighs the text this many times
+JS_SCRIPT_TEXT_RATIO = float(os.getenv('JS_SCRIPT_TEXT_RATIO', 5))
+# An external <script src> counts like this many characters of inline script
+EXTERNAL_SCRIPT_CHARS = 1000
+
+# Status codes challenge pages are served with (SiteGround answers 202)
+BOT_WALL_STATUS = (202, 403, 429, 503)
+BOT_WALL_HEADERS = (
+    ('cf-mitigated', 'challenge'),   # Cloudflare managed challenge
+    ('sg-captcha', ''),              # SiteGround
+    ('x-datadome', ''),
+    ('x-iinfo', ''),                 # Imperva / Incapsula
+    ('x-sucuri-id', ''),
+    ('server', 'ddos-guard'),
+)
+BOT_WALL_MARKERS = (
+    'cf_chl_opt',
+    'cf-browser-verification',
+    '<title>just a moment...</title>',
+    'attention required! | cloudflare',
+    '/.well-known/sgcaptcha/',
+    'captcha-delivery.com',
+    'sucuri website firewall',
+    'check.ddos-guard.net',
+)
+SPA_SHELL_REGEX = re.compile(
+    r'<(?:div|main|app-root)[^>]*\bid=["\'](?:root|app|__next|__nuxt|svelte|q-app)["\'][^>]*>\s*</(?:div|main|app-root)>'
+    r'|<app-root[^>]*>\s*</app-root>',
+    re.I
+)
+NOSCRIPT_REGEX = re.compile(r'<noscript\b[^>]*>(.*?)</noscript\s*>', re.I | re.S)
+ENABLE_JS_MARKERS = (
+    'enable javascript',
+    'javascript is required',
+    'javascript is disabled',
+    'javascript aktivieren',
+    'aktivieren sie javascript',
+    'javascript ist deaktiviert',
+)
+BUILDER_SIGNATURES = {
+    'wix': ('static.parastorage.com', 'wix.com website builder'),
+    'jimdo': ('jimdo-dolphin', 'jimdosite.com'),
+    'framer': ('framerusercontent.com',),
+    'webnode': ('webnode.page', 'webnode-'),
+    'weebly': ('editmysite.com',),
+}
+SCRIPT_REGEX = re.compile(r'<script\b([^>]*)>(.*?)</script\s*>', re.I | re.S)
+INVISIBLE_REGEX = re.compile(r'<(style|noscript|template|svg)\b.*?</\1\s*>|<!--.*?-->', re.I | re.S)
+TAG_REGEX = re.compile(r'<[^>]+>')
+
+
+def detect_bot_wall(status_code: int, headers: Mapping[str, str], html: str = '') -> bool:
+    """
+    True if the response is a challenge page - static retries cannot get past it
+
+    Args:
+        status_code: HTTP status
+        headers: Response headers
+        html: Body, if it was read
+    """
+    lowered = {key.lower(): str(value).lower() for key, value in (headers or {}).items()}
+    if status_code in BOT_WALL_STATUS:
+        for name, value in BOT_WALL_HEADERS:
+            if name in lowered and value in lowered[name]:
+                return True
+    if html and len(html) < 256 * 1024:
+        body = html.lower()
+        return any(marker in body for marker in BOT_WALL_MARKERS)
+    return False
+
+
+def detect_js_rendering(html: str) -> Optional[str]:
+    """
+    Cheap check whether the static HTML is only a shell for client-side rendering
+
+    Args:
+        html: Static homepage HTML
+
+    Returns:
+        'spa_shell', 'builder:<name>' or 'script_heavy', None if the HTML has content
+    """
+    if not html:
+        return None
+
+    scripts = SCRIPT_REGEX.findall(html)
+    script_chars = sum(
+        EXTERNAL_SCRIPT_CHARS if 'src=' in attrs.lower() else len(body)
+        for attrs, body in scripts
+    )
+    text = TAG_REGEX.sub(' ', INVISIBLE_REGEX.sub(' ', SCRIPT_REGEX.sub(' ', html)))
+    text_chars = len(' '.join(text.split()))
+    if text_chars >= JS_MIN_TEXT_CHARS:
+        return None
+
+    if SPA_SHELL_REGEX.search(html):
+        return 'spa_shell'
+    for notice in NOSCRIPT_REGEX.findall(html):
+        notice = notice.lower()
+        if any(marker in notice for marker in ENABLE_JS_MARKERS):
+            return 'spa_shell'
+
+    head = html[:64 * 1024].lower()
+    for builder, signatures in BUILDER_SIGNATURES.items():
+        if any(signature in head for signature in signatures):
+            return f'builder:{builder}'
+
+    if script_chars > JS_SCRIPT_TEXT_RATIO * max(text_chars, 1):
+        return 'script_heavy'
+    return None
+
+
+def detect_render_need(status_code: int, headers: Mapping[str, str], html: str) -> Optional[str]:
+    """
+    Reason the first response needs a browser ('bot_wall', 'spa_shell',
+    'builder:<name>', 'script_heavy'), or None if the static HTML is usable
+    """
+    if detect_bot_wall(status_code, headers, html):
+        return 'bot_wall'
+    return detect_js_rendering(html)
+
+
+class RenderModeStore:
+    """Per-domain render mode (STATIC or BROWSER) learned from earlier scrapes"""
+
+    def __init__(self, redis_client=None, namespace: str = 'render', ttl_s: float = RENDER_MODE_TTL_DAYS * 86400):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.ttl_s = ttl_s
+        self._local = TTLCache('render_mode', RENDER_MODE_MAX_ENTRIES, ttl_s)
+
+    def get(self, domain: str) -> Optional[str]:
+        """
+        Args:
+            domain: Normalized domain (single_flight.normalize_domain)
+
+        Returns:
+            STATIC, BROWSER or None if unknown
+        """
+        mode = self._local.get(domain)
+        if mode is not MISSING:
+            return mode
+        if self.redis is None:
+            return None
+        try:
+            value = self.redis.get(f"{self.namespace}:{domain}")
+        except Exception as e:
+            logger.debug("Render mode lookup failed: %s", e)
+            return None
+        if value is None:
+            return None
+        mode = value.decode() if isinstance(value, bytes) else value
+        self._local.set(domain, mode)
+        return mode
+
+    def remember(self, domain: str, mode: str) -> None:
+        """Store the mode that worked for domain (refreshes its TTL)"""
+        self._local.set(domain, mode)
+        if self.redis is not None:
+            try:
+                self.redis.set(f"{self.namespace}:{domain}", mode, ex=int(self.ttl_s))
+            except Exception as e:
+                logger.debug("Could not store render mode for %s: %s", domain, e)
+
+
+# Singleton instance
+_render_modes = None
+_render_modes_lock = threading.Lock()
+
+def get_render_modes() -> RenderModeStore:
+    """Get or create RenderModeStore instance"""
+    global _render_modes
+    if _render_modes is None:
+        with _render_modes_lock:
+            if _render_modes is None:
+                _render_modes = RenderModeStore(redis_client=get_single_flight().redis)
+    return _render_modes
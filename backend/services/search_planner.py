@@ -0,0 +1,307 @@
+"""
+Search Planner
+Splits large Google Maps searches into geographic tiles so targets beyond what
+one query returns (Google caps a search at ~400 places) can be reached.
+
+1. Seed query "{keywords} in {location}" - enough for small targets and
+   exhausted areas; its places also give the area's center.
+2. A hexagonal grid of tiles covers the search radius, nearest tiles first.
+   Each tile is a "{keywords}" query pinned to the tile center (Outscraper
+   coordinates with a zoom level that shows about one tile).
+3. Tiles run concurrently, results are merged and deduplicated by place_id.
+   Each tile asks only for the places still missing (minus what the tiles in
+   flight may bring), so no paid results are bought beyond the target.
+
+iter_search streams the places page by page (seed) and tile by tile, so the
+crawl can filter and insert while later pages are still being fetched. Its
+SearchProgress (seed offset, tile plan, finished tiles) is checkpointed by the
+crawl, so a resumed crawl does not pay for the same Outscraper calls twice.
+"""
+
+import logging
+import math
+import os
+import statistics
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+# Google Maps returns at most ~400 places per search
+MAX_PLACES_PER_QUERY = 400
+SEARCH_MAX_TILES = int(os.getenv('SEARCH_MAX_TILES', 49))
+SEARCH_FANOUT_WORKERS = int(os.getenv('SEARCH_FANOUT_WORKERS', 4))
+SEARCH_MIN_TILE_RADIUS_M = float(os.getenv('SEARCH_MIN_TILE_RADIUS_M', 1000))
+
+METERS_PER_DEGREE_LAT = 111320
+# Web Mercator resolution at zoom 0 (meters per pixel at the equator)
+METERS_PER_PIXEL_Z0 = 156543.03392
+# Assumed width of the map viewport Outscraper searches in
+VIEWPORT_PIXELS = 1000
+
+
+@dataclass
+class Tile:
+    latitude: float
+    longitude: float
+    radius_m: float
+    distance_m: float
+
+    @property
+    def zoom(self) -> float:
+        """Zoom level at which the viewport spans about one tile diameter"""
+        meters_per_pixel = 2 * self.radius_m / VIEWPORT_PIXELS
+        zoom = math.log2(METERS_PER_PIXEL_Z0 * math.cos(math.radians(self.latitude)) / meters_per_pixel)
+        return min(18.0, max(10.0, zoom))
+
+    @property
+    def coordinates(self) -> str:
+        """Outscraper coordinates parameter, e.g. "@48.137,11.575,14.7z\""""
+        return f"@{self.latitude:.6f},{self.longitude:.6f},{self.zoom:.1f}z"
+
+
+@dataclass
+class SearchProgress:
+    """How far an iter_search run got (updated as each batch is yielded, before it is processed)"""
+    seed_offset: int = 0
+    seed_done: bool = False
+    seed_points: List[List[float]] = field(default_factory=list)
+    # Planned tiles and the ones whose results were yielded (Outscraper coordinates)
+    tiles: List[str] = field(default_factory=list)
+    tiles_done: List[str] = field(default_factory=list)
+    found: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def copy(self) -> 'SearchProgress':
+        return SearchProgress.from_dict(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'SearchProgress':
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in (data or {}).items() if key in names})
+
+
+def place_key(place: Dict) -> Optional[str]:
+    """Identity of a place across queries"""
+    return place.get('place_id') or place.get('google_id') or (
+        f"{place.get('name')}|{place.get('full_address')}" if place.get('name') else None
+    )
+
+
+def area_center(points: List[Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+    """Median of (latitude, longitude) points (robust against a few far-away results)"""
+    if not points:
+        return None
+    return statistics.median(lat for lat, _ in points), statistics.median(lng for _, lng in points)
+
+
+def plan_tiles(center: Tuple[float, float], radius_m: float, tiles_needed: int, max_tiles: int = SEARCH_MAX_TILES) -> List[Tile]:
+    """
+    Hexagonal grid of tiles covering a circle, nearest to the center first
+
+    Args:
+        center: (latitude, longitude) of the search area
+        radius_m: Search radius in meters
+        tiles_needed: Roughly how many tiles the target requires
+        max_tiles: Upper bound on the number of tiles
+
+    Returns:
+        Tiles ordered by distance from the center
+    """
+    tile_radius = max(SEARCH_MIN_TILE_RADIUS_M, radius_m / math.sqrt(max(1, tiles_needed)))
+    tile_radius = min(tile_radius, radius_m)
+    # Circles of radius r on a hex grid with spacing r*sqrt(3) cover the plane
+    spacing = tile_radius * math.sqrt(3)
+    row_height = spacing * math.sqrt(3) / 2
+
+    lat, lng = center
+    meters_per_degree_lng = METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))
+    rows = int(radius_m // row_height) + 1
+    columns = int(radius_m // spacing) + 1
+
+    tiles = []
+    for row in range(-rows, rows + 1):
+        offset = spacing / 2 if row % 2 else 0
+        for column in range(-columns - 1, columns + 1):
+            dx, dy = column * spacing + offset, row * row_height
+            distance = math.hypot(dx, dy)
+            if distance > radius_m:
+                continue
+            tiles.append(Tile(
+                latitude=lat + dy / METERS_PER_DEGREE_LAT,
+                longitude=lng + dx / meters_per_degree_lng,
+                radius_m=tile_radius,
+                distance_m=distance
+            ))
+
+    tiles.sort(key=lambda tile: tile.distance_m)
+    return tiles[:max_tiles]
+
+
+class SearchPlanner:
+    """Seed query plus concurrent tile queries until enough places are found"""
+
+    def __init__(self, outscraper, max_workers: int = SEARCH_FANOUT_WORKERS, max_tiles: int = SEARCH_MAX_TILES):
+        self.outscraper = outscraper
+        self.max_workers = max_workers
+        self.max_tiles = max_tiles
+
+    def search(self, keywords: str, location: str, radius_m: float, wanted: int) -> List[Dict]:
+        """
+        Find up to `wanted` unique places for keywords around a location
+
+        Args:
+            keywords: What to search for (e.g. "Friseur")
+            location: Where (e.g. "München")
+            radius_m: Search radius in meters (0 = seed query only)
+            wanted: Number of unique places to collect
+
+        Returns:
+            Unique places, seed results first, then tiles from the center outwards
+        """
+        places = [place for batch in self.iter_search(keywords, location, radius_m, wanted) for place in batch]
+        return places[:wanted]
+
+    def iter_search(
+        self,
+        keywords: str,
+        location: str,
+        radius_m: float,
+        wanted: int,
+        progress: Optional[SearchProgress] = None,
+        seen: Iterable[str] = (),
+        cancel: Optional[CancellationToken] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Like search(), but yields new unique places as each result page or tile arrives
+
+        Closing the iterator early (the caller has enough leads) stops further
+        Outscraper requests; tiles already running finish in the background.
+
+        Args:
+            progress: State of an earlier run to continue from (updated in place)
+            seen: place_key()s that must not be yielded again (already processed)
+            cancel: Crawl token - no further page or tile is requested once cancelled
+                (CrawlCancelled); a request already sent to Outscraper cannot be aborted
+
+        Yields:
+            Lists of places not yielded before
+        """
+        progress = progress if progress is not None else SearchProgress()
+        seen = set(seen)
+        found = progress.found
+
+        def unique(results: List[Dict]) -> List[Dict]:
+            batch = []
+            for place in results:
+                key = place_key(place)
+                if key is None or key in seen:
+                    continue
+                seen.add(key)
+                batch.append(place)
+            return batch
+
+        def check_cancelled():
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+
+        seed_limit = min(wanted, MAX_PLACES_PER_QUERY)
+        check_cancelled()
+        if not progress.seed_done:
+            for page in self.outscraper.iter_places(
+                query=f"{keywords} in {location}", limit=seed_limit, start=progress.seed_offset
+            ):
+                progress.seed_offset += len(page)
+                progress.seed_points.extend(
+                    [round(p['latitude'], 6), round(p['longitude'], 6)]
+                    for p in page if p.get('latitude') and p.get('longitude')
+                )
+                batch = unique(page)
+                if batch:
+                    found += len(batch)
+                    progress.found = found
+                    yield batch
+                check_cancelled()
+            progress.seed_done = True
+
+        if found >= wanted or progress.seed_offset < seed_limit or radius_m <= 0:
+            # Target reached, or the area has no more places than the seed returned
+            return
+
+        if not progress.tiles:
+            center = area_center(progress.seed_points)
+            if center is None:
+                return
+
+            # Neighbouring tiles overlap and sparse tiles return less than the maximum -
+            # plan generously, tiles beyond the target are never fetched
+            tiles_needed = 2 * math.ceil((wanted - found) / MAX_PLACES_PER_QUERY) + 1
+            tiles = plan_tiles(center, radius_m, tiles_needed, self.max_tiles)
+            progress.tiles = [tile.coordinates for tile in tiles]
+            # Only needed to plan the tiles
+            progress.seed_points = []
+            logger.info("🗺️  Splitting '%s' around %s into %d tiles (%.0fm each)",
+                        keywords, location, len(tiles), tiles[0].radius_m if tiles else 0)
+
+        finished = set(progress.tiles_done)
+        pending_tiles = iter([coordinates for coordinates in progress.tiles if coordinates not in finished])
+        # Tile coordinates and the number of places requested for it
+        in_flight: Dict[Future, Tuple[str, int]] = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='search-tile')
+
+        def submit_next() -> bool:
+            # Places are paid for - never request more than is still missing,
+            # counting what the tiles in flight may already bring
+            missing = wanted - found - sum(limit for _, limit in in_flight.values())
+            if missing <= 0:
+                return False
+            check_cancelled()
+            coordinates = next(pending_tiles, None)
+            if coordinates is None:
+                return False
+            limit = min(MAX_PLACES_PER_QUERY, missing)
+            future = executor.submit(
+                self.outscraper.search_places,
+                query=keywords,
+                limit=limit,
+                coordinates=coordinates
+            )
+            in_flight[future] = (coordinates, limit)
+            return True
+
+        try:
+            while len(in_flight) < self.max_workers and submit_next():
+                pass
+
+            while in_flight:
+                # Short timeout while cancellable, so a cancel is noticed between tiles
+                done, _ = wait(in_flight, timeout=1 if cancel is not None else None, return_when=FIRST_COMPLETED)
+                check_cancelled()
+                for future in done:
+                    coordinates, _ = in_flight.pop(future)
+                    try:
+                        batch = unique(future.result())
+                    except Exception as e:
+                        # Not marked done - a resumed crawl tries the tile again
+                        logger.warning("⚠️  Tile search failed: %s", e)
+                        continue
+                    progress.tiles_done.append(coordinates)
+                    found += len(batch)
+                    progress.found = found
+                    if batch:
+                        yield batch
+
+                if found >= wanted:
+                    break
+                while len(in_flight) < self.max_workers and submit_next():
+                    pass
+        finally:
+            # Tiles still running finish in the background (their results land in the search cache)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        logger.info("🗺️  Collected %d unique places for '%s' (wanted %d)", found, keywords, wanted)
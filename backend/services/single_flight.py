@@ -0,0 +1,212 @@
+"""
+Single-Flight Service
+Coalesces concurrent calls for the same key (e.g. scrapes of one domain) so only
+one caller does the work and everyone else receives its result. Works across
+threads in one process and, through Redis, across uvicorn workers.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_domain(url: str) -> str:
+    """Normalize a URL or host to a bare domain (lowercase, no scheme, no www., no port)"""
+    if '://' not in url:
+        url = 'https://' + url
+    host = (urlparse(url).hostname or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+class _Call:
+    """In-flight call shared by the leader and its followers"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Per-key call coalescing
+
+    In-process followers block on the leader's threading.Event. Across workers a
+    Redis lock elects one leader; the others poll for the published result.
+    Results must be JSON-serializable to be shared through Redis.
+    """
+
+    # Compare-and-delete so a leader never releases a lock that expired and was re-acquired
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        namespace: str = 'singleflight',
+        lock_ttl: float = 180,
+        result_ttl: int = 30,
+        poll_interval: float = 0.25
+    ):
+        """
+        Args:
+            redis_client: Redis client for cross-worker coalescing (None = in-process only)
+            namespace: Redis key prefix
+            lock_ttl: Seconds a remote leader may hold a key before followers take over
+            result_ttl: Seconds a finished result stays available to late followers
+            poll_interval: Seconds between Redis polls while waiting for a remote leader
+        """
+        self.redis = redis_client
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], leader_errors: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """
+        Run fn once per key at a time and share the result
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument callable doing the actual work
+            leader_errors: Errors that concern only the leader's caller (e.g. its
+                crawl was cancelled) - they are not passed on to followers, which
+                try again and one of them becomes the new leader
+
+        Returns:
+            Result of fn (from this call, a concurrent call or a remote worker)
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = _Call()
+                    self._calls[key] = call
+
+            if is_leader:
+                break
+            call.event.wait()
+            if call.error is None:
+                return call.result
+            if not isinstance(call.error, leader_errors):
+                raise call.error
+
+        try:
+            call.result = self._run_distributed(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _run_distributed(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Elect a leader across workers through Redis (falls back to fn() if Redis is unavailable)"""
+        if self.redis is None:
+            return fn()
+
+        lock_key = f"{self.namespace}:lock:{key}"
+        result_key = f"{self.namespace}:result:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            shared = self.redis.get(result_key)
+            if shared is not None:
+                return json.loads(shared)
+            acquired = self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except redis.RedisError as e:
+            logger.warning("⚠️  Single-flight Redis error, running locally: %s", e)
+            return fn()
+
+        if not acquired:
+            shared = self._wait_for_remote(lock_key, result_key)
+            if shared is not None:
+                return shared
+            # Remote leader failed or timed out - do the work ourselves
+            return fn()
+
+        try:
+            result = fn()
+            try:
+                self.redis.set(result_key, json.dumps(result), ex=self.result_ttl)
+            except (redis.RedisError, TypeError, ValueError) as e:
+                logger.warning("⚠️  Could not publish single-flight result for %s: %s", key, e)
+            return result
+        finally:
+            try:
+                self.redis.eval(self.RELEASE_SCRIPT, 1, lock_key, token)
+            except redis.RedisError:
+                pass
+
+    def _wait_for_remote(self, lock_key: str, result_key: str) -> Optional[Any]:
+        """Wait until the remote leader publishes a result or releases the lock"""
+        deadline = time.monotonic() + self.lock_ttl
+        try:
+            while time.monotonic() < deadline:
+                shared = self.redis.get(result_key)
+                if shared is not None:
+                    return json.loads(shared)
+                if not self.redis.exists(lock_key):
+                    shared = self.redis.get(result_key)
+                    return json.loads(shared) if shared is not None else None
+                time.sleep(self.poll_interval)
+        except redis.RedisError as e:
+            logger.warning("⚠️  Single-flight Redis error while waiting: %s", e)
+        return None
+
+
+def _create_redis_client():
+    """Connect to REDIS_URL, or return None to coalesce in-process only"""
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url or not REDIS_AVAILABLE:
+        return None
+    try:
+        client = redis.Redis.from_url(
+            redis_url,
+            password=os.getenv('REDIS_PASSWORD') or None,
+            socket_timeout=2,
+            socket_connect_timeout=2
+        )
+        client.ping()
+        return client
+    except Exception as e:
+        logger.warning("⚠️  Redis not reachable (%s) - single-flight limited to this process", e)
+        return None
+
+
+# Singleton instance
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight() -> SingleFlight:
+    """Get or create SingleFlight instance"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight(redis_client=_create_redis_client())
+    return _single_flight
@@ -0,0 +1,199 @@
+"""
+Sitemap Discovery Service
+Finds Impressum/Kontakt pages from robots.txt and sitemap.xml instead of
+probing URL patterns with HEAD requests
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+from urllib.parse import urljoin, urlparse
+
+from services.cancellation import CrawlCancelled
+from services.page_fetcher import PageFetcher
+from services.metrics import record_cache
+from services.logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+
+class SitemapDiscovery:
+    """Impressum discovery via robots.txt -> sitemap(s) -> path scoring"""
+
+    ROBOTS_CONTENT_TYPES = ('text/plain', 'text/html')
+    SITEMAP_CONTENT_TYPES = ('application/xml', 'text/xml', 'application/rss+xml', 'text/plain')
+
+    MAX_ROBOTS_BYTES = int(os.getenv('SCRAPER_MAX_ROBOTS_BYTES', 256 * 1024))
+    MAX_SITEMAP_BYTES = int(os.getenv('SCRAPER_MAX_SITEMAP_BYTES', 2 * 1024 * 1024))
+
+    # Sitemap indexes can list hundreds of child sitemaps - only follow the most promising ones
+    MAX_CHILD_SITEMAPS = 3
+    MAX_SITEMAPS_PER_SITE = 5
+
+    # robots.txt rarely changes; cache the Sitemap: lines per host
+    ROBOTS_CACHE_TTL = int(os.getenv('SCRAPER_ROBOTS_CACHE_TTL', 6 * 3600))
+    ROBOTS_CACHE_SIZE = 10000
+
+    # (keyword, score) - matched against the last path segment first
+    PATH_KEYWORDS = [
+        ('impressum', 100),
+        ('imprint', 90),
+        ('legal-notice', 80),
+        ('anbieterkennzeichnung', 80),
+        ('kontakt', 50),
+        ('contact', 45),
+    ]
+
+    # Minimum score for a sitemap URL to be used without further probing
+    MIN_SCORE = 40
+
+    LOC_REGEX = re.compile(r'<loc>\s*(?:<!\[CDATA\[)?\s*(.*?)\s*(?:\]\]>)?\s*</loc>', re.I | re.S)
+    FOREIGN_LANGUAGE_PREFIX = re.compile(r'^/(en|fr|it|es|nl|pl|tr)(/|$)')
+
+    _robots_cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+    _robots_lock = threading.Lock()
+
+    def __init__(self, fetcher: PageFetcher):
+        self.fetcher = fetcher
+
+    def find_impressum_url(self, base_url: str) -> Optional[str]:
+        """
+        Find the best Impressum/Kontakt URL listed in the site's sitemap(s)
+
+        Args:
+            base_url: Base URL of the website
+
+        Returns:
+            URL of the best-scoring page or None
+        """
+        host = self._normalize_host(base_url)
+        best_url, best_score = None, 0
+
+        for loc in self._iter_sitemap_urls(base_url):
+            score = self.score_url(loc, host)
+            if score > best_score:
+                best_url, best_score = loc, score
+                if score >= self.PATH_KEYWORDS[0][1]:
+                    break
+
+        if best_url and best_score >= self.MIN_SCORE:
+            logger.debug("✅ Found Impressum via sitemap: %s (score %d)", best_url, best_score, extra=SAMPLED)
+            return best_url
+        return None
+
+    def score_url(self, url: str, host: str) -> int:
+        """
+        Score a URL as Impressum candidate
+
+        Args:
+            url: Candidate URL from the sitemap
+            host: Normalized host of the website (other hosts score 0)
+
+        Returns:
+            Score (0 = not a candidate)
+        """
+        parsed = urlparse(url)
+        if self._normalize_host(url) != host:
+            return 0
+
+        path = parsed.path.lower().rstrip('/')
+        segments = [segment for segment in path.split('/') if segment]
+        if not segments:
+            return 0
+        last_segment = segments[-1]
+
+        score = 0
+        for keyword, keyword_score in self.PATH_KEYWORDS:
+            if keyword in last_segment:
+                score = keyword_score
+                break
+            if keyword in path:
+                score = max(score, keyword_score - 20)
+        if not score:
+            return 0
+
+        # Prefer short, canonical URLs in the site's main (German) language
+        score -= (len(segments) - 1) * 5
+        if parsed.query:
+            score -= 10
+        if self.FOREIGN_LANGUAGE_PREFIX.match(path):
+            score -= 15
+        return max(score, 0)
+
+    def _iter_sitemap_urls(self, base_url: str):
+        """Yield page URLs from the site's sitemaps (following one level of sitemap index)"""
+        sitemaps = self.get_sitemaps(base_url)
+        seen = set()
+
+        while sitemaps:
+            sitemap_url = sitemaps.pop(0)
+            if sitemap_url in seen:
+                continue
+            if len(seen) >= self.MAX_SITEMAPS_PER_SITE:
+                break
+            seen.add(sitemap_url)
+
+            text = self._fetch_text(sitemap_url, self.MAX_SITEMAP_BYTES, self.SITEMAP_CONTENT_TYPES)
+            if not text:
+                continue
+
+            locs = self.LOC_REGEX.findall(text)
+            if '<sitemapindex' in text[:2048].lower():
+                # Page sitemaps first (WordPress/Yoast: page-sitemap.xml), posts/products last
+                children = sorted(locs, key=lambda loc: 0 if 'page' in loc.lower() else 1)
+                sitemaps.extend(children[:self.MAX_CHILD_SITEMAPS])
+                continue
+
+            for loc in locs:
+                yield loc
+
+    def get_sitemaps(self, base_url: str) -> List[str]:
+        """Sitemap URLs from robots.txt (cached per host), defaulting to /sitemap.xml"""
+        parsed = urlparse(base_url)
+        origin = f"{parsed.scheme or 'https'}://{parsed.netloc}"
+        now = time.monotonic()
+
+        with self._robots_lock:
+            cached = self._robots_cache.get(origin)
+            if cached and now - cached[0] < self.ROBOTS_CACHE_TTL:
+                self._robots_cache.move_to_end(origin)
+                record_cache('robots', 'hit')
+                return list(cached[1])
+        record_cache('robots', 'miss')
+
+        sitemaps = []
+        robots = self._fetch_text(urljoin(origin, '/robots.txt'), self.MAX_ROBOTS_BYTES, self.ROBOTS_CONTENT_TYPES)
+        if robots:
+            for line in robots.splitlines():
+                if line.lower().startswith('sitemap:'):
+                    sitemap_url = line.split(':', 1)[1].strip()
+                    if sitemap_url:
+                        sitemaps.append(urljoin(origin, sitemap_url))
+        if not sitemaps:
+            sitemaps = [urljoin(origin, '/sitemap.xml')]
+
+        with self._robots_lock:
+            self._robots_cache[origin] = (now, sitemaps)
+            self._robots_cache.move_to_end(origin)
+            while len(self._robots_cache) > self.ROBOTS_CACHE_SIZE:
+                self._robots_cache.popitem(last=False)
+
+        return list(sitemaps)
+
+    def _fetch_text(self, url: str, max_bytes: int, allowed_types: Tuple[str, ...]) -> Optional[str]:
+        """Fetch a small text resource, None on any error (a cancelled crawl still stops)"""
+        try:
+            return self.fetcher.fetch(url, max_bytes=max_bytes, timeout=5, allowed_types=allowed_types).text
+        except CrawlCancelled:
+            raise
+        except Exception:
+            return None
+
+    @staticmethod
+    def _normalize_host(url: str) -> str:
+        host = (urlparse(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
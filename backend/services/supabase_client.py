@@ -3,11 +3,19 @@ Supabase Client Configuration for Voyanero Backend
 Provides a singleton Supabase client with service role access
 """
 
+import logging
 from typing import Optional
+import httpx
+from postgrest.utils import SyncClient
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 import os
 from dotenv import load_dotenv
 
+from services.async_db import POOL_SIZE, QUERY_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
@@ -29,6 +37,13 @@ class SupabaseClient:
             ValueError: If SUPABASE_URL or SUPABASE_SERVICE_KEY is not set
         """
         if cls._instance is None:
+            # Offline stand-in for load tests (see services/local_supabase.py)
+            if os.getenv("SUPABASE_BACKEND", "supabase").lower() == "local":
+                from services.local_supabase import LocalSupabaseClient
+                cls._instance = LocalSupabaseClient.from_env()
+                logger.info("🧪 Using local Supabase stand-in (latency %.0fms per call)", cls._instance.latency * 1000)
+                return cls._instance
+
             supabase_url = os.getenv("SUPABASE_URL")
             supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
 
@@ -45,10 +60,32 @@ class SupabaseClient:
                 )
 
             # Create client with service role key for backend operations
-            cls._instance = create_client(supabase_url, supabase_key)
+            cls._instance = create_client(
+                supabase_url, supabase_key,
+                options=ClientOptions(postgrest_client_timeout=QUERY_TIMEOUT)
+            )
+            cls._configure_pool(cls._instance)
 
         return cls._instance
 
+    @staticmethod
+    def _configure_pool(client: Client) -> None:
+        """Size the PostgREST connection pool to the async_db thread pool (one keep-alive connection per thread)"""
+        postgrest = client.postgrest
+        session = postgrest.session
+        postgrest.session = SyncClient(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=QUERY_TIMEOUT,
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+        session.close()
+
+    @classmethod
+    def set_client(cls, client) -> None:
+        """Use the given client (e.g. a LocalSupabaseClient) for all get_client() calls"""
+        cls._instance = client
+
     @classmethod
     def reset_client(cls) -> None:
         """Reset the client instance (useful for testing)"""
@@ -403,6 +403,29 @@ export const getCreditTransactions = async (userId, limit = 50) => {
   }
 }
 
+/**
+ * Get credit usage totals per period and transaction type
+ * @param {string} userId - User's UUID
+ * @param {string} bucket - 'day', 'week' or 'month'
+ * @param {string} since - Optional ISO timestamp (defaults to the last 90 days)
+ * @returns {Promise<{data: Array, error: Error}>}
+ */
+export const getCreditUsageSummary = async (userId, bucket = 'day', since = null) => {
+  try {
+    const params = { p_user_id: userId, p_bucket: bucket }
+    if (since) params.p_since = since
+
+    const { data, error } = await supabase.rpc('get_credit_usage_summary', params)
+
+    if (error) throw error
+
+    return { data, error: null }
+  } catch (error) {
+    console.error('Get credit usage summary error:', error)
+    return { data: null, error }
+  }
+}
+
 /**
  * Get user statistics
  * @param {string} userId - User's UUID